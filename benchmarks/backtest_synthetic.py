@@ -0,0 +1,57 @@
+"""
+Times the wallet_trades backtester on synthetic fills, no database needed.
+
+Generates random-walk prices for a set of markets and random BUY/SELL fills
+from many wallets spread over several years, then runs each BET_MODE:
+
+    python -m benchmarks.backtest_synthetic --wallets 300 --fills 2000000 --years 3
+"""
+import argparse
+import time
+import numpy as np
+from rich.console import Console
+
+from src.backtest import Backtester, print_report
+
+console = Console()
+
+
+def synthetic_fills(wallets, fills, markets, years, seed):
+    rng = np.random.default_rng(seed)
+    start = 1_600_000_000
+    timestamps = np.sort(rng.integers(start, start + int(years * 365 * 86400), fills))
+    market = rng.integers(0, markets, fills)
+    # Each market trades around its own level; prices stay inside (0, 1)
+    level = rng.uniform(0.05, 0.95, markets)
+    prices = np.clip(level[market] + rng.normal(0, 0.05, fills), 0.01, 0.99)
+    sides = np.where(rng.random(fills) < 0.7, "BUY", "SELL")
+    wallet_ids = np.char.add("0xwallet", rng.integers(0, wallets, fills).astype(str))
+    condition_ids = np.char.add("0xcond", market.astype(str))
+    outcomes = np.where(rng.random(fills) < 0.5, "Yes", "No")
+    return wallet_ids, condition_ids, outcomes, sides, prices, timestamps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--wallets", type=int, default=300)
+    parser.add_argument("--fills", type=int, default=2_000_000)
+    parser.add_argument("--markets", type=int, default=5_000)
+    parser.add_argument("--years", type=float, default=3)
+    parser.add_argument("--epoch", type=int, default=3600)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    data = synthetic_fills(args.wallets, args.fills, args.markets, args.years, args.seed)
+    started = time.perf_counter()
+    backtester = Backtester(*data)
+    prepared = time.perf_counter()
+    results = [backtester.run(mode, epoch=args.epoch) for mode in ("FIXED", "PERCENTAGE")]
+    finished = time.perf_counter()
+
+    console.print(f"[green]{args.fills:,} fills / {args.wallets} wallets: prepare {prepared - started:.2f}s, "
+                  f"2 runs {finished - prepared:.2f}s[/green]")
+    print_report(backtester, results, top=5)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Hot-path cost of Database.log_whale_activity as wallet_trades grows.
+
+Grows a scratch wallet_trades table in steps (bulk inserts), and at each step
+times a burst of log_whale_activity calls plus the legacy aggregation SELECT
+the hot path used to run. Insert latency should stay flat with table size.
+
+Usage:
+    python -m benchmarks.bench_wallet_trades --steps 0 100000 1000000 3000000 --events 2000
+"""
+import aiosqlite
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from rich.console import Console
+from rich.table import Table
+
+import src.database as database
+from src.database import Database
+
+console = Console()
+
+WALLETS = [f"0x{i:040x}" for i in range(500)]
+CONDITIONS = [f"0x{i:064x}" for i in range(5000)]
+
+LEGACY_SELECT = """
+    SELECT id, entry_price, size_usd
+    FROM wallet_trades
+    WHERE wallet_address = ? AND condition_id = ? AND side = ? AND outcome = ? AND timestamp >= ?
+    ORDER BY timestamp DESC
+    LIMIT 1
+"""
+
+
+async def grow_table(db, current, target, now):
+    batch = 50_000
+    while current < target:
+        n = min(batch, target - current)
+        rows = [
+            (random.choice(WALLETS), random.choice(CONDITIONS), random.choice(("Yes", "No")),
+             random.choice(("BUY", "SELL")), random.random(), random.random() * 1000, now - random.randint(3600, 86400 * 365))
+            for _ in range(n)
+        ]
+        await db.executemany("""
+            INSERT INTO wallet_trades (wallet_address, condition_id, outcome, side, entry_price, size_usd, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        await db.commit()
+        current += n
+    return current
+
+
+def pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+async def run(steps, events):
+    tmp = tempfile.mkdtemp(prefix="bench_db_")
+    database.DB_NAME = os.path.join(tmp, "bench.db")
+    await Database.init_db()
+
+    # Separate connection for bulk growth so the writer's batches stay realistic
+    grow_db = await aiosqlite.connect(database.DB_NAME)
+
+    table = Table(title="log_whale_activity vs wallet_trades size")
+    for col in ("rows", "hot p50 (µs)", "hot p99 (µs)", "flush (ms)", "legacy SELECT p50 (µs)"):
+        table.add_column(col, justify="right")
+
+    size = 0
+    now = int(time.time())
+    for target in steps:
+        size = await grow_table(grow_db, size, target, now)
+
+        hot = []
+        for i in range(events):
+            wallet = random.choice(WALLETS[:50])
+            condition = random.choice(CONDITIONS[:200])
+            start = time.perf_counter()
+            await Database.log_whale_activity(
+                wallet=wallet, condition_id=condition, token_id_yes="1", token_id_no="2",
+                title="bench", outcome="Yes", side="BUY", size=10.0, price=0.5, timestamp=now + i // 10
+            )
+            hot.append((time.perf_counter() - start) * 1e6)
+
+        start = time.perf_counter()
+        await Database.aggregator.flush_all()
+        await Database.writer.flush()
+        flush_ms = (time.perf_counter() - start) * 1e3
+
+        legacy = []
+        for _ in range(200):
+            params = (random.choice(WALLETS), random.choice(CONDITIONS), "BUY", "Yes", now - 60)
+            start = time.perf_counter()
+            cursor = await grow_db.execute(LEGACY_SELECT, params)
+            await cursor.fetchone()
+            legacy.append((time.perf_counter() - start) * 1e6)
+
+        table.add_row(f"{size:,}", f"{statistics.median(hot):.1f}", f"{pct(hot, 0.99):.1f}",
+                      f"{flush_ms:.2f}", f"{statistics.median(legacy):.1f}")
+
+    await grow_db.close()
+    await Database.close()
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, nargs="+", default=[0, 100_000, 1_000_000, 3_000_000])
+    parser.add_argument("--events", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(sorted(args.steps), args.events))
+
+
+if __name__ == "__main__":
+    main()
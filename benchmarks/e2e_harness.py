@@ -0,0 +1,398 @@
+"""
+Offline end-to-end benchmark with local stand-ins for every external API.
+
+One local aiohttp server plays data-api (/activity, /positions), the CLOB
+(/markets/{id}, /book, /tick-size, /neg-risk, /fee-rate, /price,
+/balance-allowance, /auth/derive-api-key, POST /order, market websocket) and
+Telegram (sendMessage), with configurable latency and 5xx/429 injection.
+Config's endpoint URLs are pointed at it and the real Tracker -> Dispatcher ->
+process_whale_activity -> Trader path runs unchanged, signing real orders with
+a throwaway key. No network access or funds are involved.
+
+Synthetic whale fills are injected at --fill-rate per second across the
+target wallets, each in a fresh market; the stand-in timestamps the injection
+and the matching order POST to measure detection-to-order latency.
+
+Each wallet count runs in its own subprocess (clean class-level caches, DB
+and RSS). Reported per run: detection-to-order p50/p99, order throughput,
+growth of the tracker's seen-activity ids and RSS, DB write cost.
+
+Usage:
+    python -m benchmarks.e2e_harness --wallets 10 100 1000 --duration 30 --fill-rate 5
+    python -m benchmarks.e2e_harness --wallets 100 --latency 0.05 --error-rate 0.02 --throttle-rate 0.02
+"""
+import argparse
+import asyncio
+import base64
+import functools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from aiohttp import web, WSMsgType
+from rich.console import Console
+from rich.table import Table
+
+out = Console()
+
+# Routes that take part in fault injection (auth/config endpoints stay reliable)
+FAULTY = ("/activity", "/positions", "/markets/", "/order", "/sendMessage")
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class StandIn:
+    """In-process fake of data-api, CLOB and Telegram."""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0, seed=1):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rng = random.Random(seed)
+
+        self.activity = {}      # wallet -> [activity dicts], oldest first
+        self.markets = {}       # condition_id -> (token_yes, token_no)
+        self.injected = {}      # token_id -> monotonic injection time
+        self.latencies = []     # injection -> order POST (seconds)
+
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.orders = 0
+        self.alerts = 0
+        self.runner = None
+        self.port = None
+
+    # --- synthetic data ---
+
+    def add_market(self):
+        condition_id = "0x" + os.urandom(32).hex()
+        tokens = (str(int.from_bytes(os.urandom(31), "big")), str(int.from_bytes(os.urandom(31), "big")))
+        self.markets[condition_id] = tokens
+        return condition_id, tokens
+
+    def add_activity(self, wallet, track=True):
+        condition_id, (token_yes, _) = self.add_market()
+        act = {
+            "id": uuid.uuid4().hex,
+            "type": "TRADE",
+            "side": "BUY",
+            "size": round(self.rng.uniform(50, 5000), 2),
+            "price": 0.5,
+            "asset": token_yes,
+            "conditionId": condition_id,
+            "title": f"Bench market {len(self.markets)}",
+            "outcome": "Yes",
+            "timestamp": int(time.time()),
+        }
+        self.activity.setdefault(wallet, []).append(act)
+        if track:
+            self.injected[token_yes] = time.monotonic()
+        return act
+
+    # --- server ---
+
+    @web.middleware
+    async def faults(self, request, handler):
+        self.requests += 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(max(0.0, self.rng.gauss(self.latency, self.jitter)))
+        if any(part in request.path for part in FAULTY):
+            roll = self.rng.random()
+            if roll < self.throttle_rate:
+                self.throttled += 1
+                return web.json_response({"error": "rate limited", "parameters": {"retry_after": 1}},
+                                         status=429, headers={"Retry-After": "1"})
+            if roll < self.throttle_rate + self.error_rate:
+                self.errors += 1
+                return web.json_response({"error": "injected"}, status=500)
+        return await handler(request)
+
+    async def get_activity(self, request):
+        q = request.query
+        items = self.activity.get(q.get("user"), [])
+        if "start" in q:
+            start = int(q["start"])
+            items = [a for a in items if a["timestamp"] >= start]
+        items = sorted(items, key=lambda a: a["timestamp"], reverse=True)
+        offset = int(q.get("offset", 0))
+        return web.json_response(items[offset:offset + int(q.get("limit", 100))])
+
+    async def get_positions(self, request):
+        return web.json_response([])
+
+    async def get_market(self, request):
+        tokens = self.markets.get(request.match_info["condition_id"])
+        if tokens is None:
+            return web.json_response({"error": "not found"}, status=404)
+        return web.json_response({"tokens": [
+            {"token_id": tokens[0], "outcome": "Yes"},
+            {"token_id": tokens[1], "outcome": "No"},
+        ]})
+
+    async def get_book(self, request):
+        return web.json_response({
+            "bids": [{"price": f"{0.49 - i / 100:.2f}", "size": "10000"} for i in range(10)],
+            "asks": [{"price": f"{0.50 + i / 100:.2f}", "size": "10000"} for i in range(10)],
+        })
+
+    async def post_order(self, request):
+        body = await request.json()
+        order = body.get("order", {})
+        injected_at = self.injected.pop(str(order.get("tokenId")), None)
+        if injected_at is not None:
+            self.latencies.append(time.monotonic() - injected_at)
+        self.orders += 1
+        maker = int(order.get("makerAmount", 0)) / 1e6
+        taker = int(order.get("takerAmount", 0)) / 1e6
+        return web.json_response({
+            "success": True, "orderID": "0x" + os.urandom(32).hex(), "status": "matched",
+            "makingAmount": str(maker), "takingAmount": str(taker),
+        })
+
+    async def market_ws(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                break
+        return ws
+
+    async def send_message(self, request):
+        self.alerts += 1
+        return web.json_response({"ok": True, "result": {}})
+
+    async def start(self):
+        def fixed(payload):
+            async def handler(request):
+                return web.json_response(payload)
+            return handler
+
+        app = web.Application(middlewares=[self.faults])
+        app.router.add_get("/activity", self.get_activity)
+        app.router.add_get("/positions", self.get_positions)
+        app.router.add_get("/markets/{condition_id}", self.get_market)
+        app.router.add_get("/book", self.get_book)
+        app.router.add_get("/tick-size", fixed({"minimum_tick_size": 0.01}))
+        app.router.add_get("/neg-risk", fixed({"neg_risk": False}))
+        app.router.add_get("/fee-rate", fixed({"base_fee": 0}))
+        app.router.add_get("/price", fixed({"price": "0.50"}))
+        app.router.add_get("/balance-allowance", fixed({"balance": str(10 ** 15), "allowances": {}}))
+        app.router.add_get("/auth/derive-api-key", fixed({
+            "apiKey": str(uuid.uuid4()),
+            "secret": base64.urlsafe_b64encode(os.urandom(32)).decode(),
+            "passphrase": uuid.uuid4().hex,
+        }))
+        app.router.add_post("/order", self.post_order)
+        app.router.add_get("/ws/market", self.market_ws)
+        app.router.add_post("/bot{token}/sendMessage", self.send_message)
+
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{self.port}"
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+
+async def run_once(args):
+    """One benchmark run in this process; returns a result dict."""
+    from eth_account import Account
+    import src.database
+    from src.config import Config, console
+
+    stand_in = StandIn(args.latency, args.jitter, args.error_rate, args.throttle_rate, args.seed)
+    base_url = await stand_in.start()
+
+    account = Account.create()
+    wallets = ["0x" + os.urandom(20).hex() for _ in range(args.wallets)]
+    for wallet in wallets:
+        for _ in range(3):
+            stand_in.add_activity(wallet, track=False)  # history, becomes the baseline
+
+    Config.POLYMARKET_DATA_API_URL = base_url
+    Config.POLYMARKET_CLOB_API_URL = base_url
+    Config.POLYMARKET_GAMMA_API_URL = base_url
+    Config.TELEGRAM_API_URL = base_url
+    Config.POLYMARKET_CLOB_WS_URL = f"ws://127.0.0.1:{stand_in.port}/ws/market"
+    Config.TELEGRAM_BOT_TOKEN = "bench"
+    Config.TELEGRAM_CHAT_ID = "1"
+    Config.PRIVATE_KEY = account.key.hex()
+    Config.MY_WALLET_ADDRESS = Config.FUNDER_ADDRESS = account.address
+    Config.SIGNATURE_TYPE = 0
+    Config.TARGET_WALLETS = wallets
+    Config.POLYGON_RPC_URL = None
+    Config.METRICS_PORT = 0
+    Config.BET_MODE = "FIXED"
+    Config.DATA_API_RATE_LIMIT = args.rate_limit
+    Config.DATA_API_BURST = args.rate_limit
+
+    tmpdir = tempfile.mkdtemp(prefix="pm_bench_")
+    src.database.DB_NAME = os.path.join(tmpdir, "bench.db")
+    console.quiet = True
+
+    from main import process_whale_activity
+    from src.context import AppContext
+    from src.database import Database
+    from src.dispatcher import Dispatcher
+    from src.metrics import Metrics
+    from src.tracker import Tracker
+
+    ctx = await AppContext.create()
+    ctx.dispatcher = Dispatcher(functools.partial(process_whale_activity, ctx=ctx))
+    ctx.dispatcher.start()
+    tracker = Tracker(process_transaction_callback=ctx.dispatcher.submit)
+    tracker_task = asyncio.create_task(tracker.start_monitoring())
+
+    # Baseline pass done once the scheduler exists
+    while tracker.scheduler is None:
+        await asyncio.sleep(0.05)
+    await ctx.dispatcher.join()
+
+    ids_before = len(tracker.dedup.recent)
+    rss_before = rss_mb()
+    requests_before = stand_in.requests
+
+    started = time.monotonic()
+    injected = 0
+    interval = 1.0 / args.fill_rate
+    while time.monotonic() - started < args.duration:
+        stand_in.add_activity(random.choice(wallets))
+        injected += 1
+        await asyncio.sleep(interval)
+
+    drain_deadline = time.monotonic() + args.drain
+    while stand_in.injected and time.monotonic() < drain_deadline:
+        await asyncio.sleep(0.05)
+    await ctx.dispatcher.join()
+    elapsed = time.monotonic() - started
+
+    db_stage = Metrics.histograms.get(("stage_seconds", (("stage", "db_log"),)))
+    writer = Database.writer.stats() if Database.writer else {}
+    result = {
+        "wallets": args.wallets,
+        "injected": injected,
+        "ordered": len(stand_in.latencies),
+        "missed": len(stand_in.injected),
+        "p50_ms": (percentile(stand_in.latencies, 0.50) or 0) * 1e3,
+        "p99_ms": (percentile(stand_in.latencies, 0.99) or 0) * 1e3,
+        "orders_per_s": len(stand_in.latencies) / elapsed,
+        "seen_ids_growth": len(tracker.dedup.recent) - ids_before,
+        "rss_growth_mb": rss_mb() - rss_before,
+        "db_log_avg_ms": (db_stage.sum / db_stage.count * 1e3) if db_stage and db_stage.count else 0.0,
+        "db_batches": writer.get("batches", 0),
+        "db_ops": writer.get("ops", 0),
+        "db_last_commit_ms": (writer.get("last_commit_time") or 0) * 1e3,
+        "api_requests": stand_in.requests - requests_before,
+        "injected_errors": stand_in.errors,
+        "injected_429s": stand_in.throttled,
+        "alerts": stand_in.alerts,
+    }
+
+    tracker_task.cancel()
+    await asyncio.gather(tracker_task, return_exceptions=True)
+    await ctx.close()
+    await stand_in.stop()
+    return result
+
+
+def run_child(args):
+    # The bot prints per activity; keep the child's stdout for the JSON result only
+    real_stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        result = asyncio.run(run_once(args))
+    finally:
+        sys.stdout = real_stdout
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--wallets", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of fill injection per run")
+    parser.add_argument("--drain", type=float, default=60.0, help="max seconds to wait for outstanding orders")
+    parser.add_argument("--fill-rate", type=float, default=5.0, help="injected whale fills per second")
+    parser.add_argument("--latency", type=float, default=0.0, help="mean stand-in response latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="latency std deviation (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 500s on faulty routes")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of 429s on faulty routes")
+    parser.add_argument("--rate-limit", type=float, default=500.0, help="DATA_API_RATE_LIMIT for the run (req/s)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print raw JSON results")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        args.wallets = args.wallets[0]
+        run_child(args)
+        return
+
+    results = []
+    for count in args.wallets:
+        cmd = [sys.executable, "-m", "benchmarks.e2e_harness", "--child", "--wallets", str(count)]
+        for flag in ("duration", "drain", "fill_rate", "latency", "jitter", "error_rate", "throttle_rate", "rate_limit", "seed"):
+            cmd += ["--" + flag.replace("_", "-"), str(getattr(args, flag))]
+        out.print(f"[cyan]Running {count} wallets...[/cyan]")
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            out.print(f"[red]Run with {count} wallets failed:[/red]\n{proc.stderr[-2000:]}")
+            continue
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    table = Table(title="Detection -> order (local stand-ins)")
+    rows = [
+        ("injected fills", "injected", "{}"), ("orders placed", "ordered", "{}"), ("missed", "missed", "{}"),
+        ("p50 detection->order (ms)", "p50_ms", "{:.1f}"), ("p99 detection->order (ms)", "p99_ms", "{:.1f}"),
+        ("orders/s", "orders_per_s", "{:.2f}"), ("seen ids growth", "seen_ids_growth", "{}"),
+        ("RSS growth (MB)", "rss_growth_mb", "{:+.1f}"), ("db_log avg (ms)", "db_log_avg_ms", "{:.2f}"),
+        ("DB ops / batches", None, None), ("last commit (ms)", "db_last_commit_ms", "{:.2f}"),
+        ("API requests", "api_requests", "{}"), ("injected 429s / 5xx", None, None),
+        ("Telegram messages", "alerts", "{}"),
+    ]
+    table.add_column("wallets")
+    for result in results:
+        table.add_column(str(result["wallets"]), justify="right")
+    for label, key, fmt in rows:
+        if label.startswith("DB ops"):
+            cells = [f"{r['db_ops']} / {r['db_batches']}" for r in results]
+        elif label.startswith("injected 429s"):
+            cells = [f"{r['injected_429s']} / {r['injected_errors']}" for r in results]
+        else:
+            cells = [fmt.format(r[key]) for r in results]
+        table.add_row(label, *cells)
+    out.print(table)
+
+
+if __name__ == "__main__":
+    main()
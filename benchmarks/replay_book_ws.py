@@ -0,0 +1,88 @@
+"""
+Replays recorded CLOB market-channel messages through OrderBookMirror.
+
+The input is a JSON list of raw websocket messages (`book` and `price_change`
+events, as captured from the market channel). They are served from a local
+websocket server the mirror connects to, so the full receive/decode/apply path
+runs without touching Polymarket. Reports apply throughput and walks the
+resulting books for a sample order.
+
+Usage:
+    python -m benchmarks.replay_book_ws messages.json --amount 100 --side BUY
+"""
+import argparse
+import asyncio
+import json
+import time
+import websockets
+from rich.console import Console
+
+from src.config import Config
+from src.orderbook import OrderBook, OrderBookMirror, slippage_limit
+
+console = Console()
+
+
+async def run(path, amount, side):
+    with open(path) as f:
+        messages = json.load(f)
+
+    token_ids = set()
+    for msg in messages:
+        for item in msg if isinstance(msg, list) else [msg]:
+            if item.get("asset_id"):
+                token_ids.add(item["asset_id"])
+            for change in item.get("price_changes", []):
+                token_ids.add(change.get("asset_id"))
+    token_ids.discard(None)
+
+    done = asyncio.Event()
+
+    async def serve(ws):
+        await ws.recv()  # subscription message
+        for msg in messages:
+            await ws.send(json.dumps(msg))
+        done.set()
+        await ws.wait_closed()
+
+    async with websockets.serve(serve, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        mirror = OrderBookMirror(ws_url=f"ws://127.0.0.1:{port}")
+        # Register books without REST snapshots: the recording carries its own `book` events
+        for token_id in token_ids:
+            mirror.books[token_id] = OrderBook(token_id)
+        mirror._changed.set()
+
+        start = time.perf_counter()
+        task = mirror.start()
+        await done.wait()
+        while mirror.messages < len(messages):
+            await asyncio.sleep(0.001)
+        elapsed = time.perf_counter() - start
+        task.cancel()
+
+    console.print(f"[green]{mirror.messages} messages ({mirror.deltas} deltas) applied in {elapsed * 1e3:.1f} ms "
+                  f"({mirror.messages / elapsed:,.0f} msg/s)[/green]")
+
+    for token_id, book in mirror.books.items():
+        best = book.best_ask() if side == "BUY" else book.best_bid()
+        if best is None:
+            console.print(f"{token_id[:10]}...: empty {side} side")
+            continue
+        limit = slippage_limit(best, side, Config.SLIPPAGE_TOLERANCE, 0.01)
+        vwap, filled, shares, worst = book.walk(side, amount, limit_price=limit)
+        console.print(f"{token_id[:10]}...: best {best:.3f} limit {limit:.3f} -> "
+                      f"filled {filled:.2f}/{amount:.2f}, VWAP {vwap or 0:.4f}, worst {worst}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--amount", type=float, default=100.0, help="USDC for BUY, shares for SELL")
+    parser.add_argument("--side", choices=["BUY", "SELL"], default="BUY")
+    args = parser.parse_args()
+    asyncio.run(run(args.path, args.amount, args.side))
+
+
+if __name__ == "__main__":
+    main()
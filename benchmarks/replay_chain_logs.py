@@ -0,0 +1,69 @@
+"""
+Replays recorded OrderFilled logs through ChainTracker without a node.
+
+The input is a JSON list of raw eth_getLogs results (e.g. captured from a
+Polygon RPC or a local anvil fork). Block timestamps come from the recording
+when a `blockTimestamp` field is present. Reports decode throughput and prints
+the activity dicts the trade callback would receive.
+
+Usage:
+    python -m benchmarks.replay_chain_logs logs.json --targets 0xabc...,0xdef...
+"""
+import argparse
+import asyncio
+import json
+import time
+from rich.console import Console
+
+from src.chain_tracker import ChainTracker
+from src.config import Config
+
+console = Console()
+
+
+class RecordedRpc:
+    """Stands in for JsonRpc: serves block timestamps from the recording."""
+
+    def __init__(self, logs):
+        self.timestamps = {}
+        for log in logs:
+            if "blockTimestamp" in log:
+                self.timestamps[int(log["blockNumber"], 16)] = int(log["blockTimestamp"], 16)
+
+    async def block_timestamps(self, blocks):
+        return {b: self.timestamps.get(b) for b in blocks}
+
+
+async def run(path, targets, quiet):
+    with open(path) as f:
+        logs = json.load(f)
+
+    if targets:
+        Config.TARGET_WALLETS = targets
+
+    received = []
+
+    async def callback(act):
+        received.append(act)
+        if not quiet:
+            console.print(act)
+
+    tracker = ChainTracker(callback, rpc=RecordedRpc(logs))
+    start = time.perf_counter()
+    await tracker.replay_logs(logs)
+    elapsed = time.perf_counter() - start
+    console.print(f"[green]{len(logs)} logs -> {len(received)} activities in {elapsed * 1e3:.1f} ms[/green]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--targets", default="", help="comma-separated wallets (defaults to TARGET_WALLETS)")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args()
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    asyncio.run(run(args.path, targets, args.quiet))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Lets the tests under tests/ import the `src` package from the repo root.
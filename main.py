@@ -1,4 +1,5 @@
 import asyncio
+import functools
 import sys
 import time
 from rich.console import Console
@@ -6,21 +7,26 @@ from rich.panel import Panel
 
 from src.config import Config
 from src.tracker import Tracker
-from src.notifier import Notifier
-from src.trader import Trader
+from src.chain_tracker import ChainTracker
 from src.database import Database
 from src.market_api import MarketAPI
 from src.redeemer import Redeemer
+from src.resolution_watcher import ResolutionWatcher
+from src.context import AppContext
+from src.dispatcher import Dispatcher
+from src.metrics import Metrics
 
 console = Console()
 
-async def process_whale_activity(act):
+async def process_whale_activity(act, ctx: AppContext):
     """
     Callback function triggered when the Tracker detects a relevant activity.
-    Receives an 'activity' dictionary from the Polymarket API.
+    Receives an 'activity' dictionary from the Polymarket API and the
+    long-lived AppContext holding the warmed Trader/Notifier/HTTP session.
     """
-    notifier = Notifier()
-    trader = Trader()
+    notifier = ctx.notifier
+    trader = ctx.trader
+    started = time.monotonic()
     
     # Extract data from API activity object
     act_id = act.get('asset', 'unknown_id')
@@ -55,67 +61,117 @@ async def process_whale_activity(act):
     
     if condition_id:
         # Fetch token IDs (YES/NO) from Gamma API
-        token_id_yes, token_id_no = await MarketAPI.get_token_ids(condition_id)
+        with Metrics.stage("token_ids"):
+            token_id_yes, token_id_no = await MarketAPI.get_token_ids(condition_id)
+        # Start fetching tick size / neg-risk / price and mirroring the traded book now, while we log and notify
+        if side in ["BUY", "SELL"]:
+            trader.prewarm_market([token_id_yes, token_id_no], trade_token_id=_trade_token(act, outcome, token_id_yes, token_id_no))
         
-        await Database.log_whale_activity(
-            wallet=wallet, 
-            condition_id=condition_id,
-            token_id_yes=token_id_yes,
-            token_id_no=token_id_no,
-            title=title, 
-            outcome=outcome, 
-            side=side, 
-            size=size, 
-            price=price,
-            timestamp=timestamp
-        )
+        with Metrics.stage("db_log"):
+            await Database.log_whale_activity(
+                wallet=wallet, 
+                condition_id=condition_id,
+                token_id_yes=token_id_yes,
+                token_id_no=token_id_no,
+                title=title, 
+                outcome=outcome, 
+                side=side, 
+                size=size, 
+                price=price,
+                timestamp=timestamp,
+                outcome_index=act.get('outcomeIndex')
+            )
     else:
         console.print("[red]⚠️ Skipping DB log: No conditionId found in activity[/red]")
     
     # ------------------
 
-    # 2. Notify
+    # 2. Notify (queued: fills from the same whale/market are coalesced into one digest)
     msg = f"🐋 **WHALE ALERT**\nAddress: `{wallet}`\nAction: {side} {outcome}\nMarket: {title}\nPrice: ${price:.3f}\nSize: {size}"
-    await notifier.send_alert(msg)
+    with Metrics.stage("notify"):
+        notifier.send_alert(msg, key=(wallet, condition_id))
     
     # 3. Trade
     # Trade both BUY and SELL
     if side in ["BUY", "SELL"]:
         
         # Determine the correct token_id to trade based on outcome
-        if outcome.lower() == "yes" and token_id_yes:
-            trade_token_id = token_id_yes
-        elif outcome.lower() == "no" and token_id_no:
-            trade_token_id = token_id_no
-        else:
-            # Fallback to whatever 'asset' was in the activity, or None
-            trade_token_id = act.get('asset') or act.get('asset_id')
+        trade_token_id = _trade_token(act, outcome, token_id_yes, token_id_no)
 
         # We pass 'outcome' or 'asset' as token_id for now since API might not give raw ID
         token_identifier = f"{title} [{outcome}]" 
         
-        if trade_token_id:
-            await trader.execute_copy_trade(token_id=trade_token_id, target_name=token_identifier, original_amount=size, side=side)
+        # Wallet quality gate (in-memory score, no DB query). SELLs always follow so we can exit.
+        size_multiplier = 1.0
+        filtered = side == "BUY" and ctx.scorer is not None and not ctx.scorer.allows(wallet)
+        if side == "BUY" and ctx.scorer is not None and Config.SCORE_SCALING:
+            size_multiplier = ctx.scorer.bet_multiplier(wallet)
+
+        # Consensus gate: every fill feeds the market's window; a BUY is copied once enough whales agree.
+        # Without a condition_id there is no window to check, so only copy when the gate is off.
+        if condition_id:
+            agreed = ctx.consensus.observe(condition_id, outcome, wallet, side, size * price, timestamp=timestamp)
+        else:
+            agreed = not ctx.consensus.enabled
+
+        if filtered:
+            console.print(f"[yellow]⚠ Wallet {wallet[:8]} score {ctx.scorer.score(wallet):.2f} below MIN_WALLET_SCORE. Skipping copy.[/yellow]")
+            Metrics.inc("copies_filtered_total", reason="score")
+        elif side == "BUY" and not agreed:
+            window = ctx.consensus.window_state(condition_id, outcome) or {}
+            console.print(f"[dim]Waiting for consensus on {token_identifier}: {window.get('agreeing_wallets', 0)} wallets, "
+                          f"${window.get('net_flow_usd', 0):,.2f} net flow. Skipping copy.[/dim]")
+            Metrics.inc("copies_filtered_total", reason="consensus")
+        elif trade_token_id:
+            with Metrics.stage("trade"):
+                await trader.execute_copy_trade(token_id=trade_token_id, target_name=token_identifier, original_amount=size, side=side,
+                                                condition_id=condition_id, outcome=outcome, whale_timestamp=timestamp,
+                                                size_multiplier=size_multiplier)
         else:
             console.print(f"[red]Could not determine token_id for trade on {token_identifier}[/red]")
 
+    Metrics.observe("stage_seconds", time.monotonic() - started, stage="process")
+
+def _trade_token(act, outcome, token_id_yes, token_id_no):
+    """Token we copy for this activity: the YES/NO token matching the outcome, else the activity's asset."""
+    if outcome.lower() == "yes" and token_id_yes:
+        return token_id_yes
+    if outcome.lower() == "no" and token_id_no:
+        return token_id_no
+    # Fallback to whatever 'asset' was in the activity, or None
+    return act.get('asset') or act.get('asset_id')
+
 async def main():
     console.print(Panel("Polymarket Copy Trading Bot", subtitle="v1.0.0", style="bold green"))
     
     # 1. Validate Config
     if not Config.validate():
         sys.exit(1)
-    await Database.init_db()  # Initialize the database (creates tables if not exist)
     # 2. Initialize Modules
-    tracker = Tracker(process_transaction_callback=process_whale_activity)
+    # Long-lived services: DB (creates tables if not exist), authenticated CLOB client, notifier, pooled HTTP
+    ctx = await AppContext.create()
+
+    # Detection -> bounded queue -> worker pool (same market stays ordered, markets run in parallel)
+    ctx.dispatcher = Dispatcher(functools.partial(process_whale_activity, ctx=ctx))
+    ctx.dispatcher.start()
+    if Config.TRACKER_MODE == "CHAIN":
+        tracker = ChainTracker(process_transaction_callback=ctx.dispatcher.submit)
+    else:
+        tracker = Tracker(process_transaction_callback=ctx.dispatcher.submit)
+        Metrics.register("data_api", tracker.rate_limiter.stats)
+        Metrics.register("scheduler", lambda: tracker.scheduler.stats() if tracker.scheduler else {})
+        Metrics.register("dedup", tracker.dedup.stats)
     
-    # Run a redemption check on startup
-    trader = Trader()
-    redeemer = Redeemer(trader)
+    # Redemption sweeps: on startup, then every REDEEM_INTERVAL
+    redeemer = Redeemer(ctx.trader)
+    Metrics.register("redeemer", redeemer.stats)
     
     console.print("[yellow]Checking for redeemable positions...[/yellow]")
-    # We create a task for this so it runs async but doesn't block main loop if slow
-    asyncio.create_task(redeemer.check_and_redeem())
+    if redeemer.rpc and Config.REDEEM_MODE == "EVENTS":
+        # Redeem the moment a held market resolves instead of polling payouts
+        redeemer.event_driven = True
+        ctx.add_task(ResolutionWatcher(redeemer).start())
+    ctx.add_task(redeemer.start())
 
     # 3. Start Loop
     try:
@@ -124,6 +180,8 @@ async def main():
         console.print("\n[bold yellow]Shutting down...[/bold yellow]")
     except Exception as e:
         console.print(f"[bold red]Fatal Error: {e}[/bold red]")
+    finally:
+        await ctx.close()
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,327 @@
+"""
+Replays logged whale fills (wallet_trades) through the bot's sizing rule and
+reports what copying each wallet would have returned.
+
+    python -m src.backtest --modes FIXED PERCENTAGE --bankroll 1000
+    python -m src.backtest --since 2024-01-01 --isolated --top 20 --json report.json
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from rich.table import Table
+
+from src.config import Config, console
+from src.database import Database
+from src.trader import Trader
+
+
+def _factorize(values, order):
+    """Integer codes for a column of labels (dict lookups; much faster than sorting strings)."""
+    index = {}
+    codes = np.fromiter((index.setdefault(v, len(index)) for v in values), dtype=np.int64)
+    return np.fromiter(index, dtype=object, count=len(index)), codes[order]
+
+
+class Backtester:
+    """
+    Vectorized copy-trading replay.
+
+    Mirrors the live behaviour: every whale BUY is copied with
+    `Trader.bet_size`, and a whale SELL closes all our shares of that token.
+    Buys fill at the whale's price plus `slippage` (sells minus it), with
+    `fee_bps` charged on each leg. Positions still open at the end are marked
+    at the last price seen for that outcome in the data.
+
+    Because a copy's return per dollar doesn't depend on its size, returns are
+    computed for all fills at once with NumPy; only sizing walks forward in
+    `epoch`-second steps so PERCENTAGE mode can compound on the cash balance.
+    """
+
+    def __init__(self, wallets, condition_ids, outcomes, sides, prices, timestamps,
+                 slippage=None, fee_bps=0.0, isolated=False):
+        self.slippage = Config.SLIPPAGE_TOLERANCE if slippage is None else slippage
+        self.fee = fee_bps / 10_000
+        self.isolated = isolated
+
+        order = np.argsort(np.asarray(timestamps, dtype=np.int64), kind="stable")
+        self.wallet_names, self.wallet = _factorize(wallets, order)
+        self.market_names, self.market = _factorize(zip(condition_ids, outcomes), order)
+        side_names, side = _factorize(sides, order)
+        self.is_buy = np.array([str(name).upper() == "BUY" for name in side_names], dtype=bool)[side]
+        self.price = np.asarray(prices, dtype=np.float64)[order]
+        self.ts = np.asarray(timestamps, dtype=np.int64)[order]
+        self._prepare()
+
+    @classmethod
+    async def from_db(cls, since=None, until=None, wallets=None, **kwargs):
+        query = "SELECT wallet_address, condition_id, outcome, side, entry_price, timestamp FROM wallet_trades WHERE entry_price > 0"
+        params = []
+        if since is not None:
+            query += " AND timestamp >= ?"
+            params.append(since)
+        if until is not None:
+            query += " AND timestamp < ?"
+            params.append(until)
+        if wallets:
+            query += f" AND wallet_address IN ({','.join('?' * len(wallets))})"
+            params.extend(wallets)
+        rows = await Database.fetchall(query + " ORDER BY timestamp, id", params)
+        if not rows:
+            return None
+        columns = list(zip(*rows))
+        return cls(columns[0], columns[1], columns[2], columns[3], columns[4], columns[5], **kwargs)
+
+    def _prepare(self):
+        """Per-buy exit price/time and return per dollar (independent of bet size)."""
+        n = len(self.ts)
+        self.end_ts = int(self.ts.max()) if n else 0
+
+        # Group rows by position (token, or token + wallet when isolated), time-ordered within each
+        key = self.market * len(self.wallet_names) + self.wallet if self.isolated else self.market
+        order = np.lexsort((np.arange(n), key))
+        k, sell = key[order], ~self.is_buy[order]
+
+        # A segment is a run of buys closed by the next sell on the same position
+        starts = np.ones(n, dtype=bool)
+        starts[1:] = (k[1:] != k[:-1]) | sell[:-1]
+        segment = np.cumsum(starts) - 1
+        last = np.ones(n, dtype=bool)
+        last[:-1] = segment[1:] != segment[:-1]
+
+        # Mark = each market's last fill across all wallets: first occurrence in the reversed (time-ordered) rows.
+        # Repeated fancy-index writes have no guaranteed winner, so reduce explicitly.
+        mark = np.zeros(len(self.market_names))
+        markets, first_reversed = np.unique(self.market[::-1], return_index=True)
+        mark[markets] = self.price[len(self.market) - 1 - first_reversed]
+
+        closed = sell[last]
+        close_rows = order[last]
+        exit_price = np.where(closed, self.price[close_rows] * (1 - self.slippage), mark[self.market[close_rows]])
+        exit_ts = np.where(closed, self.ts[close_rows], self.end_ts)
+
+        buys = order[~sell]
+        buy_segment = segment[~sell]
+        by_time = np.argsort(buys, kind="stable")  # back to chronological order
+        buys, buy_segment = buys[by_time], buy_segment[by_time]
+
+        self.buy_wallet = self.wallet[buys]
+        self.buy_ts = self.ts[buys]
+        self.buy_closed = closed[buy_segment]
+        self.exit_ts = exit_ts[buy_segment]
+        fill = np.minimum(self.price[buys] * (1 + self.slippage), 1.0)
+        self.returns = (exit_price[buy_segment] * (1 - self.fee)) / (fill * (1 + self.fee)) - 1
+
+    def _size(self, mode, bankroll, bet_percentage, fixed_amount, epoch):
+        """Bet size per buy. Cash is re-read at each epoch boundary (closes inside an epoch count from the next)."""
+        sizes = np.zeros(len(self.buy_ts))
+        exit_order = np.argsort(self.exit_ts, kind="stable")
+        epochs, bounds = np.unique(self.buy_ts // epoch, return_index=True)
+        bounds = np.append(bounds, len(self.buy_ts))
+        # Positions closed before each epoch starts (all of them were sized in earlier epochs)
+        released = np.searchsorted(self.exit_ts[exit_order], epochs * epoch, side="left")
+        ramp = np.arange(int(np.diff(bounds).max()) if len(epochs) else 0)
+        if mode == "PERCENTAGE":
+            # Each buy within an epoch spends a fraction of what the previous ones left
+            ramp = (1 - bet_percentage) ** ramp
+        else:
+            fixed = Trader.bet_size(mode, None, bet_percentage, fixed_amount)
+            ramp = fixed * ramp
+
+        cash, done = bankroll, 0
+        for i in range(len(epochs)):
+            start, stop = bounds[i], bounds[i + 1]
+            if released[i] > done:
+                closing = exit_order[done:released[i]]
+                cash += float(sizes[closing] @ (1 + self.returns[closing]))
+                done = released[i]
+
+            if mode == "PERCENTAGE":
+                batch = Trader.bet_size(mode, max(cash, 0) * ramp[:stop - start], bet_percentage, fixed_amount)
+            else:
+                batch = np.clip(cash - ramp[:stop - start], 0, fixed)
+            batch[batch < Config.MIN_ORDER_SIZE] = 0
+            sizes[start:stop] = batch
+            cash -= float(batch.sum())
+        return sizes
+
+    def run(self, mode=None, bankroll=1000.0, bet_percentage=None, fixed_amount=None, epoch=3600):
+        mode = (mode or Config.BET_MODE).upper()
+        bet_percentage = Config.BET_PERCENTAGE if bet_percentage is None else bet_percentage
+        fixed_amount = Config.BET_AMOUNT_USDC if fixed_amount is None else fixed_amount
+
+        sizes = self._size(mode, bankroll, bet_percentage, fixed_amount, epoch)
+        pnl = sizes * self.returns
+        copied = sizes > 0
+        w = len(self.wallet_names)
+
+        # Equity curve: each copy's PnL lands when its position closes
+        order = np.argsort(self.exit_ts, kind="stable")
+        equity = bankroll + np.cumsum(pnl[order])
+        peak = np.maximum.accumulate(np.concatenate(([bankroll], equity)))[1:]
+        drawdown = peak - equity
+
+        per_wallet = {
+            "pnl": np.bincount(self.buy_wallet, weights=pnl, minlength=w),
+            "realized_pnl": np.bincount(self.buy_wallet, weights=pnl * self.buy_closed, minlength=w),
+            "invested": np.bincount(self.buy_wallet, weights=sizes, minlength=w),
+            "copies": np.bincount(self.buy_wallet, weights=copied, minlength=w),
+            "wins": np.bincount(self.buy_wallet, weights=copied & (pnl > 0), minlength=w),
+            "max_drawdown": self._wallet_drawdowns(pnl, order),
+        }
+        invested = float(sizes.sum())
+        copies = int(copied.sum())
+        return {
+            "mode": mode,
+            "bankroll": bankroll,
+            "copies": copies,
+            "skipped": int(len(sizes) - copies),
+            "invested": invested,
+            "pnl": float(pnl.sum()),
+            "realized_pnl": float((pnl * self.buy_closed).sum()),
+            "roi": float(pnl.sum() / invested) if invested else 0.0,
+            "hit_rate": float((pnl[copied] > 0).mean()) if copies else 0.0,
+            "final_equity": bankroll + float(pnl.sum()),
+            "max_drawdown": float(drawdown.max()) if len(drawdown) else 0.0,
+            "max_drawdown_pct": float((drawdown / peak).max()) if len(drawdown) else 0.0,
+            "wallets": per_wallet,
+        }
+
+    def _wallet_drawdowns(self, pnl, order):
+        """Max drawdown of each wallet's own cumulative PnL curve, without a per-wallet loop."""
+        w = len(self.wallet_names)
+        if not len(pnl):
+            return np.zeros(w)
+        group = self.buy_wallet[order]
+        by_wallet = np.argsort(group, kind="stable")  # keeps exit-time order inside each wallet
+        group, values = group[by_wallet], pnl[order][by_wallet]
+
+        curve = np.cumsum(values)
+        starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+        lengths = np.diff(np.append(starts, len(values)))
+        curve -= np.repeat(curve[starts] - values[starts], lengths)  # restart the sum at each wallet
+
+        # Lift each wallet's curve above the previous one so one running max serves all of them
+        span = curve.max() - min(curve.min(), 0) + 1
+        lifted = curve + group * span
+        peak = np.maximum(np.maximum.accumulate(lifted), group * span)  # each wallet's peak starts at 0 PnL
+        drawdowns = np.zeros(w)
+        np.maximum.at(drawdowns, group, peak - lifted)
+        return drawdowns
+
+    def wallet_rows(self, result, top=None):
+        """Per-wallet report rows, best PnL first."""
+        stats = result["wallets"]
+        order = np.argsort(-stats["pnl"], kind="stable")
+        rows = []
+        for i in order:
+            copies = int(stats["copies"][i])
+            if not copies:
+                continue
+            invested = float(stats["invested"][i])
+            rows.append({
+                "wallet": str(self.wallet_names[i]),
+                "copies": copies,
+                "invested": invested,
+                "pnl": float(stats["pnl"][i]),
+                "realized_pnl": float(stats["realized_pnl"][i]),
+                "roi": float(stats["pnl"][i] / invested) if invested else 0.0,
+                "hit_rate": float(stats["wins"][i] / copies),
+                "max_drawdown": float(stats["max_drawdown"][i]),
+            })
+        return rows[:top] if top else rows
+
+
+def _parse_date(value):
+    if value is None:
+        return None
+    if value.isdigit():
+        return int(value)
+    return int(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp())
+
+
+def print_report(backtester, results, top):
+    summary = Table(title="Backtest summary")
+    summary.add_column("Metric")
+    for result in results:
+        summary.add_column(result["mode"], justify="right")
+    for label, key, fmt in (
+        ("Copies", "copies", "{:,}"),
+        ("Skipped (no balance)", "skipped", "{:,}"),
+        ("Invested (USDC)", "invested", "{:,.2f}"),
+        ("PnL (USDC)", "pnl", "{:+,.2f}"),
+        ("  realized", "realized_pnl", "{:+,.2f}"),
+        ("ROI", "roi", "{:+.2%}"),
+        ("Hit rate", "hit_rate", "{:.1%}"),
+        ("Final equity", "final_equity", "{:,.2f}"),
+        ("Max drawdown (USDC)", "max_drawdown", "{:,.2f}"),
+        ("Max drawdown", "max_drawdown_pct", "{:.1%}"),
+    ):
+        summary.add_row(label, *(fmt.format(r[key]) for r in results))
+    console.print(summary)
+
+    for result in results:
+        table = Table(title=f"Top wallets ({result['mode']})")
+        for column in ("Wallet", "Copies", "Invested", "PnL", "ROI", "Hit rate", "Max DD"):
+            table.add_column(column, justify="left" if column == "Wallet" else "right")
+        for row in backtester.wallet_rows(result, top):
+            color = "green" if row["pnl"] >= 0 else "red"
+            table.add_row(
+                row["wallet"][:10] + "...", f"{row['copies']:,}", f"{row['invested']:,.2f}",
+                f"[{color}]{row['pnl']:+,.2f}[/{color}]", f"{row['roi']:+.1%}", f"{row['hit_rate']:.0%}",
+                f"{row['max_drawdown']:,.2f}"
+            )
+        console.print(table)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["FIXED", "PERCENTAGE"], help="BET_MODE settings to compare")
+    parser.add_argument("--bankroll", type=float, default=1000.0, help="starting USDC balance")
+    parser.add_argument("--bet-amount", type=float, default=Config.BET_AMOUNT_USDC)
+    parser.add_argument("--bet-percentage", type=float, default=Config.BET_PERCENTAGE)
+    parser.add_argument("--slippage", type=float, default=Config.SLIPPAGE_TOLERANCE, help="fractional price penalty per fill")
+    parser.add_argument("--fee-bps", type=float, default=0.0)
+    parser.add_argument("--epoch", type=int, default=3600, help="seconds between balance refreshes for sizing")
+    parser.add_argument("--since", help="ISO date or unix time")
+    parser.add_argument("--until", help="ISO date or unix time")
+    parser.add_argument("--wallets", nargs="*", help="restrict to these wallet addresses")
+    parser.add_argument("--isolated", action="store_true", help="only a wallet's own SELL closes the copies it triggered")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", help="also write the full report to this path")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    backtester = await Backtester.from_db(
+        since=_parse_date(args.since), until=_parse_date(args.until), wallets=args.wallets,
+        slippage=args.slippage, fee_bps=args.fee_bps, isolated=args.isolated
+    )
+    if backtester is None:
+        console.print("[yellow]No wallet_trades in range. Nothing to replay.[/yellow]")
+        return
+    loaded = time.perf_counter()
+
+    results = [
+        backtester.run(mode, bankroll=args.bankroll, bet_percentage=args.bet_percentage,
+                       fixed_amount=args.bet_amount, epoch=args.epoch)
+        for mode in args.modes
+    ]
+    console.print(f"[dim]Replayed {len(backtester.ts):,} fills from {len(backtester.wallet_names):,} wallets "
+                  f"(load {loaded - started:.2f}s, {len(results)} run(s) {time.perf_counter() - loaded:.2f}s)[/dim]")
+    print_report(backtester, results, args.top)
+
+    if args.json:
+        report = [
+            {**{k: v for k, v in r.items() if k != "wallets"}, "wallets": backtester.wallet_rows(r)}
+            for r in results
+        ]
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        console.print(f"[green]Report written to {args.json}[/green]")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
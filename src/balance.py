@@ -0,0 +1,150 @@
+import asyncio
+import itertools
+import time
+from src.config import Config, console
+
+
+class BalanceManager:
+    """
+    Cached USDC balance with local debit/credit accounting.
+
+    Sizing reads the cached balance instead of calling get_balance_allowance
+    before every BUY. Orders reserve funds while in flight (so concurrent buys
+    can't oversubscribe), settle the actual spend when they fill, and SELL
+    proceeds are credited back. The cache is resynced from the exchange on a
+    timer or after BALANCE_RESYNC_TRADES settled trades; the difference found at
+    each resync is kept as `last_drift`. A resync whose fetch overlapped a
+    reserve/settle/credit is discarded and retried, since the exchange figure
+    may or may not include that change.
+    """
+
+    def __init__(self, trader):
+        self.trader = trader
+        self.balance = 0.0
+        self.reservations = {}
+        self.synced_at = None
+        self.last_drift = 0.0
+        self.max_drift = 0.0
+        self.trades_since_sync = 0
+        self.resync_retries = 0
+        self._seq = 0  # bumped by every local change to funds; a resync must not straddle one
+        self._ids = itertools.count(1)
+        self._resync_now = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    @property
+    def synced(self):
+        return self.synced_at is not None
+
+    @property
+    def reserved(self):
+        return sum(self.reservations.values())
+
+    def available(self):
+        return max(0.0, self.balance - self.reserved)
+
+    def reserve(self, amount):
+        """Earmarks up to `amount` USDC for an order. Returns (reservation_id, reserved_amount)."""
+        amount = min(amount, self.available())
+        if amount <= 0:
+            return None, 0.0
+        rid = next(self._ids)
+        self.reservations[rid] = amount
+        self._seq += 1
+        return rid, amount
+
+    def release(self, rid):
+        """Drops a reservation whose order didn't fill."""
+        self.reservations.pop(rid, None)
+
+    def settle(self, rid, spent):
+        """Converts a reservation into an actual debit."""
+        self.reservations.pop(rid, None)
+        self.balance -= spent
+        self._seq += 1
+        self._count_trade()
+
+    def credit(self, amount):
+        """Adds SELL proceeds (or redemptions) to the cached balance."""
+        self.balance += amount
+        self._seq += 1
+        self._count_trade()
+
+    def request_resync(self):
+        """Ask the background task to resync as soon as possible."""
+        self._resync_now.set()
+
+    def _count_trade(self):
+        self.trades_since_sync += 1
+        if self.trades_since_sync >= Config.BALANCE_RESYNC_TRADES:
+            self._resync_now.set()
+
+    async def resync(self, attempts=3):
+        """
+        Pulls the authoritative balance from the exchange and records the drift.
+        Returns None (and asks for a later resync) if the fetch failed or local
+        spends kept landing while it was in flight.
+        """
+        async with self._lock:
+            for _ in range(attempts):
+                seq = self._seq
+                authoritative = await self.trader.get_wallet_balance()
+                if authoritative is None:
+                    return None
+                if self._seq == seq:
+                    break
+                self.resync_retries += 1
+            else:
+                self._resync_now.set()
+                return None
+            if self.synced:
+                self.last_drift = authoritative - self.balance
+                self.max_drift = max(self.max_drift, abs(self.last_drift))
+                if abs(self.last_drift) >= 0.01:
+                    console.print(f"[dim]Balance resync: drift {self.last_drift:+.2f} USDC[/dim]")
+            self.balance = authoritative
+            self.synced_at = time.time()
+            self.trades_since_sync = 0
+            return authoritative
+
+    async def check_drift(self):
+        """Fetches the exchange balance without adopting it; returns authoritative - cached."""
+        authoritative = await self.trader.get_wallet_balance()
+        if authoritative is None:
+            return None
+        return authoritative - self.balance
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._resync_now.wait(), timeout=Config.BALANCE_RESYNC_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._resync_now.clear()
+            if self.reservations:
+                # Orders in flight: the exchange balance would be mid-update. Try again shortly.
+                await asyncio.sleep(1)
+                self._resync_now.set()
+                continue
+            try:
+                await self.resync()
+            except Exception as e:
+                console.print(f"[red]Balance resync failed: {e}[/red]")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    def stats(self):
+        return {
+            "balance": self.balance,
+            "reserved": self.reserved,
+            "available": self.available(),
+            "last_drift": self.last_drift,
+            "max_drift": self.max_drift,
+            "trades_since_sync": self.trades_since_sync,
+            "resync_retries": self.resync_retries,
+            "synced_at": self.synced_at,
+        }
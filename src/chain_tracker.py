@@ -0,0 +1,211 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from web3 import Web3
+from src.config import Config, console
+from src.database import Database
+from src.market_api import MarketAPI
+from src.rpc import JsonRpc
+
+# CTF Exchange: OrderFilled(bytes32 indexed orderHash, address indexed maker, address indexed taker,
+#                           uint256 makerAssetId, uint256 takerAssetId,
+#                           uint256 makerAmountFilled, uint256 takerAmountFilled, uint256 fee)
+ORDER_FILLED_TOPIC = "0x" + Web3.keccak(
+    text="OrderFilled(bytes32,address,address,uint256,uint256,uint256,uint256,uint256)"
+).hex().removeprefix("0x")
+
+CHECKPOINT_NAME = "order_filled"
+# USDC and CTF outcome tokens both use 6 decimals
+TOKEN_DECIMALS = 1e6
+
+
+def _topic_to_address(topic):
+    return "0x" + topic[-40:].lower()
+
+
+def decode_order_filled(log, targets, include_taker: bool = False):
+    """
+    Decodes a raw OrderFilled log into activity dicts (same shape as the data-api
+    /activity items the callback receives) for every target wallet it involves.
+
+    Only the maker side is matched by default: when a tracked wallet takes
+    liquidity, the exchange emits an OrderFilled for its own order with the
+    wallet as maker (and the exchange as taker), so also matching the taker
+    topic of the counterparties' fills would double count the trade.
+    """
+    topics = log.get("topics") or []
+    if len(topics) < 4 or topics[0].lower() != ORDER_FILLED_TOPIC:
+        return []
+
+    maker = _topic_to_address(topics[2])
+    taker = _topic_to_address(topics[3])
+    maker_match = maker in targets
+    taker_match = include_taker and taker in targets
+    if not maker_match and not taker_match:
+        return []
+
+    data = log["data"][2:] if log["data"].startswith("0x") else log["data"]
+    words = [int(data[i:i + 64], 16) for i in range(0, 64 * 5, 64)]
+    maker_asset, taker_asset, maker_amount, taker_amount, _fee = words
+
+    # makerAssetId == 0 means the maker paid USDC, i.e. the maker bought outcome tokens
+    if maker_asset == 0:
+        token_id, shares, usdc = taker_asset, taker_amount, maker_amount
+        maker_side = "BUY"
+    else:
+        token_id, shares, usdc = maker_asset, maker_amount, taker_amount
+        maker_side = "SELL"
+
+    shares /= TOKEN_DECIMALS
+    usdc /= TOKEN_DECIMALS
+    price = usdc / shares if shares else 0.0
+    base = {
+        "type": "TRADE",
+        "asset": str(token_id),
+        "size": shares,
+        "usdcSize": usdc,
+        "price": price,
+        "transactionHash": log.get("transactionHash"),
+        "blockNumber": int(log["blockNumber"], 16) if isinstance(log.get("blockNumber"), str) else log.get("blockNumber"),
+        "logIndex": int(log["logIndex"], 16) if isinstance(log.get("logIndex"), str) else log.get("logIndex"),
+        "source": "chain",
+    }
+
+    activities = []
+    if maker_match:
+        activities.append(dict(base, wallet_address=maker, side=maker_side))
+    if taker_match:
+        activities.append(dict(base, wallet_address=taker, side="SELL" if maker_side == "BUY" else "BUY"))
+    for act in activities:
+        act["id"] = f"{base['transactionHash']}:{base['logIndex']}:{act['wallet_address']}"
+    return activities
+
+
+class ChainTracker:
+    """
+    Detection from OrderFilled logs of the CTF Exchange and the NegRisk CTF
+    Exchange (one filter covering both addresses) instead of polling the data-api.
+
+    Subscribes to logs over POLYGON_WS_URL when set, otherwise polls eth_getLogs
+    every CHAIN_POLL_INTERVAL. Every (re)connect first backfills from the last
+    checkpointed block, so nothing emitted while disconnected is missed.
+    Same interface as Tracker: `start_monitoring()` and an async callback(act).
+    """
+
+    def __init__(self, process_transaction_callback, rpc: JsonRpc = None):
+        # Lower-cased set: O(1) match on maker/taker topics
+        self.targets = {t.lower() for t in Config.TARGET_WALLETS}
+        self.callback = process_transaction_callback
+        self.exchanges = [a for a in (Config.POLYMARKET_EXCHANGE_CONTRACT, Config.POLYMARKET_NEG_RISK_EXCHANGE_CONTRACT) if a]
+        self.rpc = rpc or JsonRpc()
+        self.last_block = None
+        self.seen_logs = OrderedDict()  # bounded: backfill and subscription can overlap
+
+        self.logs_scanned = 0
+        self.activities_matched = 0
+
+    async def replay_logs(self, logs):
+        """Decodes and dispatches already-fetched logs (backfill ranges or recorded logs)."""
+        self.logs_scanned += len(logs)
+        activities = []
+        for log in logs:
+            if log.get("removed"):
+                continue
+            key = (log.get("transactionHash"), log.get("logIndex"))
+            if key in self.seen_logs:
+                continue
+            self.seen_logs[key] = True
+            if len(self.seen_logs) > 10000:
+                self.seen_logs.popitem(last=False)
+            activities.extend(decode_order_filled(log, self.targets, Config.CHAIN_INCLUDE_TAKER_SIDE))
+
+        if not activities:
+            return 0
+
+        blocks = {a["blockNumber"] for a in activities if a.get("blockNumber") is not None}
+        timestamps = await self.rpc.block_timestamps(blocks) if blocks else {}
+
+        for act in activities:
+            act["timestamp"] = timestamps.get(act.get("blockNumber")) or int(time.time())
+            # Logs only carry the token id: fill in market context like the data-api does
+            info = await MarketAPI.get_token_info(act["asset"])
+            if info:
+                act["conditionId"] = info["conditionId"]
+                act["title"] = info["title"]
+                act["outcome"] = info["outcome"]
+                act["outcomeIndex"] = info.get("outcomeIndex")
+            console.print(f"[blue]🔔 Nueva actividad on-chain para {act['wallet_address'][:6]}...[/blue]")
+            await self.callback(act)
+
+        self.activities_matched += len(activities)
+        return len(activities)
+
+    async def backfill(self, to_block=None):
+        """Scans [last_block + 1, to_block] in chunks, checkpointing after each one."""
+        head = to_block if to_block is not None else await self.rpc.block_number()
+        if self.last_block is None:
+            self.last_block = head - Config.CHAIN_START_LOOKBACK
+        if head <= self.last_block:
+            return
+
+        async for end, logs in self.rpc.get_logs_chunked(self.exchanges, [ORDER_FILLED_TOPIC], self.last_block + 1, head):
+            await self.replay_logs(logs)
+            self.last_block = end
+            await Database.save_checkpoint(CHECKPOINT_NAME, end)
+
+    async def _poll_loop(self):
+        while True:
+            try:
+                await self.backfill()
+            except Exception as e:
+                console.print(f"[red]Error escaneando logs: {e}[/red]")
+            await asyncio.sleep(Config.CHAIN_POLL_INTERVAL)
+
+    async def _subscribe_loop(self):
+        import websockets
+
+        delay = 1.0
+        while True:
+            try:
+                async with websockets.connect(Config.POLYGON_WS_URL) as ws:
+                    await ws.send(json.dumps({
+                        "jsonrpc": "2.0", "id": 1, "method": "eth_subscribe",
+                        "params": ["logs", {"address": self.exchanges, "topics": [ORDER_FILLED_TOPIC]}]
+                    }))
+                    await ws.recv()  # subscription id
+                    # Subscribed first, then backfill the gap: overlap is deduplicated
+                    await self.backfill()
+                    console.print("[green]✔ Suscrito a OrderFilled via websocket[/green]")
+                    delay = 1.0
+
+                    async for raw in ws:
+                        msg = json.loads(raw)
+                        log = (msg.get("params") or {}).get("result")
+                        if not log:
+                            continue
+                        await self.replay_logs([log])
+                        block = int(log["blockNumber"], 16)
+                        if self.last_block is None or block - 1 > self.last_block:
+                            # Blocks before this one are complete (logs arrive in block order)
+                            self.last_block = block - 1
+                            await Database.save_checkpoint(CHECKPOINT_NAME, self.last_block)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                console.print(f"[yellow]⚠️ Websocket RPC desconectado ({e}). Reintentando en {delay:.0f}s...[/yellow]")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+    async def start_monitoring(self):
+        console.print("[bold green]🚀 Iniciando Polymarket Tracker (Chain Mode)[/bold green]")
+        console.print(f"[cyan]📡 Monitoreando {len(self.targets)} wallets vía OrderFilled...[/cyan]")
+
+        self.last_block = await Database.get_checkpoint(CHECKPOINT_NAME)
+        if self.last_block is not None:
+            console.print(f"[dim]Reanudando desde el bloque {self.last_block}[/dim]")
+
+        if Config.POLYGON_WS_URL:
+            await self._subscribe_loop()
+        else:
+            await self._poll_loop()
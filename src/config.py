@@ -24,19 +24,69 @@ class Config:
     # Split comma-separated string into a list
     TARGET_WALLETS = [w.strip() for w in os.getenv("TARGET_WALLETS", "").split(",") if w.strip()]
     
+    # Detection source: API (poll data-api /activity) or CHAIN (CTF Exchange OrderFilled logs)
+    TRACKER_MODE = os.getenv("TRACKER_MODE", "API").upper()
+    # Optional websocket RPC for log subscriptions in CHAIN mode (falls back to polling eth_getLogs)
+    POLYGON_WS_URL = os.getenv("POLYGON_WS_URL")
+    CHAIN_POLL_INTERVAL = float(os.getenv("CHAIN_POLL_INTERVAL", "1"))
+    CHAIN_LOG_CHUNK = int(os.getenv("CHAIN_LOG_CHUNK", "2000"))
+    # Also match the taker topic (see chain_tracker.decode_order_filled for the double-count caveat)
+    CHAIN_INCLUDE_TAKER_SIDE = os.getenv("CHAIN_INCLUDE_TAKER_SIDE", "false").lower() == "true"
+    # Blocks to backfill when no checkpoint exists yet
+    CHAIN_START_LOOKBACK = int(os.getenv("CHAIN_START_LOOKBACK", "0"))
+
     # Polymarket API Endpoints
-    POLYMARKET_CLOB_API_URL = "https://clob.polymarket.com" # For placing orders
-    POLYMARKET_GAMMA_API_URL = "https://gamma-api.polymarket.com" # For looking up market names
-    POLYMARKET_DATA_API_URL = "https://data-api.polymarket.com" # For user data
+    # (overridable so benchmarks/e2e_harness.py can point them at local stand-ins)
+    POLYMARKET_CLOB_API_URL = os.getenv("POLYMARKET_CLOB_API_URL", "https://clob.polymarket.com") # For placing orders
+    POLYMARKET_GAMMA_API_URL = os.getenv("POLYMARKET_GAMMA_API_URL", "https://gamma-api.polymarket.com") # For looking up market names
+    POLYMARKET_DATA_API_URL = os.getenv("POLYMARKET_DATA_API_URL", "https://data-api.polymarket.com") # For user data
+    TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+    # Telegram alert queue: per-chat rate (messages/second), coalescing window (seconds), retries
+    NOTIFY_RATE = float(os.getenv("NOTIFY_RATE", "1"))
+    NOTIFY_BURST = float(os.getenv("NOTIFY_BURST", "3"))
+    NOTIFY_COALESCE_WINDOW = float(os.getenv("NOTIFY_COALESCE_WINDOW", "2"))
+    NOTIFY_QUEUE_SIZE = int(os.getenv("NOTIFY_QUEUE_SIZE", "200"))
+    NOTIFY_MAX_RETRIES = int(os.getenv("NOTIFY_MAX_RETRIES", "5"))
+    POLYMARKET_CLOB_WS_URL = os.getenv("POLYMARKET_CLOB_WS_URL", "wss://ws-subscriptions-clob.polymarket.com/ws/market") # Order book deltas
+    # Without a live websocket, a book snapshot is trusted for this long (seconds)
+    ORDERBOOK_MAX_AGE = float(os.getenv("ORDERBOOK_MAX_AGE", "5"))
+    # Books not used by a trade for this long are dropped and unsubscribed (seconds)
+    ORDERBOOK_IDLE_TTL = float(os.getenv("ORDERBOOK_IDLE_TTL", "900"))
+
+    # HTTP transport (shared pooled sessions, see src/http_client.py)
+    HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+    HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "20"))
+    HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "60"))
+    HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+    HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
 
     
     # CONTRACTS
     # The Gnosis Conditional Tokens Framework (CTF) Contract
     # This is the contract that actually emits the TransferSingle/TransferBatch events for all Polymarket positions.
     POLYMARKET_CTF_CONTRACT = "0x4D97DCd979c96e26e7e5B98850a82448F20f68e5"
+
+    # Multicall3 (same address on every EVM chain) - batches the redeemer's resolution checks
+    MULTICALL3_ADDRESS = os.getenv("MULTICALL3_ADDRESS", "0xcA11bde05977b3631167028862bE2a173976CA11")
+    MULTICALL_BATCH_SIZE = int(os.getenv("MULTICALL_BATCH_SIZE", "500"))
+    # Redemption sweeps (seconds); unchanged positions are only re-checked on the full interval
+    REDEEM_INTERVAL = float(os.getenv("REDEEM_INTERVAL", "300"))
+    REDEEM_FULL_CHECK_INTERVAL = float(os.getenv("REDEEM_FULL_CHECK_INTERVAL", "3600"))
+    # How resolutions are detected: EVENTS (ConditionResolution logs) or POLL (payout checks each sweep)
+    REDEEM_MODE = os.getenv("REDEEM_MODE", "EVENTS").upper()
+    RESOLUTION_POLL_INTERVAL = float(os.getenv("RESOLUTION_POLL_INTERVAL", "15"))
+    # Redemption transactions: receipt polling, replacement (gas bump) policy (seconds)
+    TX_POLL_INTERVAL = float(os.getenv("TX_POLL_INTERVAL", "2"))
+    TX_RECEIPT_TIMEOUT = float(os.getenv("TX_RECEIPT_TIMEOUT", "300"))
+    TX_BUMP_AFTER = float(os.getenv("TX_BUMP_AFTER", "30"))
+    TX_BUMP_FACTOR = float(os.getenv("TX_BUMP_FACTOR", "1.125"))
+    TX_MAX_BUMPS = int(os.getenv("TX_MAX_BUMPS", "3"))
     
     # The CTF Exchange (Proxy) - Used for verifying if the trade went through the exchange (optional secondary check)
     POLYMARKET_EXCHANGE_CONTRACT = os.getenv("POLYMARKET_EXCHANGE_CONTRACT", "0x4bFb41d5B3570DeFd03C39a9A4D8dE6De8B79665")
+    # Neg-risk (multi-outcome) markets settle on a separate exchange; CHAIN mode scans both
+    POLYMARKET_NEG_RISK_EXCHANGE_CONTRACT = os.getenv("POLYMARKET_NEG_RISK_EXCHANGE_CONTRACT", "0xC5d563A36AE78145C45a50134d48A1215220f80a")
     
     # Trading
     BET_MODE = os.getenv("BET_MODE", "FIXED").upper() # FIXED or PERCENTAGE
@@ -52,6 +102,89 @@ class Config:
         BET_PERCENTAGE = 0.05
         
     SLIPPAGE_TOLERANCE = float(os.getenv("SLIPPAGE_TOLERANCE", "0.01"))
+    # When the book can't fill the whole order within tolerance: CAP the size or post a LIMIT order
+    SLIPPAGE_ACTION = os.getenv("SLIPPAGE_ACTION", "CAP").upper()
+    # Smallest order worth sending after capping (USDC for BUY, shares for SELL)
+    MIN_ORDER_SIZE = float(os.getenv("MIN_ORDER_SIZE", "1"))
+
+    # Wallet scoring (src/scoring.py): closed trades before a score is fully trusted, and how
+    # often changed scores are written to the wallets table (seconds)
+    SCORE_PRIOR_TRADES = float(os.getenv("SCORE_PRIOR_TRADES", "10"))
+    SCORE_FLUSH_INTERVAL = float(os.getenv("SCORE_FLUSH_INTERVAL", "30"))
+    # Skip BUY copies from wallets scoring below this (0 disables), and/or scale bets by score
+    MIN_WALLET_SCORE = float(os.getenv("MIN_WALLET_SCORE", "0"))
+    SCORE_SCALING = os.getenv("SCORE_SCALING", "false").lower() == "true"
+
+    # Multi-whale consensus (src/consensus.py): only copy a BUY once N distinct wallets and/or
+    # X USD of net flow agree on an outcome within CONSENSUS_WINDOW seconds (0 disables each)
+    CONSENSUS_WINDOW = float(os.getenv("CONSENSUS_WINDOW", "300"))
+    CONSENSUS_MIN_WALLETS = int(os.getenv("CONSENSUS_MIN_WALLETS", "0"))
+    CONSENSUS_MIN_FLOW_USD = float(os.getenv("CONSENSUS_MIN_FLOW_USD", "0"))
+    CONSENSUS_MAX_MARKETS = int(os.getenv("CONSENSUS_MAX_MARKETS", "10000"))
+    CONSENSUS_MAX_EVENTS = int(os.getenv("CONSENSUS_MAX_EVENTS", "1000"))
+
+    # Market metadata cache (condition_id -> token IDs)
+    MARKET_CACHE_SIZE = int(os.getenv("MARKET_CACHE_SIZE", "5000"))
+    MARKET_CACHE_TTL = float(os.getenv("MARKET_CACHE_TTL", "86400"))
+    MARKET_CACHE_NEGATIVE_TTL = float(os.getenv("MARKET_CACHE_NEGATIVE_TTL", "300"))
+
+    # SQLite group-commit writer (see src/db_writer.py)
+    DB_BATCH_SIZE = int(os.getenv("DB_BATCH_SIZE", "200"))
+    DB_FLUSH_INTERVAL = float(os.getenv("DB_FLUSH_INTERVAL", "0.05"))
+    DB_QUEUE_SIZE = int(os.getenv("DB_QUEUE_SIZE", "10000"))
+    DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "65536"))
+    DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+    # Markets / wallets remembered as already upserted (LRU; an evicted one is just upserted again)
+    DB_KNOWN_CACHE_SIZE = int(os.getenv("DB_KNOWN_CACHE_SIZE", "10000"))
+
+    # Partial fills from the same wallet/market/side/outcome within this window are merged (seconds)
+    AGGREGATION_WINDOW = float(os.getenv("AGGREGATION_WINDOW", "60"))
+
+    # Tracker dedup: how long older activity ids are remembered, and a hard cap on how many
+    DEDUP_WINDOW_SECONDS = float(os.getenv("DEDUP_WINDOW_SECONDS", "3600"))
+    DEDUP_MAX_IDS = int(os.getenv("DEDUP_MAX_IDS", "100000"))
+
+    # Adaptive polling (seconds) and the shared data-api request budget (requests/second)
+    POLL_INTERVAL = float(os.getenv("POLL_INTERVAL", "3"))
+    POLL_MIN_INTERVAL = float(os.getenv("POLL_MIN_INTERVAL", "0.5"))
+    POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", "30"))
+    POLL_BACKOFF = float(os.getenv("POLL_BACKOFF", "1.5"))
+    POLL_JITTER = float(os.getenv("POLL_JITTER", "0.2"))
+    POLL_CONCURRENCY = int(os.getenv("POLL_CONCURRENCY", "32"))
+    DATA_API_RATE_LIMIT = float(os.getenv("DATA_API_RATE_LIMIT", "10"))
+    DATA_API_BURST = float(os.getenv("DATA_API_BURST", "20"))
+
+    # Incremental /activity fetching (per-wallet cursor)
+    ACTIVITY_BASELINE_LIMIT = int(os.getenv("ACTIVITY_BASELINE_LIMIT", "10"))
+    ACTIVITY_PAGE_SIZE = int(os.getenv("ACTIVITY_PAGE_SIZE", "50"))
+    ACTIVITY_MAX_PAGES = int(os.getenv("ACTIVITY_MAX_PAGES", "10"))
+    ACTIVITY_PAGE_CONCURRENCY = int(os.getenv("ACTIVITY_PAGE_CONCURRENCY", "3"))
+
+    # Dispatch pipeline (Tracker -> trade callback)
+    DISPATCH_WORKERS = int(os.getenv("DISPATCH_WORKERS", "8"))
+    DISPATCH_QUEUE_SIZE = int(os.getenv("DISPATCH_QUEUE_SIZE", "1000"))
+
+    # Order execution thread pool (blocking ClobClient calls) and per-call timeouts (seconds)
+    ORDER_WORKERS = int(os.getenv("ORDER_WORKERS", "4"))
+    ORDER_SIGN_TIMEOUT = float(os.getenv("ORDER_SIGN_TIMEOUT", "5"))
+    ORDER_TIMEOUT = float(os.getenv("ORDER_TIMEOUT", "10"))
+    # Per-token market params cache (tick size, neg-risk, fee rate, price), seconds
+    MARKET_PARAMS_REFRESH = float(os.getenv("MARKET_PARAMS_REFRESH", "30"))
+    MARKET_PARAMS_MAX_AGE = float(os.getenv("MARKET_PARAMS_MAX_AGE", "120"))
+    MARKET_PARAMS_IDLE_TTL = float(os.getenv("MARKET_PARAMS_IDLE_TTL", "3600"))
+    # Position ledger reconciliation against the Data API (seconds)
+    POSITION_RECONCILE_INTERVAL = float(os.getenv("POSITION_RECONCILE_INTERVAL", "300"))
+    # Cached balance: resync from the exchange every N seconds or after N settled trades
+    BALANCE_RESYNC_INTERVAL = float(os.getenv("BALANCE_RESYNC_INTERVAL", "120"))
+    BALANCE_RESYNC_TRADES = int(os.getenv("BALANCE_RESYNC_TRADES", "10"))
+    # Event-loop lag sampling period (seconds)
+    LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.1"))
+    # Local Prometheus endpoint (http://METRICS_HOST:METRICS_PORT/metrics); port 0 disables it
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+
+    # How often the long-lived CLOB client re-derives its L2 API credentials (seconds)
+    CLOB_CREDS_REFRESH_SECONDS = float(os.getenv("CLOB_CREDS_REFRESH_SECONDS", "3600"))
     
     # Telegram
     TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
@@ -76,6 +209,8 @@ class Config:
             
             if cls.POLYMARKET_EXCHANGE_CONTRACT:
                 cls.POLYMARKET_EXCHANGE_CONTRACT = Web3.to_checksum_address(cls.POLYMARKET_EXCHANGE_CONTRACT)
+            if cls.POLYMARKET_NEG_RISK_EXCHANGE_CONTRACT:
+                cls.POLYMARKET_NEG_RISK_EXCHANGE_CONTRACT = Web3.to_checksum_address(cls.POLYMARKET_NEG_RISK_EXCHANGE_CONTRACT)
             
             # Helper to checksum the new CTF contract
             if cls.POLYMARKET_CTF_CONTRACT:
@@ -0,0 +1,183 @@
+import time
+from collections import OrderedDict, deque
+from src.config import Config
+
+
+class Window:
+    __slots__ = ("events", "wallet_flow", "agreeing", "net_flow", "last_seen", "fired")
+
+    def __init__(self):
+        self.events = deque()   # (trade time, wallet, signed USD), sorted oldest first
+        self.wallet_flow = {}   # wallet -> net USD inside the window
+        self.agreeing = 0       # wallets with net buying inside the window
+        self.net_flow = 0.0
+        self.last_seen = 0.0
+        self.fired = False      # consensus already signalled; re-armed once it lapses
+
+    def add(self, wallet, flow, now):
+        events = self.events
+        if not events or events[-1][0] <= now:
+            events.append((now, wallet, flow))
+        else:
+            # Late fill: keep the deque in trade-time order so expire() can stop at the front
+            i = len(events) - 1
+            while i > 0 and events[i - 1][0] > now:
+                i -= 1
+            events.insert(i, (now, wallet, flow))
+        self._apply(wallet, flow)
+        self.last_seen = max(self.last_seen, now)
+
+    def expire(self, cutoff, max_events):
+        events = self.events
+        while events and (events[0][0] < cutoff or len(events) > max_events):
+            _, wallet, flow = events.popleft()
+            self._apply(wallet, -flow)
+        if not events:
+            # Start the next burst from exact zeros (no accumulated float drift)
+            self.wallet_flow.clear()
+            self.agreeing = 0
+            self.net_flow = 0.0
+
+    def _apply(self, wallet, flow):
+        before = self.wallet_flow.get(wallet, 0.0)
+        after = before + flow
+        if abs(after) < 1e-9:
+            self.wallet_flow.pop(wallet, None)
+            after = 0.0
+        else:
+            self.wallet_flow[wallet] = after
+        self.agreeing += (after > 0) - (before > 0)
+        self.net_flow += flow
+
+
+class ConsensusDetector:
+    """
+    Sliding-window agreement between tracked wallets, per (condition_id, outcome).
+
+    Each fill enters its market's deque in trade-time order and updates the
+    running per-wallet net flow, the number of wallets net buying and the total
+    net USD flow; entries older than CONSENSUS_WINDOW are popped from the
+    front, so every update is O(1) amortized. Windows are keyed on the whale's trade time, not
+    arrival, and fills already older than the window (e.g. activity replayed
+    after a restart) are ignored, so a backlog can't pose as live agreement.
+    Windows live in an LRU ordered by last activity: idle markets fall off the
+    front as new events arrive, and memory is capped by
+    CONSENSUS_MAX_MARKETS x CONSENSUS_MAX_EVENTS.
+
+    With CONSENSUS_MIN_WALLETS and/or CONSENSUS_MIN_FLOW_USD set, `observe()`
+    reports consensus once per episode: on the BUY that brings N distinct
+    wallets (or X USD of net flow) into agreement within the window.
+    """
+
+    def __init__(self, window=None, min_wallets=None, min_flow=None, max_markets=None, max_events=None):
+        self.window = Config.CONSENSUS_WINDOW if window is None else window
+        self.min_wallets = Config.CONSENSUS_MIN_WALLETS if min_wallets is None else min_wallets
+        self.min_flow = Config.CONSENSUS_MIN_FLOW_USD if min_flow is None else min_flow
+        self.max_markets = max_markets or Config.CONSENSUS_MAX_MARKETS
+        self.max_events = max_events or Config.CONSENSUS_MAX_EVENTS
+        self.windows = OrderedDict()  # (condition_id, outcome) -> Window, least recently active first
+
+        self.events = 0
+        self.stale = 0
+        self.signals = 0
+        self.expired = 0
+        self.evicted = 0
+
+    @property
+    def enabled(self):
+        return bool(self.min_wallets or self.min_flow)
+
+    def _met(self, window):
+        return bool(
+            (self.min_wallets and window.agreeing >= self.min_wallets) or
+            (self.min_flow and window.net_flow >= self.min_flow)
+        )
+
+    def observe(self, condition_id, outcome, wallet, side, usd, timestamp=None, now=None):
+        """
+        Adds one fill traded at unix `timestamp` (BUY adds flow, SELL removes
+        it). Returns True when this BUY completes a consensus (or the detector
+        is disabled), else False.
+        """
+        now = time.time() if now is None else now
+        is_buy = side == "BUY"
+        self.events += 1
+        self._expire_idle(now)
+
+        # Clock skew can put a fill slightly in the future; never trust it past now
+        traded_at = now if timestamp is None else min(float(timestamp), now)
+        if traded_at < now - self.window:
+            self.stale += 1
+            return is_buy and not self.enabled
+
+        key = (condition_id, outcome)
+        window = self.windows.get(key)
+        if window is None:
+            if len(self.windows) >= self.max_markets:
+                self.windows.popitem(last=False)
+                self.evicted += 1
+            window = self.windows[key] = Window()
+        else:
+            self.windows.move_to_end(key)
+
+        window.add(wallet, usd if is_buy else -usd, traded_at)
+        window.expire(now - self.window, self.max_events)
+
+        if not self.enabled:
+            return is_buy
+        if not self._met(window):
+            window.fired = False
+            return False
+        if not is_buy or window.fired:
+            return False
+        window.fired = True
+        self.signals += 1
+        return True
+
+    def _expire_idle(self, now):
+        """Drops markets with no event inside the window (oldest first, so amortized O(1))."""
+        cutoff = now - self.window
+        while self.windows:
+            key, window = next(iter(self.windows.items()))
+            if window.last_seen >= cutoff:
+                break
+            del self.windows[key]
+            self.expired += 1
+
+    def _describe(self, window, now):
+        window.expire(now - self.window, self.max_events)
+        return {
+            "events": len(window.events),
+            "agreeing_wallets": window.agreeing,
+            "net_flow_usd": round(window.net_flow, 2),
+            "wallet_flow": {w: round(f, 2) for w, f in window.wallet_flow.items()},
+            "idle_seconds": round(now - window.last_seen, 1),
+            "met": self._met(window),
+        }
+
+    def window_state(self, condition_id, outcome, now=None):
+        """One market's current window, or None if it has no recent activity."""
+        window = self.windows.get((condition_id, outcome))
+        if window is None:
+            return None
+        return self._describe(window, time.time() if now is None else now)
+
+    def state(self, condition_id=None, now=None):
+        """Current windows (optionally for one condition) for inspection."""
+        now = time.time() if now is None else now
+        return {
+            f"{cid}:{outcome}": self._describe(window, now)
+            for (cid, outcome), window in list(self.windows.items())
+            if condition_id is None or cid == condition_id
+        }
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "markets": len(self.windows),
+            "events": self.events,
+            "stale": self.stale,
+            "signals": self.signals,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
@@ -0,0 +1,124 @@
+import asyncio
+from src.config import Config
+from src.consensus import ConsensusDetector
+from src.database import Database
+from src.http_client import HttpClient
+from src.loop_monitor import LoopLagMonitor
+from src.market_api import MarketAPI
+from src.market_cache import MarketCache
+from src.metrics import Metrics
+from src.notifier import Notifier
+from src.scoring import WalletScorer
+from src.trader import Trader
+
+
+class AppContext:
+    """
+    Long-lived services shared by every whale event.
+    Built once in main.main() so the copy-trade hot path never pays for
+    ClobClient construction, L2 key derivation or new HTTP connections.
+    """
+
+    def __init__(self):
+        self.trader = None
+        self.notifier = None
+        self.scorer = None
+        self.consensus = ConsensusDetector()
+        self.db = Database
+        self.http = HttpClient
+        self.dispatcher = None
+        self.loop_monitor = None
+        self._tasks = []
+
+    @classmethod
+    async def create(cls):
+        """Initializes the DB, warms the CLOB client and the pooled HTTP connections."""
+        ctx = cls()
+
+        await Database.init_db()
+        await MarketAPI.warm_cache()
+
+        # Wallet scores: rebuilt once from wallet_trades, then updated by every logged fill
+        ctx.scorer = WalletScorer()
+        await ctx.scorer.load()
+        Database.scorer = ctx.scorer
+        ctx._tasks.append(ctx.scorer.start())
+
+        ctx.notifier = Notifier()
+        if ctx.notifier.enabled:
+            ctx._tasks.append(ctx.notifier.start())
+
+        # Trader.__init__ derives the L2 API key over the network; keep it off the loop.
+        loop = asyncio.get_running_loop()
+        ctx.trader = await loop.run_in_executor(None, Trader)
+
+        if ctx.trader.client:
+            ctx._tasks.append(asyncio.create_task(ctx.trader.keep_credentials_fresh()))
+            ctx._tasks.append(ctx.trader.market_params.start())
+            ctx._tasks.append(ctx.trader.orderbooks.start())
+            # Balance cache: first sync now, then on a timer / every N trades
+            await ctx.trader.balance.resync()
+            ctx._tasks.append(ctx.trader.balance.start())
+
+        # Position ledger: restore from bot_trades, then reconcile with the Data API in the background
+        await ctx.trader.positions.load()
+        if ctx.trader.wallet_address:
+            ctx._tasks.append(ctx.trader.positions.start())
+
+        # Loop responsiveness, tracked separately while orders are in flight
+        ctx.loop_monitor = LoopLagMonitor(busy_probe=lambda: ctx.trader.executor.in_flight > 0)
+        ctx._tasks.append(ctx.loop_monitor.start())
+
+        ctx.register_metrics()
+        await Metrics.serve()
+
+        # Pay the TCP+TLS handshakes now instead of on the first whale event
+        await HttpClient.warm_up(
+            Config.POLYMARKET_DATA_API_URL,
+            Config.POLYMARKET_CLOB_API_URL,
+            Config.TELEGRAM_API_URL,
+        )
+
+        return ctx
+
+    def add_task(self, task):
+        """Hands a background task to the context so close() cancels it."""
+        self._tasks.append(task)
+        return task
+
+    def register_metrics(self):
+        """Exposes every long-lived component's stats() on the metrics endpoint."""
+        Metrics.register("http", HttpClient.stats, label="host")
+        Metrics.register("market_cache", MarketCache.stats)
+        Metrics.register("loop", self.loop_monitor.stats)
+        Metrics.register("notifier", self.notifier.stats)
+        Metrics.register("orders", self.trader.executor.stats)
+        Metrics.register("market_params", self.trader.market_params.stats)
+        Metrics.register("orderbooks", self.trader.orderbooks.stats)
+        Metrics.register("positions", self.trader.positions.stats)
+        Metrics.register("balance", self.trader.balance.stats)
+        Metrics.register("scoring", self.scorer.stats)
+        Metrics.register("consensus", self.consensus.stats)
+        if Database.writer is not None:
+            Metrics.register("db_writer", Database.writer.stats)
+        if Database.aggregator is not None:
+            Metrics.register("aggregator", Database.aggregator.stats)
+        # The dispatcher is attached after create(): resolve it at scrape time
+        Metrics.register("dispatcher", lambda: self.dispatcher.stats() if self.dispatcher else {})
+
+    async def close(self):
+        """Stops background tasks and releases network resources."""
+        if self.dispatcher:
+            await self.dispatcher.stop()
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        if self.trader:
+            self.trader.executor.shutdown()
+
+        await Metrics.close()
+        await HttpClient.close()
+        await Database.close()
@@ -1,8 +1,13 @@
 import aiosqlite
 import asyncio
+import json
+from collections import OrderedDict
 from rich.console import Console
 from datetime import datetime
 import hashlib
+from src.config import Config
+from src.db_writer import DBWriter
+from src.fill_aggregator import FillAggregator
 
 DB_NAME = "polymarket_bot.db"
 console = Console()
@@ -44,6 +49,10 @@ CREATE TABLE IF NOT EXISTS wallet_trades (
     FOREIGN KEY(condition_id) REFERENCES markets(condition_id)
 );
 
+-- Covers the partial-fill aggregation lookup (wallet, market, side, outcome, recent timestamp)
+CREATE INDEX IF NOT EXISTS idx_wallet_trades_agg
+    ON wallet_trades (wallet_address, condition_id, side, outcome, timestamp);
+
 -- 4. Bot Trades (Your Copy Trades)
 CREATE TABLE IF NOT EXISTS bot_trades (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -56,12 +65,38 @@ CREATE TABLE IF NOT EXISTS bot_trades (
     timestamp INTEGER,
     FOREIGN KEY(condition_id) REFERENCES markets(condition_id)
 );
+
+-- 5. Tracker State (per-wallet dedup high-water mark)
+CREATE TABLE IF NOT EXISTS tracker_state (
+    wallet_address TEXT PRIMARY KEY,
+    last_timestamp INTEGER, -- Newest activity timestamp already handled
+    last_ids TEXT, -- JSON list of activity ids sharing last_timestamp
+    updated_at INTEGER
+);
+
+-- 6. Chain Checkpoints (last fully scanned block per on-chain log consumer)
+CREATE TABLE IF NOT EXISTS chain_checkpoints (
+    name TEXT PRIMARY KEY,
+    block_number INTEGER,
+    updated_at INTEGER
+);
 """
 
 class Database:
+    # Persistent write connection + group-commit queue (started by init_db)
+    writer: DBWriter = None
+    # Partial-fill window for wallet_trades (started by init_db)
+    aggregator: FillAggregator = None
+    # Rolling wallet scores fed by every logged fill (src/scoring.py; attached by AppContext)
+    scorer = None
+    # Markets/wallets already upserted by this process (LRU, DB_KNOWN_CACHE_SIZE each):
+    # condition_id -> (yes, no), address -> True
+    _known_markets = OrderedDict()
+    _known_wallets = OrderedDict()
+
     @staticmethod
     async def init_db():
-        """Initializes the database explicitly with WAL mode."""
+        """Initializes the database explicitly with WAL mode and starts the writer task."""
         try:
             async with aiosqlite.connect(DB_NAME) as db:
                 # --- ENABLE WAL MODE ---
@@ -83,73 +118,302 @@ class Database:
                 except Exception:
                     pass # Column likely exists
 
+                # Migration: bot_trades rows double as the position ledger's journal
+                for column, col_type in (("token_id", "TEXT"), ("side", "TEXT"), ("shares", "REAL")):
+                    try:
+                        await db.execute(f"ALTER TABLE bot_trades ADD COLUMN {column} {col_type}")
+                        console.print(f"[yellow]Migrated DB: Added bot_trades.{column} column[/yellow]")
+                    except Exception:
+                        pass # Column likely exists
+                await db.execute("CREATE INDEX IF NOT EXISTS idx_bot_trades_open ON bot_trades (status, token_id)")
+
+                # Migration: remember when our positions in a resolved market were redeemed
+                try:
+                    await db.execute("ALTER TABLE markets ADD COLUMN redeemed_at INTEGER")
+                    console.print("[yellow]Migrated DB: Added markets.redeemed_at column[/yellow]")
+                except Exception:
+                    pass # Column likely exists
+
+                # Migration: payout numerators of resolved markets (JSON), for wallet scoring
+                try:
+                    await db.execute("ALTER TABLE markets ADD COLUMN payouts TEXT")
+                    console.print("[yellow]Migrated DB: Added markets.payouts column[/yellow]")
+                except Exception:
+                    pass # Column likely exists
+
                 await db.commit()
+
+            if Database.writer is None:
+                Database.writer = DBWriter(DB_NAME)
+                await Database.writer.start()
+            if Database.aggregator is None:
+                Database.aggregator = FillAggregator(on_flush=Database._flush_aggregated_trade)
+                Database.aggregator.start()
             console.print("[green]✔ Database initialized successfully (WAL Mode Enabled).[/green]")
         except Exception as e:
             console.print(f"[red]✘ Database init failed: {e}[/red]")
 
     @staticmethod
-    async def log_whale_activity(wallet, condition_id, token_id_yes, token_id_no, title, outcome, side, size, price, timestamp):
-        """Inserts a whale trade into the database. Aggregates partial fills within a short window."""
-        
+    async def close():
+        """Flushes buffered fills and pending writes, then closes the persistent connection."""
+        if Database.aggregator:
+            await Database.aggregator.stop()
+            Database.aggregator = None
+        if Database.writer:
+            await Database.writer.close()
+            Database.writer = None
+
+    @staticmethod
+    async def fetchall(query, params=()):
+        """Read helper: reuses the writer's connection when it is running."""
+        if Database.writer and Database.writer.db:
+            cursor = await Database.writer.db.execute(query, params)
+            return await cursor.fetchall()
         async with aiosqlite.connect(DB_NAME) as db:
-            # 1. Ensure Market Exists (and update token_ids if provided)
+            cursor = await db.execute(query, params)
+            return await cursor.fetchall()
+
+    @staticmethod
+    async def get_market_tokens(condition_id):
+        """Returns (token_id_yes, token_id_no) stored for a market, or (None, None)."""
+        rows = await Database.fetchall(
+            "SELECT token_id_yes, token_id_no FROM markets WHERE condition_id = ?",
+            (condition_id,)
+        )
+        return (rows[0][0], rows[0][1]) if rows else (None, None)
+
+    @staticmethod
+    async def load_market_tokens(limit):
+        """Most recently updated markets with known token IDs, for cache warm-up."""
+        try:
+            rows = await Database.fetchall("""
+                SELECT condition_id, token_id_yes, token_id_no
+                FROM markets
+                WHERE token_id_yes IS NOT NULL OR token_id_no IS NOT NULL
+                ORDER BY last_updated DESC
+                LIMIT ?
+            """, (limit,))
+            # Oldest first, so the LRU keeps the most recent markets
+            return list(reversed(rows))
+        except Exception as e:
+            console.print(f"[red]Failed to load market tokens: {e}[/red]")
+            return []
+
+    @staticmethod
+    async def load_tracker_state():
+        """Returns [(wallet_address, last_timestamp, last_ids_json), ...]."""
+        try:
+            return await Database.fetchall("SELECT wallet_address, last_timestamp, last_ids FROM tracker_state")
+        except Exception as e:
+            console.print(f"[red]Failed to load tracker state: {e}[/red]")
+            return []
+
+    @staticmethod
+    async def save_tracker_state(rows):
+        """Upserts (wallet_address, last_timestamp, last_ids_json, updated_at) rows."""
+        async def op(db):
+            await db.executemany("""
+                INSERT OR REPLACE INTO tracker_state (wallet_address, last_timestamp, last_ids, updated_at)
+                VALUES (?, ?, ?, ?)
+            """, rows)
+
+        await Database.write(op)
+
+    @staticmethod
+    async def log_bot_trade(token_id, condition_id, outcome, side, shares, price, size_usd, realized_pnl=0.0, close_position=False):
+        """Journals one of our own fills. Closing a position marks its OPEN rows CLOSED."""
+        async def op(db):
             await db.execute("""
-                INSERT OR IGNORE INTO markets (condition_id, token_id_yes, token_id_no, title, last_price, last_updated)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (condition_id, token_id_yes, token_id_no, title, price, timestamp))
-            
-            # If entry exists but token_ids are updated
-            if token_id_yes:
-                await db.execute("UPDATE markets SET token_id_yes = ? WHERE condition_id = ?", (token_id_yes, condition_id))
-            if token_id_no:
-                await db.execute("UPDATE markets SET token_id_no = ? WHERE condition_id = ?", (token_id_no, condition_id))
-
-            # 2. Ensure Wallet Exists
+                INSERT INTO bot_trades (condition_id, outcome, entry_price, size_usd, status, realized_pnl, timestamp, token_id, side, shares)
+                VALUES (?, ?, ?, ?, 'OPEN', ?, strftime('%s', 'now'), ?, ?, ?)
+            """, (condition_id, outcome, price, size_usd, realized_pnl, token_id, side, shares))
+            if close_position:
+                await db.execute("UPDATE bot_trades SET status = 'CLOSED' WHERE token_id = ? AND status = 'OPEN'", (token_id,))
+
+        await Database.write(op)
+
+    @staticmethod
+    async def log_position_adjustments(adjustments):
+        """
+        Journals reconciliation deltas [(token_id, condition_id, outcome, shares_delta, cost_delta), ...].
+        size_usd carries the signed cost-basis change so a restart restores the reconciled cost.
+        """
+        async def op(db):
+            await db.executemany("""
+                INSERT INTO bot_trades (condition_id, outcome, entry_price, size_usd, status, timestamp, token_id, side, shares)
+                VALUES (?, ?, NULL, ?, 'OPEN', strftime('%s', 'now'), ?, 'ADJUST', ?)
+            """, [(cid, outcome, cost_delta, token_id, delta) for token_id, cid, outcome, delta, cost_delta in adjustments])
+
+        await Database.write(op)
+
+    @staticmethod
+    async def load_open_positions():
+        """Returns [(token_id, condition_id, outcome, shares, cost_usd), ...] from OPEN bot_trades."""
+        try:
+            return await Database.fetchall("""
+                SELECT token_id, MAX(condition_id), MAX(outcome),
+                       SUM(CASE WHEN side = 'SELL' THEN -shares ELSE shares END),
+                       SUM(CASE side WHEN 'BUY' THEN size_usd
+                                     WHEN 'SELL' THEN -(size_usd - realized_pnl)
+                                     WHEN 'ADJUST' THEN size_usd
+                                     ELSE 0 END)
+                FROM bot_trades
+                WHERE status = 'OPEN' AND token_id IS NOT NULL
+                GROUP BY token_id
+            """)
+        except Exception as e:
+            console.print(f"[red]Failed to load open positions: {e}[/red]")
+            return []
+
+    @staticmethod
+    async def load_resolution_state():
+        """Returns {condition_id: redeemed_at or None} for markets already known to be resolved."""
+        try:
+            rows = await Database.fetchall("SELECT condition_id, redeemed_at FROM markets WHERE is_resolved = 1")
+            return dict(rows)
+        except Exception as e:
+            console.print(f"[red]Failed to load resolution state: {e}[/red]")
+            return {}
+
+    @staticmethod
+    async def mark_resolved(condition_id, redeemed: bool = False, payouts=None):
+        """Flags a market as resolved (and optionally redeemed) in markets.is_resolved / redeemed_at / payouts."""
+        payouts_json = json.dumps(payouts) if payouts is not None else None
+
+        async def op(db):
             await db.execute("""
-                INSERT OR IGNORE INTO wallets (address, last_updated)
-                VALUES (?, ?)
-            """, (wallet, timestamp))
-
-            # 3. Log Trade (with aggregation for partial fills)
-            # Check for existing trade from same wallet, market, side, outcome within last 60 seconds
-            time_window = 60 
-            cursor = await db.execute("""
-                SELECT id, entry_price, size_usd 
-                FROM wallet_trades 
-                WHERE wallet_address = ? 
-                  AND condition_id = ? 
-                  AND side = ? 
-                  AND outcome = ? 
-                  AND timestamp >= ?
-                ORDER BY timestamp DESC 
-                LIMIT 1
-            """, (wallet, condition_id, side, outcome, timestamp - time_window))
-            
-            existing_trade = await cursor.fetchone()
-            
-            if existing_trade:
-                # Update existing trade
-                trade_id, old_price, old_size = existing_trade
-                new_size = old_size + size
-                if new_size > 0:
-                    # Weighted average price
-                    new_price = ((old_price * old_size) + (price * size)) / new_size
-                else:
-                    new_price = price # Should not happen unless negative sizes
-                
-                await db.execute("""
-                    UPDATE wallet_trades 
-                    SET size_usd = ?, entry_price = ?, timestamp = ? 
-                    WHERE id = ?
-                """, (new_size, new_price, timestamp, trade_id))
-                console.print(f"[dim]DB: Aggregated trade for {wallet[:6]} (New Size: ${new_size:.2f})[/dim]")
-            else:
-                # Insert new trade
-                await db.execute("""
-                    INSERT INTO wallet_trades (wallet_address, condition_id, outcome, side, entry_price, size_usd, timestamp)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (wallet, condition_id, outcome, side, price, size, timestamp))
-                console.print(f"[dim]DB: Logged new trade for {wallet[:6]}[/dim]")
-            
-            await db.commit()
+                INSERT INTO markets (condition_id, is_resolved, redeemed_at, payouts, last_updated)
+                VALUES (?, 1, CASE WHEN ? THEN strftime('%s', 'now') END, ?, strftime('%s', 'now'))
+                ON CONFLICT(condition_id) DO UPDATE SET
+                    is_resolved = 1,
+                    redeemed_at = COALESCE(markets.redeemed_at, excluded.redeemed_at),
+                    payouts = COALESCE(excluded.payouts, markets.payouts)
+            """, (condition_id, redeemed, payouts_json))
+
+        await Database.write(op)
+
+    @staticmethod
+    async def load_payouts():
+        """Returns {condition_id: [payout numerators]} for resolved markets with known payouts."""
+        rows = await Database.fetchall("SELECT condition_id, payouts FROM markets WHERE is_resolved = 1 AND payouts IS NOT NULL")
+        return {condition_id: json.loads(payouts) for condition_id, payouts in rows}
+
+    @staticmethod
+    async def get_checkpoint(name):
+        """Last block recorded for an on-chain scanner, or None."""
+        rows = await Database.fetchall("SELECT block_number FROM chain_checkpoints WHERE name = ?", (name,))
+        return rows[0][0] if rows else None
+
+    @staticmethod
+    async def save_checkpoint(name, block_number, wait: bool = False):
+        async def op(db):
+            await db.execute("""
+                INSERT OR REPLACE INTO chain_checkpoints (name, block_number, updated_at)
+                VALUES (?, ?, strftime('%s', 'now'))
+            """, (name, block_number))
+
+        await Database.write(op, wait=wait)
+
+    @staticmethod
+    async def write(op, wait: bool = False):
+        """
+        Runs `op(db)` on the writer connection as part of the next group commit.
+        With wait=True, returns once the batch is durable.
+        """
+        if Database.writer is None:
+            # No writer running (e.g. a one-off script): plain connection + commit
+            async with aiosqlite.connect(DB_NAME) as db:
+                result = await op(db)
+                await db.commit()
+                return result
+        return await Database.writer.submit(op, wait=wait)
+
+    @staticmethod
+    async def log_whale_activity(wallet, condition_id, token_id_yes, token_id_no, title, outcome, side, size, price, timestamp, wait: bool = False, outcome_index=None):
+        """
+        Inserts a whale trade into the database. Aggregates partial fills within a short window.
+        Market/wallet rows are queued on the group-commit writer; the trade itself is merged in
+        memory and written once its aggregation window closes. wait=True blocks until all of it,
+        including this fill's (merged) trade row, is committed: its aggregation window is closed early.
+        Each fill also updates the wallet's rolling score (O(1), in memory).
+        """
+        if Database.scorer is not None:
+            Database.scorer.on_trade(wallet, condition_id, outcome, side, size, price, timestamp, outcome_index)
+
+        # 1 & 2. Upsert market / wallet only when this process hasn't written them already
+        known_tokens = Database._known_markets.get(condition_id)
+        if known_tokens is not None:
+            Database._known_markets.move_to_end(condition_id)
+        market_changed = known_tokens is None or (
+            (token_id_yes and token_id_yes != known_tokens[0]) or
+            (token_id_no and token_id_no != known_tokens[1])
+        )
+        wallet_is_new = wallet not in Database._known_wallets
+        if not wallet_is_new:
+            Database._known_wallets.move_to_end(wallet)
+
+        if market_changed or wallet_is_new:
+            async def op(db):
+                if market_changed:
+                    await Database._write_market(db, condition_id, token_id_yes, token_id_no, title, price, timestamp)
+                if wallet_is_new:
+                    await Database._write_wallet(db, wallet, timestamp)
+
+            if market_changed:
+                Database._known_markets[condition_id] = (
+                    token_id_yes or (known_tokens[0] if known_tokens else None),
+                    token_id_no or (known_tokens[1] if known_tokens else None),
+                )
+            Database._known_wallets[wallet] = True
+            for known in (Database._known_markets, Database._known_wallets):
+                while len(known) > Config.DB_KNOWN_CACHE_SIZE:
+                    known.popitem(last=False)
+            await Database.write(op, wait=wait)
+
+        # 3. Log Trade (with aggregation for partial fills)
+        if Database.aggregator is None:
+            # No aggregator running (one-off script): write the fill as its own row
+            await Database.write(lambda db: Database._insert_trade(db, wallet, condition_id, outcome, side, price, size, timestamp), wait=wait)
+            return
+
+        await Database.aggregator.add(wallet, condition_id, side, outcome, size, price, timestamp)
+        if wait:
+            await Database.aggregator.flush_key(wallet, condition_id, side, outcome, wait=True)
+
+    @staticmethod
+    async def _flush_aggregated_trade(key, entry, wait: bool = False):
+        """FillAggregator callback: persists one merged fill as a single wallet_trades row."""
+        wallet, condition_id, side, outcome = key
+        await Database.write(lambda db: Database._insert_trade(db, wallet, condition_id, outcome, side, entry.price, entry.size, entry.last_ts), wait=wait)
+        if entry.fills > 1:
+            console.print(f"[dim]DB: Logged aggregated trade for {wallet[:6]} ({entry.fills} fills, ${entry.size:.2f})[/dim]")
+        else:
+            console.print(f"[dim]DB: Logged new trade for {wallet[:6]}[/dim]")
+
+    @staticmethod
+    async def _write_market(db, condition_id, token_id_yes, token_id_no, title, price, timestamp):
+        # Ensure Market Exists (and update token_ids if provided)
+        await db.execute("""
+            INSERT OR IGNORE INTO markets (condition_id, token_id_yes, token_id_no, title, last_price, last_updated)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (condition_id, token_id_yes, token_id_no, title, price, timestamp))
+        
+        # If entry exists but token_ids are updated
+        if token_id_yes:
+            await db.execute("UPDATE markets SET token_id_yes = ? WHERE condition_id = ?", (token_id_yes, condition_id))
+        if token_id_no:
+            await db.execute("UPDATE markets SET token_id_no = ? WHERE condition_id = ?", (token_id_no, condition_id))
+
+    @staticmethod
+    async def _write_wallet(db, wallet, timestamp):
+        await db.execute("""
+            INSERT OR IGNORE INTO wallets (address, last_updated)
+            VALUES (?, ?)
+        """, (wallet, timestamp))
+
+    @staticmethod
+    async def _insert_trade(db, wallet, condition_id, outcome, side, price, size, timestamp):
+        await db.execute("""
+            INSERT INTO wallet_trades (wallet_address, condition_id, outcome, side, entry_price, size_usd, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (wallet, condition_id, outcome, side, price, size, timestamp))
@@ -0,0 +1,134 @@
+import asyncio
+import time
+import aiosqlite
+from src.config import Config, console
+
+
+class DBWriter:
+    """
+    Single owner of the SQLite write connection.
+
+    Write requests are coroutines `op(db)` pushed onto a queue. The writer task
+    drains the queue and runs everything it collected (up to DB_BATCH_SIZE
+    ops, or whatever arrives within DB_FLUSH_INTERVAL) inside one transaction,
+    so a burst of fills costs one commit instead of one per event. Each op runs
+    in its own SAVEPOINT: a failing op is rolled back without losing the batch.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.db = None
+        self.queue = asyncio.Queue(maxsize=Config.DB_QUEUE_SIZE)
+        self._task = None
+
+        # Metrics
+        self.batches = 0
+        self.ops = 0
+        self.failed_ops = 0
+        self.last_batch_size = 0
+        self.last_commit_time = 0.0
+
+    async def start(self):
+        # isolation_level=None: we issue BEGIN/COMMIT ourselves
+        self.db = await aiosqlite.connect(self.path, isolation_level=None)
+        await self.db.execute("PRAGMA journal_mode=WAL;")
+        # WAL + NORMAL is durable across app crashes; only an OS crash can lose the last commits
+        await self.db.execute("PRAGMA synchronous=NORMAL;")
+        await self.db.execute(f"PRAGMA cache_size=-{int(Config.DB_CACHE_SIZE_KB)};")
+        await self.db.execute(f"PRAGMA mmap_size={int(Config.DB_MMAP_SIZE)};")
+        await self.db.execute("PRAGMA temp_store=MEMORY;")
+        await self.db.execute("PRAGMA busy_timeout=5000;")
+        self._task = asyncio.create_task(self._run())
+
+    async def submit(self, op, wait: bool = False):
+        """
+        Queues `op(db)` for the next batch.
+        With wait=True, returns op's result once the batch has been committed.
+        """
+        future = asyncio.get_running_loop().create_future() if wait else None
+        await self.queue.put((op, future))
+        if future is not None:
+            return await future
+
+    async def flush(self):
+        """Waits until everything queued so far is committed."""
+        await self.submit(_noop, wait=True)
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            deadline = time.monotonic() + Config.DB_FLUSH_INTERVAL
+            while len(batch) < Config.DB_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._commit_batch(batch)
+
+    async def _commit_batch(self, batch):
+        results = []
+        started = time.monotonic()
+        try:
+            await self.db.execute("BEGIN")
+            for op, future in batch:
+                await self.db.execute("SAVEPOINT op")
+                try:
+                    results.append((future, await op(self.db), None))
+                    await self.db.execute("RELEASE op")
+                except Exception as e:
+                    await self.db.execute("ROLLBACK TO op")
+                    await self.db.execute("RELEASE op")
+                    self.failed_ops += 1
+                    console.print(f"[red]DB write failed: {e}[/red]")
+                    results.append((future, None, e))
+            await self.db.execute("COMMIT")
+        except Exception as e:
+            console.print(f"[bold red]DB batch commit failed ({len(batch)} ops): {e}[/bold red]")
+            try:
+                await self.db.execute("ROLLBACK")
+            except Exception:
+                pass
+            results = [(future, None, e) for _, future in batch]
+
+        self.batches += 1
+        self.ops += len(batch)
+        self.last_batch_size = len(batch)
+        self.last_commit_time = time.monotonic() - started
+
+        for future, result, error in results:
+            if future is None or future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        for _ in batch:
+            self.queue.task_done()
+
+    async def close(self):
+        """Commits pending writes and closes the connection."""
+        if self._task:
+            await self.flush()
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.db:
+            await self.db.close()
+            self.db = None
+
+    def stats(self):
+        return {
+            "pending": self.queue.qsize(),
+            "batches": self.batches,
+            "ops": self.ops,
+            "failed_ops": self.failed_ops,
+            "last_batch_size": self.last_batch_size,
+            "last_commit_time": self.last_commit_time,
+        }
+
+
+async def _noop(db):
+    return None
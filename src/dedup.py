@@ -0,0 +1,111 @@
+import json
+import time
+from collections import OrderedDict
+from src.config import Config, console
+from src.database import Database
+
+
+class DedupStore:
+    """
+    Bounded "have we already handled this activity?" state for the Tracker.
+
+    Per wallet we keep a high-water mark: the newest activity timestamp seen and
+    the ids that share it. Older ids are remembered only for DEDUP_WINDOW_SECONDS
+    (late/out-of-order API results) and capped at DEDUP_MAX_IDS overall, so
+    memory stays flat over weeks of uptime. Watermarks are persisted to SQLite:
+    after a restart the tracker resumes from them instead of discarding
+    everything that happened while it was down.
+    """
+
+    def __init__(self, window: float = None, max_ids: int = None):
+        self.window = window if window is not None else Config.DEDUP_WINDOW_SECONDS
+        self.max_ids = max_ids if max_ids is not None else Config.DEDUP_MAX_IDS
+        self.watermarks = {}         # wallet -> [timestamp, set(ids at timestamp)]
+        self.coverage_start = {}     # wallet -> ts from which `recent` is authoritative
+        self.recent = OrderedDict()  # (wallet, act_id) -> timestamp
+        self._dirty = set()
+
+    def has_watermark(self, wallet):
+        return wallet in self.watermarks
+
+    def cursor(self, wallet):
+        """Timestamp to resume fetching from (None for a wallet without a baseline)."""
+        wm = self.watermarks.get(wallet)
+        return wm[0] if wm is not None else None
+
+    def set_baseline(self, wallet, activities=()):
+        """
+        First sighting of a wallet: remember its history without processing it.
+        An empty history gives a zero watermark, so its first trade is picked up.
+        """
+        self.watermarks[wallet] = [0, set()]
+        self.coverage_start[wallet] = 0
+        for act_id, timestamp in activities:
+            self.mark(wallet, act_id, timestamp)
+        self._dirty.add(wallet)
+
+    def is_new(self, wallet, act_id, timestamp):
+        wm = self.watermarks.get(wallet)
+        if wm is None:
+            return True
+        wm_ts, wm_ids = wm
+        if timestamp > wm_ts:
+            return True
+        if timestamp == wm_ts:
+            return act_id not in wm_ids
+        # Older than the watermark: only trust ids we have been tracking in-process
+        if timestamp <= self.coverage_start.get(wallet, wm_ts) or timestamp < wm_ts - self.window:
+            return False
+        return (wallet, act_id) not in self.recent
+
+    def mark(self, wallet, act_id, timestamp):
+        wm = self.watermarks.get(wallet)
+        if wm is None:
+            wm = self.watermarks[wallet] = [timestamp, set()]
+            self.coverage_start[wallet] = timestamp
+        if timestamp > wm[0]:
+            wm[0] = timestamp
+            wm[1] = {act_id}
+            self._dirty.add(wallet)
+        elif timestamp == wm[0] and act_id not in wm[1]:
+            wm[1].add(act_id)
+            self._dirty.add(wallet)
+
+        self.recent[(wallet, act_id)] = timestamp
+        self._evict()
+
+    def _evict(self):
+        horizon = time.time() - self.window
+        while self.recent:
+            key, ts = next(iter(self.recent.items()))
+            if ts >= horizon and len(self.recent) <= self.max_ids:
+                break
+            self.recent.popitem(last=False)
+
+    async def load(self):
+        """Restores watermarks persisted by a previous run."""
+        rows = await Database.load_tracker_state()
+        for wallet, last_timestamp, last_ids in rows:
+            try:
+                ids = set(json.loads(last_ids or "[]"))
+            except ValueError:
+                ids = set()
+            self.watermarks[wallet] = [int(last_timestamp or 0), ids]
+            # Nothing older than the watermark is tracked yet: treat it as seen
+            self.coverage_start[wallet] = int(last_timestamp or 0)
+        if rows:
+            console.print(f"[dim]Dedup: resumed {len(rows)} wallet watermarks.[/dim]")
+
+    async def persist(self):
+        """Writes changed watermarks through the group-commit writer."""
+        if not self._dirty:
+            return
+        rows = []
+        for wallet in self._dirty:
+            wm_ts, wm_ids = self.watermarks[wallet]
+            rows.append((wallet, wm_ts, json.dumps(sorted(wm_ids)), int(time.time())))
+        self._dirty.clear()
+        await Database.save_tracker_state(rows)
+
+    def stats(self):
+        return {"wallets": len(self.watermarks), "recent_ids": len(self.recent)}
@@ -0,0 +1,114 @@
+import asyncio
+import time
+import zlib
+from src.config import Config, console
+from src.metrics import Metrics
+
+
+class Dispatcher:
+    """
+    Bounded, sharded work queue between the Tracker and the trade callback.
+
+    Every activity is routed to one of N worker queues by hashing its market
+    key (asset / conditionId). Events for the same market therefore stay in
+    order, while different markets are processed in parallel. When a shard is
+    full, submit() waits (backpressure on the poll loop) instead of growing memory.
+    """
+
+    def __init__(self, callback, workers: int = None, queue_size: int = None):
+        self.callback = callback
+        self.num_workers = max(1, workers or Config.DISPATCH_WORKERS)
+        self.queue_size = max(1, queue_size or Config.DISPATCH_QUEUE_SIZE)
+        self.queues = []
+        self._workers = []
+
+        # Backpressure metrics
+        self.submitted = 0
+        self.processed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+        self.blocked_submits = 0
+
+    @staticmethod
+    def market_key(act):
+        """Ordering key: events sharing it are processed strictly in sequence."""
+        return act.get('asset') or act.get('conditionId') or act.get('wallet_address') or ''
+
+    def _shard(self, key):
+        # crc32 is stable across runs (unlike hash() on str) and cheap
+        return zlib.crc32(str(key).encode()) % self.num_workers
+
+    def start(self):
+        """Spawns the worker pool. Must be called from a running loop."""
+        if self._workers:
+            return
+        # Split the total capacity across shards so the global bound holds
+        per_shard = max(1, self.queue_size // self.num_workers)
+        self.queues = [asyncio.Queue(maxsize=per_shard) for _ in range(self.num_workers)]
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.num_workers)]
+        console.print(f"[dim]Dispatcher started: {self.num_workers} workers, queue capacity {per_shard * self.num_workers}[/dim]")
+
+    async def submit(self, act):
+        """Enqueues an activity. Blocks only when its shard is full."""
+        if not self._workers:
+            self.start()
+        queue = self.queues[self._shard(self.market_key(act))]
+        timestamp = act.get('timestamp')
+        if timestamp:
+            # Whale's fill -> detected by us (poll interval / log latency)
+            Metrics.observe("detection_lag_seconds", max(0.0, time.time() - float(timestamp)))
+        if queue.full():
+            self.blocked_submits += 1
+        await queue.put((time.monotonic(), act))
+        self.submitted += 1
+
+    async def _worker(self, index):
+        queue = self.queues[index]
+        while True:
+            enqueued_at, act = await queue.get()
+            wait = time.monotonic() - enqueued_at
+            self.last_wait = wait
+            self.total_wait += wait
+            if wait > self.max_wait:
+                self.max_wait = wait
+            Metrics.observe("stage_seconds", wait, stage="queue")
+            try:
+                await self.callback(act)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                console.print(f"[bold red]Dispatcher worker {index} error: {e}[/bold red]")
+            finally:
+                queue.task_done()
+
+    async def join(self):
+        """Waits until every queued activity has been processed."""
+        for queue in self.queues:
+            await queue.join()
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def depth(self):
+        return sum(q.qsize() for q in self.queues)
+
+    def stats(self):
+        """Snapshot of queue depth and wait-time metrics."""
+        done = self.processed + self.failed
+        return {
+            "workers": self.num_workers,
+            "depth": self.depth(),
+            "shard_depths": [q.qsize() for q in self.queues],
+            "submitted": self.submitted,
+            "processed": self.processed,
+            "failed": self.failed,
+            "blocked_submits": self.blocked_submits,
+            "avg_wait": (self.total_wait / done) if done else 0.0,
+            "max_wait": self.max_wait,
+            "last_wait": self.last_wait,
+        }
@@ -0,0 +1,107 @@
+import asyncio
+import time
+from src.config import Config, console
+
+
+class PendingFill:
+    __slots__ = ("size", "price", "first_ts", "last_ts", "fills")
+
+    def __init__(self, size, price, timestamp):
+        self.size = size
+        self.price = price
+        self.first_ts = timestamp
+        self.last_ts = timestamp
+        self.fills = 1
+
+    def merge(self, size, price, timestamp):
+        """Adds a partial fill, keeping `price` as the volume-weighted average."""
+        new_size = self.size + size
+        if new_size > 0:
+            self.price = ((self.price * self.size) + (price * size)) / new_size
+        else:
+            self.price = price # Should not happen unless negative sizes
+        self.size = new_size
+        self.last_ts = max(self.last_ts, timestamp)
+        self.fills += 1
+
+
+class FillAggregator:
+    """
+    In-memory partial-fill window for wallet_trades.
+
+    Fills keyed by (wallet, condition_id, side, outcome) that arrive within
+    AGGREGATION_WINDOW seconds of the previous one are merged (VWAP) in memory.
+    Once the window closes the merged fill is handed to `on_flush`, so the hot
+    path never has to SELECT the last row back out of SQLite.
+    """
+
+    def __init__(self, on_flush, window: float = None):
+        self.on_flush = on_flush
+        self.window = window if window is not None else Config.AGGREGATION_WINDOW
+        self.pending = {}
+        self._task = None
+
+        self.merged = 0
+        self.flushed = 0
+
+    async def add(self, wallet, condition_id, side, outcome, size, price, timestamp):
+        key = (wallet, condition_id, side, outcome)
+        entry = self.pending.get(key)
+
+        if entry is not None and timestamp - entry.last_ts <= self.window:
+            entry.merge(size, price, timestamp)
+            self.merged += 1
+            console.print(f"[dim]DB: Aggregated trade for {wallet[:6]} (New Size: ${entry.size:.2f})[/dim]")
+            return
+
+        if entry is not None:
+            # Same key but outside the window: close the old row first
+            await self._flush(key, self.pending.pop(key))
+        self.pending[key] = PendingFill(size, price, timestamp)
+
+    async def flush_expired(self, now: float = None):
+        """Flushes every entry whose window has closed."""
+        now = time.time() if now is None else now
+        expired = [k for k, e in self.pending.items() if now - e.last_ts > self.window]
+        for key in expired:
+            await self._flush(key, self.pending.pop(key))
+        return len(expired)
+
+    async def flush_key(self, wallet, condition_id, side, outcome, **kwargs):
+        """Closes one entry's window now (durable writes); extra kwargs go to `on_flush`."""
+        key = (wallet, condition_id, side, outcome)
+        entry = self.pending.pop(key, None)
+        if entry is not None:
+            await self._flush(key, entry, **kwargs)
+
+    async def flush_all(self):
+        for key in list(self.pending):
+            await self._flush(key, self.pending.pop(key))
+
+    async def _flush(self, key, entry, **kwargs):
+        self.flushed += 1
+        await self.on_flush(key, entry, **kwargs)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        interval = max(1.0, self.window / 4)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush_expired()
+            except Exception as e:
+                console.print(f"[red]Fill aggregator flush error: {e}[/red]")
+
+    async def stop(self):
+        """Stops the sweeper and writes out everything still buffered."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush_all()
+
+    def stats(self):
+        return {"pending": len(self.pending), "merged": self.merged, "flushed": self.flushed}
@@ -0,0 +1,110 @@
+import aiohttp
+from urllib.parse import urlparse
+from src.config import Config, console
+
+
+class HttpClient:
+    """
+    Process-wide HTTP transport.
+
+    Keeps one pooled aiohttp session per host (data-api, CLOB, Gamma, Telegram...)
+    with keep-alive, a DNS cache, connection limits and sane timeouts, so steady
+    state traffic reuses warm TLS connections instead of handshaking per request.
+    """
+
+    _sessions = {}
+    _stats = {}
+
+    @staticmethod
+    def _host(url):
+        parsed = urlparse(url)
+        return parsed.netloc or url
+
+    @classmethod
+    def _trace_config(cls, host):
+        stats = cls._stats.setdefault(host, {
+            "requests": 0,
+            "errors": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "dns_lookups": 0,
+            "dns_cache_hits": 0,
+        })
+
+        async def on_request_start(session, ctx, params):
+            stats["requests"] += 1
+
+        async def on_request_exception(session, ctx, params):
+            stats["errors"] += 1
+
+        async def on_connection_create_end(session, ctx, params):
+            # A new connection means a TCP (+TLS) handshake
+            stats["connections_created"] += 1
+
+        async def on_connection_reuseconn(session, ctx, params):
+            stats["connections_reused"] += 1
+
+        async def on_dns_resolvehost_end(session, ctx, params):
+            stats["dns_lookups"] += 1
+
+        async def on_dns_cache_hit(session, ctx, params):
+            stats["dns_cache_hits"] += 1
+
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(on_request_start)
+        trace.on_request_exception.append(on_request_exception)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+        trace.on_dns_cache_hit.append(on_dns_cache_hit)
+        return trace
+
+    @classmethod
+    def session(cls, base_url) -> aiohttp.ClientSession:
+        """
+        Returns the shared session for the host of `base_url`, creating it on first use.
+        Must be called from inside the running event loop.
+        """
+        host = cls._host(base_url)
+        session = cls._sessions.get(host)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=Config.HTTP_POOL_LIMIT,
+                limit_per_host=Config.HTTP_POOL_LIMIT_PER_HOST,
+                ttl_dns_cache=Config.HTTP_DNS_CACHE_TTL,
+                keepalive_timeout=Config.HTTP_KEEPALIVE_TIMEOUT,
+                enable_cleanup_closed=True,
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=Config.HTTP_TIMEOUT,
+                connect=Config.HTTP_CONNECT_TIMEOUT,
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=timeout,
+                trace_configs=[cls._trace_config(host)],
+            )
+            cls._sessions[host] = session
+        return session
+
+    @classmethod
+    async def warm_up(cls, *base_urls):
+        """Opens a connection to each host ahead of the first real request."""
+        for url in base_urls:
+            try:
+                async with cls.session(url).head(url) as response:
+                    await response.read()
+            except Exception as e:
+                console.print(f"[dim]HTTP warm-up failed for {cls._host(url)}: {e}[/dim]")
+
+    @classmethod
+    def stats(cls):
+        """Per-host pool counters (requests, handshakes, reuses, DNS cache hits)."""
+        return {host: dict(values) for host, values in cls._stats.items()}
+
+    @classmethod
+    async def close(cls):
+        for session in cls._sessions.values():
+            if not session.closed:
+                await session.close()
+        cls._sessions = {}
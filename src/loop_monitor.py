@@ -0,0 +1,59 @@
+import asyncio
+import time
+from src.config import Config
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop responsiveness: sleeps `interval` and records how late
+    it wakes up. Lag is also tracked separately while `busy_probe()` is true
+    (e.g. while orders are in flight) to show those don't stall the loop.
+    """
+
+    def __init__(self, interval: float = None, busy_probe=None):
+        self.interval = interval if interval is not None else Config.LOOP_LAG_INTERVAL
+        self.busy_probe = busy_probe
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.avg_lag = 0.0
+        self.max_lag_busy = 0.0
+        self.samples = 0
+        self.busy_samples = 0
+        self._task = None
+
+    def record(self, lag):
+        self.samples += 1
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        # EWMA so a single spike doesn't dominate the average forever
+        self.avg_lag = lag if self.samples == 1 else self.avg_lag * 0.9 + lag * 0.1
+        if self.busy_probe and self.busy_probe():
+            self.busy_samples += 1
+            self.max_lag_busy = max(self.max_lag_busy, lag)
+
+    async def _run(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, time.monotonic() - started - self.interval))
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self):
+        return {
+            "last_lag": self.last_lag,
+            "avg_lag": self.avg_lag,
+            "max_lag": self.max_lag,
+            "max_lag_busy": self.max_lag_busy,
+            "samples": self.samples,
+            "busy_samples": self.busy_samples,
+        }
@@ -1,53 +1,128 @@
-import aiohttp
 import json
 from rich.console import Console
 from src.config import Config
+from src.database import Database
+from src.http_client import HttpClient
+from src.market_cache import MarketCache
 
 console = Console()
 # Use CLOB API for precise market lookup by condition_id
 
+class MarketLookupError(Exception):
+    """Transient failure (5xx, timeout...). Not cached, unlike a definitive miss."""
+
 class MarketAPI:
     @staticmethod
     async def get_token_ids(condition_id):
         """
-        Fetches the clobTokenIds (YES/NO token IDs) for a given condition_id from CLOB API.
+        Resolves the clobTokenIds (YES/NO token IDs) for a given condition_id.
+        Lookup order: in-memory LRU -> markets table -> CLOB API.
         Returns (yes_token_id, no_token_id) or (None, None) if not found/error.
         """
         if not condition_id:
             return None, None
-            
-        url = f"{Config.POLYMARKET_CLOB_API_URL}/markets/{condition_id}"
-        
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        
-                        # Data should be a single market object
-                        # Structure: "tokens": [{"token_id": "...", "outcome": "Yes"}, ...]
-                        tokens = data.get('tokens')
-                        if tokens and isinstance(tokens, list):
-                            yes_id = None
-                            no_id = None
-                            
-                            for t in tokens:
-                                if t.get('outcome') == "Yes":
-                                    yes_id = t.get('token_id')
-                                elif t.get('outcome') == "No":
-                                    no_id = t.get('token_id')
-                            
-                            # If we found at least one, return them (some markets might be weird)
-                            # But ideally we want both
-                            if yes_id or no_id:
-                                return yes_id, no_id
-                                
-                    elif response.status == 404:
-                         console.print(f"[yellow]Market not found in CLOB for {condition_id}[/yellow]")
-                    else:
-                        console.print(f"[red]Error fetching CLOB market: {response.status}[/red]")
 
+        try:
+            return await MarketCache.get_or_load(condition_id, MarketAPI._load_token_ids)
         except Exception as e:
             console.print(f"[red]Error fetching market details: {e}[/red]")
-            
+
+        return None, None
+
+    @staticmethod
+    async def get_token_info(token_id):
+        """
+        Reverse lookup for a CLOB token id (e.g. from an on-chain OrderFilled log).
+        Returns {'conditionId', 'title', 'outcome'} or None.
+        """
+        if not token_id:
+            return None
+
+        try:
+            return await MarketCache.get_or_load_token(str(token_id), MarketAPI._load_token_info)
+        except Exception as e:
+            console.print(f"[red]Error fetching token details: {e}[/red]")
+
+        return None
+
+    @staticmethod
+    async def _load_token_info(token_id):
+        url = f"{Config.POLYMARKET_GAMMA_API_URL}/markets"
+        session = HttpClient.session(Config.POLYMARKET_GAMMA_API_URL)
+        async with session.get(url, params={"clob_token_ids": token_id}) as response:
+            if response.status != 200:
+                raise MarketLookupError(f"Error fetching Gamma market: {response.status}")
+            markets = await response.json()
+
+        info = None
+        for market in markets or []:
+            # Gamma returns these two as JSON-encoded strings
+            token_ids = market.get('clobTokenIds')
+            outcomes = market.get('outcomes')
+            token_ids = json.loads(token_ids) if isinstance(token_ids, str) else (token_ids or [])
+            outcomes = json.loads(outcomes) if isinstance(outcomes, str) else (outcomes or [])
+            if token_id in token_ids:
+                idx = token_ids.index(token_id)
+                info = {
+                    'conditionId': market.get('conditionId'),
+                    'title': market.get('question', 'Unknown Market'),
+                    'outcome': outcomes[idx] if idx < len(outcomes) else '-',
+                    'outcomeIndex': idx,
+                }
+                break
+
+        MarketCache.put_token(token_id, info)
+        return info
+
+    @staticmethod
+    async def warm_cache():
+        """Preloads the in-memory cache from the markets table."""
+        rows = await Database.load_market_tokens(Config.MARKET_CACHE_SIZE)
+        size = MarketCache.warm(rows)
+        console.print(f"[dim]Market cache warmed with {size} markets.[/dim]")
+
+    @staticmethod
+    async def _load_token_ids(condition_id):
+        # Tier 2: markets table (filled by Database.log_whale_activity)
+        yes_id, no_id = await Database.get_market_tokens(condition_id)
+        if yes_id or no_id:
+            MarketCache.put(condition_id, yes_id, no_id)
+            return yes_id, no_id
+
+        # Tier 3: CLOB API. Definitive misses are cached negatively; transient errors raise.
+        url = f"{Config.POLYMARKET_CLOB_API_URL}/markets/{condition_id}"
+        session = HttpClient.session(Config.POLYMARKET_CLOB_API_URL)
+        yes_id, no_id = await MarketAPI._fetch_token_ids(session, url, condition_id)
+        MarketCache.put(condition_id, yes_id, no_id)
+        return yes_id, no_id
+
+    @staticmethod
+    async def _fetch_token_ids(session, url, condition_id):
+        async with session.get(url) as response:
+            if response.status == 200:
+                data = await response.json()
+
+                # Data should be a single market object
+                # Structure: "tokens": [{"token_id": "...", "outcome": "Yes"}, ...]
+                tokens = data.get('tokens')
+                if tokens and isinstance(tokens, list):
+                    yes_id = None
+                    no_id = None
+
+                    for t in tokens:
+                        if t.get('outcome') == "Yes":
+                            yes_id = t.get('token_id')
+                        elif t.get('outcome') == "No":
+                            no_id = t.get('token_id')
+
+                    # If we found at least one, return them (some markets might be weird)
+                    # But ideally we want both
+                    if yes_id or no_id:
+                        return yes_id, no_id
+
+            elif response.status == 404:
+                 console.print(f"[yellow]Market not found in CLOB for {condition_id}[/yellow]")
+            else:
+                raise MarketLookupError(f"Error fetching CLOB market: {response.status}")
+
         return None, None
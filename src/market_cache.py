@@ -0,0 +1,136 @@
+import asyncio
+import time
+from collections import OrderedDict
+from src.config import Config
+
+
+class MarketCache:
+    """
+    In-memory LRU (with TTL) of condition_id -> (token_id_yes, token_id_no).
+
+    Tier 1 of the token lookup; tier 2 is the `markets` table (see MarketAPI).
+    Misses such as 404s are stored as negative entries with a shorter TTL, and
+    concurrent lookups of the same condition_id share one in-flight future.
+    """
+
+    _entries = OrderedDict()  # condition_id -> (expires_at, (yes, no))
+    _tokens = OrderedDict()   # token_id -> (expires_at, {conditionId, title, outcome} or None)
+    _inflight = {}            # condition_id / ("token", token_id) -> asyncio.Future
+
+    hits = 0
+    negative_hits = 0
+    misses = 0
+    coalesced = 0
+
+    @classmethod
+    def get(cls, condition_id):
+        """Returns the cached (yes, no) tuple, or None if absent/expired."""
+        entry = cls._entries.get(condition_id)
+        if entry is None:
+            cls.misses += 1
+            return None
+
+        expires_at, tokens = entry
+        if expires_at < time.monotonic():
+            del cls._entries[condition_id]
+            cls.misses += 1
+            return None
+
+        cls._entries.move_to_end(condition_id)
+        if tokens == (None, None):
+            cls.negative_hits += 1
+        else:
+            cls.hits += 1
+        return tokens
+
+    @classmethod
+    def put(cls, condition_id, yes_id, no_id, ttl=None):
+        if ttl is None:
+            ttl = Config.MARKET_CACHE_TTL if (yes_id or no_id) else Config.MARKET_CACHE_NEGATIVE_TTL
+        cls._entries[condition_id] = (time.monotonic() + ttl, (yes_id, no_id))
+        cls._entries.move_to_end(condition_id)
+        while len(cls._entries) > Config.MARKET_CACHE_SIZE:
+            cls._entries.popitem(last=False)
+
+    @classmethod
+    def invalidate(cls, condition_id):
+        cls._entries.pop(condition_id, None)
+
+    @classmethod
+    async def get_or_load(cls, condition_id, loader):
+        """
+        Cache lookup with single-flight loading: only the first caller runs
+        `loader(condition_id)`; everyone else awaits the same future.
+        """
+        tokens = cls.get(condition_id)
+        if tokens is not None:
+            return tokens
+        return await cls._single_flight(condition_id, lambda: loader(condition_id))
+
+    @classmethod
+    async def _single_flight(cls, key, load):
+        pending = cls._inflight.get(key)
+        if pending is not None:
+            cls.coalesced += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        cls._inflight[key] = future
+        try:
+            result = await load()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure doesn't log "exception never retrieved"
+            future.exception()
+            raise
+        finally:
+            cls._inflight.pop(key, None)
+
+    @classmethod
+    def get_token(cls, token_id):
+        """Cached market info for a CLOB token id: (found, info)."""
+        entry = cls._tokens.get(token_id)
+        if entry is None or entry[0] < time.monotonic():
+            cls._tokens.pop(token_id, None)
+            cls.misses += 1
+            return False, None
+        cls._tokens.move_to_end(token_id)
+        cls.hits += 1
+        return True, entry[1]
+
+    @classmethod
+    def put_token(cls, token_id, info):
+        ttl = Config.MARKET_CACHE_TTL if info else Config.MARKET_CACHE_NEGATIVE_TTL
+        cls._tokens[token_id] = (time.monotonic() + ttl, info)
+        cls._tokens.move_to_end(token_id)
+        while len(cls._tokens) > Config.MARKET_CACHE_SIZE:
+            cls._tokens.popitem(last=False)
+
+    @classmethod
+    async def get_or_load_token(cls, token_id, loader):
+        found, info = cls.get_token(token_id)
+        if found:
+            return info
+        return await cls._single_flight(("token", token_id), lambda: loader(token_id))
+
+    @classmethod
+    def warm(cls, rows):
+        """Bulk-loads (condition_id, yes, no) rows, e.g. from the markets table at startup."""
+        for condition_id, yes_id, no_id in rows:
+            if yes_id or no_id:
+                cls.put(condition_id, yes_id, no_id)
+        return len(cls._entries)
+
+    @classmethod
+    def stats(cls):
+        return {
+            "size": len(cls._entries),
+            "tokens": len(cls._tokens),
+            "hits": cls.hits,
+            "negative_hits": cls.negative_hits,
+            "misses": cls.misses,
+            "coalesced": cls.coalesced,
+            "inflight": len(cls._inflight),
+        }
@@ -0,0 +1,161 @@
+import asyncio
+import math
+import time
+from src.config import Config, console
+from py_clob_client.clob_types import PartialCreateOrderOptions
+
+
+class MarketParams:
+    __slots__ = ("tick_size", "neg_risk", "fee_rate_bps", "prices", "fetched_at", "last_used")
+
+    def __init__(self, tick_size, neg_risk, fee_rate_bps, prices):
+        self.tick_size = tick_size
+        self.neg_risk = neg_risk
+        self.fee_rate_bps = fee_rate_bps
+        self.prices = prices  # /price for each side of the book
+        self.fetched_at = time.monotonic()
+        self.last_used = self.fetched_at
+
+
+class MarketParamsCache:
+    """
+    Per-token order parameters (tick size, neg-risk flag, fee rate, current price).
+
+    Without them, every create_market_order makes the CLOB client look these up
+    over the network before signing. The cache is pre-warmed as soon as a
+    market's token IDs are known, refreshed in the background while the token
+    is in use, and invalidated when an order on that token fails, so building
+    the order is local work and the copy trade costs a single POST.
+    """
+
+    def __init__(self, trader):
+        self.trader = trader
+        self.entries = {}
+        self._inflight = {}
+        self._task = None
+        self._background = set()  # strong refs to fetch / prewarm tasks until they finish
+
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.invalidations = 0
+
+    def get(self, token_id):
+        entry = self.entries.get(token_id)
+        if entry is None or time.monotonic() - entry.fetched_at > Config.MARKET_PARAMS_MAX_AGE:
+            self.misses += 1
+            return None
+        entry.last_used = time.monotonic()
+        self.hits += 1
+        return entry
+
+    def _fetch(self, token_id):
+        """Blocking: runs on the trader's order thread pool."""
+        client = self.trader.client
+        tick_size = client.get_tick_size(token_id)
+        neg_risk = client.get_neg_risk(token_id)
+        fee_rate_bps = None
+        # Only newer py-clob-client versions expose the fee rate endpoint
+        if hasattr(client, "get_fee_rate_bps"):
+            try:
+                fee_rate_bps = int(client.get_fee_rate_bps(token_id))
+            except Exception:
+                fee_rate_bps = None
+        prices = {}
+        for side in ("BUY", "SELL"):
+            try:
+                prices[side] = float(client.get_price(token_id, side).get("price"))
+            except Exception:
+                pass
+        return MarketParams(tick_size, neg_risk, fee_rate_bps, prices)
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+    async def load(self, token_id):
+        """Fetches (or joins an in-flight fetch of) the params for one token. None on failure."""
+        if not self.trader.client or not token_id:
+            return None
+        pending = self._inflight.get(token_id)
+        if pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                return None  # the fetching caller already logged it
+
+        task = self._spawn(self.trader.executor.run(self._fetch, token_id, label="market_params"))
+        self._inflight[token_id] = task
+        try:
+            previous = self.entries.get(token_id)
+            entry = await task
+            if previous is not None:
+                entry.last_used = previous.last_used
+            self.entries[token_id] = entry
+            return entry
+        except Exception as e:
+            console.print(f"[dim]Market params fetch failed for {str(token_id)[:10]}...: {e}[/dim]")
+            return None
+        finally:
+            self._inflight.pop(token_id, None)
+
+    def prewarm(self, token_ids):
+        """Fire-and-forget load for tokens we don't have yet."""
+        for token_id in token_ids:
+            if token_id and token_id not in self.entries and token_id not in self._inflight:
+                self._spawn(self.load(token_id))
+
+    def invalidate(self, token_id):
+        if self.entries.pop(token_id, None) is not None:
+            self.invalidations += 1
+
+    def order_options(self, entry):
+        return PartialCreateOrderOptions(tick_size=entry.tick_size, neg_risk=entry.neg_risk)
+
+    @staticmethod
+    def worst_price(entry, side, tolerance):
+        """
+        Price limit for a market order from the cached price +/- tolerance,
+        snapped to the tick grid and kept inside (0, 1). None if no price is cached.
+        """
+        quotes = [p for p in entry.prices.values() if p]
+        if not quotes:
+            return None
+        # Reference the far side of the spread: what a BUY pays / a SELL receives
+        price = max(quotes) if side == "BUY" else min(quotes)
+        tick = float(entry.tick_size)
+        if side == "BUY":
+            limit = math.ceil(price * (1 + tolerance) / tick) * tick
+        else:
+            limit = math.floor(price * (1 - tolerance) / tick) * tick
+        return round(min(1 - tick, max(tick, limit)), 6)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(Config.MARKET_PARAMS_REFRESH)
+            now = time.monotonic()
+            for token_id, entry in list(self.entries.items()):
+                if now - entry.last_used > Config.MARKET_PARAMS_IDLE_TTL:
+                    # Not traded recently: drop instead of refreshing forever
+                    del self.entries[token_id]
+                elif now - entry.fetched_at >= Config.MARKET_PARAMS_REFRESH:
+                    self.refreshes += 1
+                    await self.load(token_id)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    def stats(self):
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "invalidations": self.invalidations,
+        }
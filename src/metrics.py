@@ -0,0 +1,165 @@
+import re
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from src.config import Config, console
+
+PREFIX = "polymarket"
+# Seconds: sub-millisecond cache hits up to multi-minute copy lag
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+
+def _name(*parts):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", "_".join(str(p) for p in parts if p != ""))
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """
+    In-process counters, latency histograms and component gauges, rendered in
+    Prometheus text format on a small local HTTP endpoint (METRICS_PORT).
+
+    Hot paths only touch dicts: `inc()`, `observe()` and the `stage()` timer.
+    Component `stats()` snapshots are pulled through registered collectors at
+    scrape time, so nothing is computed unless someone is scraping.
+    """
+
+    counters = {}     # (name, labels) -> value
+    histograms = {}   # (name, labels) -> Histogram
+    collectors = {}   # component -> (stats fn, label name for top-level keys or None)
+    _runner = None
+
+    @classmethod
+    def inc(cls, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        cls.counters[key] = cls.counters.get(key, 0) + value
+
+    @classmethod
+    def observe(cls, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = cls.histograms.get(key)
+        if histogram is None:
+            histogram = cls.histograms[key] = Histogram()
+        histogram.observe(value)
+
+    @classmethod
+    @contextmanager
+    def stage(cls, stage):
+        """Times a block into stage_seconds{stage=...} (monotonic clock)."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            cls.observe("stage_seconds", time.monotonic() - started, stage=stage)
+
+    @classmethod
+    def register(cls, component, stats_fn, label=None):
+        """Exposes a component's stats() dict as gauges. With `label`, top-level keys become that label."""
+        cls.collectors[component] = (stats_fn, label)
+
+    @classmethod
+    def _gauges(cls, name, value, labels, out):
+        if isinstance(value, bool):
+            out.append((name, labels, int(value)))
+        elif isinstance(value, (int, float)):
+            out.append((name, labels, value))
+        elif isinstance(value, dict):
+            for key, sub in value.items():
+                cls._gauges(_name(name, key), sub, labels, out)
+        # Lists, strings and None aren't exported
+
+    @classmethod
+    def render(cls):
+        lines = []
+        typed = set()
+        for (name, labels), value in sorted(cls.counters.items()):
+            full = _name(PREFIX, name)
+            if full not in typed:
+                lines.append(f"# TYPE {full} counter")
+                typed.add(full)
+            lines.append(f"{full}{_labels(labels)} {value}")
+
+        for (name, labels), h in sorted(cls.histograms.items(), key=lambda item: item[0]):
+            full = _name(PREFIX, name)
+            if full not in typed:
+                lines.append(f"# TYPE {full} histogram")
+                typed.add(full)
+            cumulative = 0
+            for bound, count in zip(list(h.buckets) + ["+Inf"], h.counts):
+                cumulative += count
+                lines.append(f"{full}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{full}_sum{_labels(labels)} {h.sum}")
+            lines.append(f"{full}_count{_labels(labels)} {h.count}")
+
+        for component, (stats_fn, label) in cls.collectors.items():
+            try:
+                stats = stats_fn()
+            except Exception as e:
+                console.print(f"[dim]Metrics collector {component} failed: {e}[/dim]")
+                continue
+            gauges = []
+            if label:
+                for key, sub in stats.items():
+                    cls._gauges(_name(PREFIX, component), sub, ((label, key),), gauges)
+            else:
+                cls._gauges(_name(PREFIX, component), stats, (), gauges)
+            for name, labels, value in gauges:
+                if name not in typed:
+                    lines.append(f"# TYPE {name} gauge")
+                    typed.add(name)
+                lines.append(f"{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    async def serve(cls, host: str = None, port: int = None):
+        """Starts the /metrics endpoint. A port of 0 disables it."""
+        from aiohttp import web
+
+        host = host or Config.METRICS_HOST
+        port = Config.METRICS_PORT if port is None else port
+        if not port or cls._runner is not None:
+            return
+
+        async def handle(request):
+            return web.Response(text=cls.render(), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, host, port).start()
+        except OSError as e:
+            # Port taken (e.g. a second instance): trade on without the endpoint
+            await runner.cleanup()
+            console.print(f"[yellow]⚠ Metrics endpoint disabled, cannot bind {host}:{port} ({e})[/yellow]")
+            return
+        cls._runner = runner
+        console.print(f"[dim]Metrics on http://{host}:{port}/metrics[/dim]")
+
+    @classmethod
+    async def close(cls):
+        if cls._runner is not None:
+            await cls._runner.cleanup()
+            cls._runner = None
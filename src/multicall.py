@@ -0,0 +1,53 @@
+import asyncio
+from eth_abi import encode, decode
+from eth_utils import keccak, to_checksum_address
+from src.config import Config
+from src.rpc import JsonRpc
+
+
+def selector(signature):
+    """4-byte function selector for a signature like 'payoutDenominator(bytes32)'."""
+    return keccak(text=signature)[:4]
+
+
+def encode_call(signature, types, args):
+    return selector(signature) + encode(types, args)
+
+
+class Multicall:
+    """
+    Batches read-only contract calls through Multicall3.aggregate3.
+
+    Calls are (target, calldata) pairs; they are split into chunks of
+    MULTICALL_BATCH_SIZE and the chunks are sent concurrently as eth_calls, so
+    hundreds of reads cost a handful of round-trips. Results come back in call
+    order as raw return bytes, or None for a call that reverted.
+    """
+
+    AGGREGATE3 = "aggregate3((address,bool,bytes)[])"
+
+    def __init__(self, rpc: JsonRpc = None, address: str = None):
+        self.rpc = rpc or JsonRpc()
+        self.address = address or Config.MULTICALL3_ADDRESS
+        self.calls = 0
+        self.batches = 0
+
+    async def _aggregate(self, chunk):
+        data = encode_call(self.AGGREGATE3, ["(address,bool,bytes)[]"],
+                           [[(to_checksum_address(target), True, calldata) for target, calldata in chunk]])
+        self.batches += 1
+        raw = await self.rpc.call("eth_call", [{"to": self.address, "data": "0x" + data.hex()}, "latest"])
+        (results,) = decode(["(bool,bytes)[]"], bytes.fromhex(raw[2:]))
+        return [ret if ok else None for ok, ret in results]
+
+    async def aggregate(self, calls, batch_size: int = None):
+        if not calls:
+            return []
+        batch_size = batch_size or Config.MULTICALL_BATCH_SIZE
+        self.calls += len(calls)
+        chunks = [calls[i:i + batch_size] for i in range(0, len(calls), batch_size)]
+        results = await asyncio.gather(*(self._aggregate(chunk) for chunk in chunks))
+        return [ret for chunk in results for ret in chunk]
+
+    def stats(self):
+        return {"calls": self.calls, "batches": self.batches}
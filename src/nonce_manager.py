@@ -0,0 +1,143 @@
+import asyncio
+import time
+from eth_account import Account
+from src.config import Config, console
+from src.rpc import JsonRpc, RpcError
+
+
+class NonceManager:
+    """
+    Hands out nonces locally for one account.
+
+    The first allocation reads the pending transaction count; after that nonces
+    are incremented in memory, so transactions can be sent back-to-back without
+    a get_transaction_count round-trip each. `reset()` drops the local counter
+    (e.g. after a failed send) so the next allocation re-reads it from the node.
+    """
+
+    def __init__(self, rpc: JsonRpc, address: str):
+        self.rpc = rpc
+        self.address = address
+        self._next = None
+        self._lock = asyncio.Lock()
+        self.resyncs = 0
+
+    async def allocate(self):
+        async with self._lock:
+            if self._next is None:
+                self._next = int(await self.rpc.call("eth_getTransactionCount", [self.address, "pending"]), 16)
+                self.resyncs += 1
+            nonce = self._next
+            self._next += 1
+            return nonce
+
+    def reset(self):
+        self._next = None
+
+
+class PendingTx:
+    __slots__ = ("label", "tx", "hashes", "sent_at", "bumps")
+
+    def __init__(self, label, tx, tx_hash):
+        self.label = label
+        self.tx = tx
+        self.hashes = [tx_hash]
+        self.sent_at = time.monotonic()
+        self.bumps = 0
+
+
+class TxPipeline:
+    """
+    Sends signed transactions back-to-back and tracks their receipts concurrently.
+
+    `send()` allocates a nonce, signs locally and broadcasts without waiting
+    for inclusion. `wait()` polls for a receipt of any broadcast version of the
+    transaction; if none arrives within TX_BUMP_AFTER seconds the transaction
+    is re-signed with the same nonce and a higher gas price (replacement), up
+    to TX_MAX_BUMPS times.
+    """
+
+    def __init__(self, rpc: JsonRpc, private_key: str, chain_id: int = 137):
+        self.rpc = rpc
+        self.account = Account.from_key(private_key)
+        self.chain_id = chain_id
+        self.nonces = NonceManager(rpc, self.account.address)
+
+        self.sent = 0
+        self.confirmed = 0
+        self.failed = 0
+        self.replacements = 0
+
+    @property
+    def address(self):
+        return self.account.address
+
+    async def _broadcast(self, tx):
+        signed = self.account.sign_transaction(tx)
+        raw = getattr(signed, "raw_transaction", None) or signed.rawTransaction
+        return await self.rpc.call("eth_sendRawTransaction", ["0x" + bytes(raw).hex()])
+
+    async def send(self, to, data, gas, gas_price, label=""):
+        """Signs and broadcasts a transaction; returns a PendingTx (raises if the node rejects it)."""
+        nonce = await self.nonces.allocate()
+        tx = {
+            "to": to,
+            "data": data,
+            "value": 0,
+            "gas": gas,
+            "gasPrice": gas_price,
+            "nonce": nonce,
+            "chainId": self.chain_id,
+        }
+        try:
+            tx_hash = await self._broadcast(tx)
+        except Exception:
+            # The nonce may or may not have been consumed: re-read it for the next send
+            self.nonces.reset()
+            raise
+        self.sent += 1
+        return PendingTx(label, tx, tx_hash)
+
+    async def _bump(self, pending):
+        tx = dict(pending.tx)
+        # Nodes require at least +10% to accept a replacement
+        tx["gasPrice"] = int(tx["gasPrice"] * Config.TX_BUMP_FACTOR) + 1
+        try:
+            tx_hash = await self._broadcast(tx)
+        except RpcError as e:
+            # Usually "nonce too low": one of the earlier versions was just mined
+            console.print(f"[dim]Replacement for {pending.label} not accepted: {e}[/dim]")
+            return
+        pending.tx = tx
+        pending.hashes.append(tx_hash)
+        pending.sent_at = time.monotonic()
+        pending.bumps += 1
+        self.replacements += 1
+        console.print(f"[yellow]⛽ Bumped gas for {pending.label} to {tx['gasPrice'] / 1e9:.1f} gwei[/yellow]")
+
+    async def wait(self, pending, timeout: float = None):
+        """Returns the receipt of whichever version of the transaction got mined, or None on timeout."""
+        deadline = time.monotonic() + (timeout or Config.TX_RECEIPT_TIMEOUT)
+        while time.monotonic() < deadline:
+            receipts = await self.rpc.batch([("eth_getTransactionReceipt", [h]) for h in pending.hashes])
+            for receipt in receipts:
+                if receipt:
+                    if int(receipt.get("status", "0x0"), 16) == 1:
+                        self.confirmed += 1
+                    else:
+                        self.failed += 1
+                    return receipt
+            if pending.bumps < Config.TX_MAX_BUMPS and time.monotonic() - pending.sent_at >= Config.TX_BUMP_AFTER:
+                await self._bump(pending)
+            await asyncio.sleep(Config.TX_POLL_INTERVAL)
+        self.failed += 1
+        return None
+
+    def stats(self):
+        return {
+            "sent": self.sent,
+            "confirmed": self.confirmed,
+            "failed": self.failed,
+            "replacements": self.replacements,
+            "nonce_resyncs": self.nonces.resyncs,
+        }
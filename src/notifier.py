@@ -1,31 +1,173 @@
-import aiohttp
+import asyncio
+import json
+import time
+from collections import OrderedDict
 from src.config import Config, console
+from src.http_client import HttpClient
+from src.rate_limiter import TokenBucket
+
+# Telegram rejects messages longer than this
+MAX_MESSAGE_LENGTH = 4096
+
+
+class TelegramRejected(Exception):
+    """Non-retryable 4xx from sendMessage (anything but 429)."""
+
+
+class Digest:
+    __slots__ = ("messages", "first_at")
+
+    def __init__(self, message):
+        self.messages = [message]
+        self.first_at = time.monotonic()
+
+    def text(self):
+        if len(self.messages) == 1:
+            return self.messages[0]
+        text = f"📦 *{len(self.messages)} alerts*\n\n" + "\n\n".join(self.messages)
+        if len(text) > MAX_MESSAGE_LENGTH:
+            text = text[:MAX_MESSAGE_LENGTH - 20] + "\n…(truncated)"
+        return text
+
 
 class Notifier:
+    """
+    Fire-and-forget Telegram alerts.
+
+    `send_alert()` only enqueues, so the trade path never waits on Telegram. A
+    background task sends the queue through a per-chat token bucket, retries
+    failures with exponential backoff (honouring Telegram's retry_after on 429)
+    and coalesces alerts sharing a key (e.g. whale + market) that arrive within
+    NOTIFY_COALESCE_WINDOW into one digest message. When the queue is full the
+    oldest digest is dropped.
+    """
+
     def __init__(self):
         self.token = Config.TELEGRAM_BOT_TOKEN
         self.chat_id = Config.TELEGRAM_CHAT_ID
-        self.base_url = f"https://api.telegram.org/bot{self.token}/sendMessage"
+        self.base_url = f"{Config.TELEGRAM_API_URL}/bot{self.token}/sendMessage"
+
+        self.pending = OrderedDict()  # key -> Digest, oldest first
+        self.rate_limiter = TokenBucket(rate=Config.NOTIFY_RATE, burst=Config.NOTIFY_BURST, min_rate=0.05, max_rate=Config.NOTIFY_RATE)
+        self._ready = asyncio.Event()
+        self._task = None
+        self._seq = 0
 
-    async def send_alert(self, message: str):
-        """Sends a message to the configured Telegram chat."""
-        if not self.token or not self.chat_id:
+        self.enqueued = 0
+        self.coalesced = 0
+        self.sent = 0
+        self.retries = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @property
+    def enabled(self):
+        return bool(self.token and self.chat_id)
+
+    def send_alert(self, message: str, key=None):
+        """Queues a message for the configured Telegram chat. Never blocks."""
+        if not self.enabled:
             console.print("[yellow]Telegram config missing. Skipping alert.[/yellow]")
             return
 
+        self.enqueued += 1
+        if key is not None and key in self.pending:
+            self.pending[key].messages.append(message)
+            self.coalesced += 1
+            return
+
+        if key is None:
+            self._seq += 1
+            key = ("_", self._seq)
+        if len(self.pending) >= Config.NOTIFY_QUEUE_SIZE:
+            self.pending.popitem(last=False)
+            self.dropped += 1
+        self.pending[key] = Digest(message)
+        self._ready.set()
+
+    async def _post(self, text):
+        """One sendMessage attempt. Returns (ok, retry_after)."""
         payload = {
             "chat_id": self.chat_id,
-            "text": message,
+            "text": text,
             "parse_mode": "Markdown"
         }
+        session = HttpClient.session(Config.TELEGRAM_API_URL)
+        async with session.post(self.base_url, json=payload) as response:
+            if response.status == 200:
+                return True, None
+            # Gateway errors during an outage come back as HTML, not JSON
+            text = await response.text()
+            try:
+                body = json.loads(text)
+            except ValueError:
+                body = text[:200]
+            retry_after = (body.get("parameters") or {}).get("retry_after") if isinstance(body, dict) else None
+            if response.status == 429:
+                self.rate_limiter.on_throttle(TokenBucket.parse_retry_after(retry_after))
+            elif 400 <= response.status < 500:
+                # Bad request (e.g. Markdown parse error): retrying won't help
+                raise TelegramRejected(f"{response.status}: {body}")
+            console.print(f"[bold red]Failed to send Telegram alert: {response.status} {body}[/bold red]")
+            return False, TokenBucket.parse_retry_after(retry_after)
 
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.base_url, json=payload) as response:
-                    if response.status == 200:
-                        console.print(f"[green]Telegram alert sent: {message[:50]}...[/green]")
-                    else:
-                        err_text = await response.text()
-                        console.print(f"[bold red]Failed to send Telegram alert: {err_text}[/bold red]")
-        except Exception as e:
-            console.print(f"[bold red]Error sending Telegram alert: {e}[/bold red]")
+    async def _deliver(self, text):
+        delay = 1.0
+        for attempt in range(Config.NOTIFY_MAX_RETRIES + 1):
+            await self.rate_limiter.acquire()
+            try:
+                ok, retry_after = await self._post(text)
+            except TelegramRejected as e:
+                console.print(f"[bold red]Telegram rejected alert: {e}[/bold red]")
+                return False
+            except Exception as e:
+                console.print(f"[bold red]Error sending Telegram alert: {e}[/bold red]")
+                ok, retry_after = False, None
+            if ok:
+                self.rate_limiter.on_success()
+                return True
+            if attempt < Config.NOTIFY_MAX_RETRIES:
+                self.retries += 1
+                if not retry_after:
+                    # On 429 the bucket already pauses for retry_after
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 60.0)
+        return False
+
+    async def _run(self):
+        while True:
+            if not self.pending:
+                self._ready.clear()
+                await self._ready.wait()
+            key, digest = next(iter(self.pending.items()))
+            # Give a burst from the same whale/market time to join the digest
+            wait = digest.first_at + Config.NOTIFY_COALESCE_WINDOW - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            if self.pending.get(key) is not digest:
+                continue  # dropped while we waited
+            del self.pending[key]
+
+            text = digest.text()
+            if await self._deliver(text):
+                self.sent += 1
+                console.print(f"[green]Telegram alert sent: {text[:50]}...[/green]")
+            else:
+                self.failed += 1
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    def stats(self):
+        return {
+            "queue_depth": len(self.pending),
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "sent": self.sent,
+            "retries": self.retries,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "rate_limiter": self.rate_limiter.stats(),
+        }
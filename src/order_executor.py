@@ -0,0 +1,72 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.config import Config, console
+
+
+class OrderTimeoutError(Exception):
+    """The call did not finish in time. For a POST the order state is unknown."""
+
+
+class OrderExecutor:
+    """
+    Runs the blocking py-clob-client calls (signing, order POST, balance lookups)
+    on a dedicated thread pool so the event loop keeps polling and dispatching
+    while orders are in flight. Every call gets a timeout; cancelling the
+    awaiting task abandons the result (the thread itself cannot be interrupted).
+    """
+
+    def __init__(self, workers: int = None):
+        self.pool = ThreadPoolExecutor(
+            max_workers=workers or Config.ORDER_WORKERS,
+            thread_name_prefix="clob-order",
+        )
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.total_time = 0.0
+
+    async def run(self, fn, *args, timeout: float = None, label: str = None, **kwargs):
+        """Awaits fn(*args, **kwargs) from the pool, raising OrderTimeoutError after `timeout`."""
+        loop = asyncio.get_running_loop()
+        timeout = timeout if timeout is not None else Config.ORDER_TIMEOUT
+        label = label or getattr(fn, "__name__", "call")
+
+        self.submitted += 1
+        self.in_flight += 1
+        started = time.monotonic()
+        future = loop.run_in_executor(self.pool, functools.partial(fn, *args, **kwargs))
+        try:
+            result = await asyncio.wait_for(future, timeout)
+            self.completed += 1
+            return result
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            console.print(f"[bold red]✘ {label} timed out after {timeout:.1f}s[/bold red]")
+            raise OrderTimeoutError(f"{label} timed out after {timeout:.1f}s")
+        except asyncio.CancelledError:
+            console.print(f"[yellow]⚠ {label} cancelled (a thread may still be finishing it)[/yellow]")
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.total_time += time.monotonic() - started
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        done = self.completed + self.failed + self.timeouts
+        return {
+            "in_flight": self.in_flight,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "avg_time": (self.total_time / done) if done else 0.0,
+        }
@@ -0,0 +1,313 @@
+import asyncio
+import json
+import math
+import time
+from bisect import bisect_left, insort
+from src.config import Config, console
+from src.http_client import HttpClient
+
+# How often idle books are looked for while the socket is up (seconds)
+ORDERBOOK_EVICT_INTERVAL = 30
+
+
+class OrderBook:
+    """
+    Local mirror of one token's CLOB book.
+
+    Levels live in a price -> size dict plus a sorted price list per side.
+    Size updates on an existing level are O(1) dict writes; adding or removing
+    a level finds its slot with a binary search (O(log n)) but the list
+    insert/delete itself is O(n). That trade-off is deliberate: a side has at
+    most ~1000 tick levels, so the shift is a short memmove, and a plain list
+    keeps best-price reads and walks simple and fast.
+    """
+
+    def __init__(self, token_id):
+        self.token_id = token_id
+        self.levels = {"BUY": {}, "SELL": {}}   # BUY = bids, SELL = asks
+        self.prices = {"BUY": [], "SELL": []}   # ascending
+        self.updated_at = 0.0
+        self.last_used = time.monotonic()
+        self.loaded = False
+
+    def load_snapshot(self, bids, asks):
+        for side, levels in (("BUY", bids), ("SELL", asks)):
+            book = {}
+            for level in levels or []:
+                size = float(level["size"])
+                if size > 0:
+                    book[float(level["price"])] = size
+            self.levels[side] = book
+            self.prices[side] = sorted(book)
+        self.loaded = True
+        self.updated_at = time.monotonic()
+
+    def set_level(self, side, price, size):
+        """Applies one delta: size 0 removes the level."""
+        book = self.levels[side]
+        prices = self.prices[side]
+        price = float(price)
+        size = float(size)
+        if size <= 0:
+            if book.pop(price, None) is not None:
+                i = bisect_left(prices, price)
+                if i < len(prices) and prices[i] == price:
+                    prices.pop(i)
+        else:
+            if price not in book:
+                insort(prices, price)  # O(log n) search, O(n) shift
+            book[price] = size
+        self.updated_at = time.monotonic()
+
+    def best_bid(self):
+        prices = self.prices["BUY"]
+        return prices[-1] if prices else None
+
+    def best_ask(self):
+        prices = self.prices["SELL"]
+        return prices[0] if prices else None
+
+    def _levels_for(self, side):
+        """Levels an order on `side` consumes, best first: a BUY lifts asks, a SELL hits bids."""
+        if side == "BUY":
+            book = self.levels["SELL"]
+            return ((p, book[p]) for p in self.prices["SELL"])
+        book = self.levels["BUY"]
+        return ((p, book[p]) for p in reversed(self.prices["BUY"]))
+
+    def walk(self, side, amount, limit_price=None):
+        """
+        Simulates a market order against the book.
+        BUY `amount` is USDC, SELL `amount` is shares (same units as MarketOrderArgs).
+        Stops at `limit_price` if given. Returns (vwap, filled_amount, shares, worst_price).
+        """
+        remaining = amount
+        usdc = shares = 0.0
+        worst = None
+        for price, size in self._levels_for(side):
+            if limit_price is not None and (price > limit_price if side == "BUY" else price < limit_price):
+                break
+            if side == "BUY":
+                take = min(remaining, price * size)
+                usdc += take
+                shares += take / price
+            else:
+                take = min(remaining, size)
+                shares += take
+                usdc += take * price
+            remaining -= take
+            worst = price
+            if remaining <= 1e-9:
+                break
+        vwap = usdc / shares if shares else None
+        filled = usdc if side == "BUY" else shares
+        return vwap, filled, shares, worst
+
+    def snapshot(self, depth=5):
+        bids = [(p, self.levels["BUY"][p]) for p in reversed(self.prices["BUY"][-depth:])]
+        asks = [(p, self.levels["SELL"][p]) for p in self.prices["SELL"][:depth]]
+        return {"bids": bids, "asks": asks, "age": time.monotonic() - self.updated_at}
+
+
+class OrderBookMirror:
+    """
+    Keeps OrderBooks for the tokens we trade, fed by the CLOB market websocket.
+
+    `track()` adds tokens (REST snapshot first, then websocket deltas); new
+    tokens are subscribed on the live socket, without reconnecting. Books not
+    used for ORDERBOOK_IDLE_TTL are dropped and unsubscribed. When the socket
+    drops it is reconnected with the current token list, and every reconnect
+    starts with fresh `book` snapshots.
+    """
+
+    def __init__(self, ws_url: str = None):
+        self.ws_url = ws_url or Config.POLYMARKET_CLOB_WS_URL
+        self.books = {}
+        self.connected = False
+        self._subscribed = set()  # asset ids subscribed on the live socket
+        self._changed = asyncio.Event()
+        self._task = None
+        self._pending = set()     # snapshot loads in flight
+        self._last_evict = time.monotonic()
+
+        self.messages = 0
+        self.deltas = 0
+        self.snapshots = 0
+        self.reconnects = 0
+        self.evicted = 0
+
+    def is_fresh(self, book):
+        # A live socket keeps quiet books current; otherwise trust only recent snapshots
+        return book.loaded and (self.connected or time.monotonic() - book.updated_at <= Config.ORDERBOOK_MAX_AGE)
+
+    def get(self, token_id):
+        """Fresh book for token_id, or None."""
+        book = self.books.get(token_id)
+        if book is None:
+            return None
+        book.last_used = time.monotonic()
+        return book if self.is_fresh(book) else None
+
+    def track(self, token_ids):
+        now = time.monotonic()
+        new = False
+        for token_id in token_ids:
+            if not token_id:
+                continue
+            book = self.books.get(token_id)
+            if book is not None:
+                book.last_used = now
+                continue
+            self.books[token_id] = OrderBook(token_id)
+            self._load_in_background(token_id)
+            new = True
+        if new:
+            self._changed.set()
+
+    def _load_in_background(self, token_id):
+        task = asyncio.create_task(self.load_snapshot(token_id))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    def evict_idle(self, now=None):
+        """Drops books nobody has looked at for ORDERBOOK_IDLE_TTL."""
+        now = time.monotonic() if now is None else now
+        self._last_evict = now
+        idle = [t for t, book in self.books.items() if now - book.last_used > Config.ORDERBOOK_IDLE_TTL]
+        for token_id in idle:
+            del self.books[token_id]
+        if idle:
+            self.evicted += len(idle)
+            self._changed.set()
+
+    async def _sync_subscriptions(self, ws):
+        """Subscribes/unsubscribes the difference between the books and the live socket."""
+        wanted = set(self.books)
+        added = wanted - self._subscribed
+        removed = self._subscribed - wanted
+        if added:
+            await ws.send(json.dumps({"assets_ids": list(added), "operation": "subscribe"}))
+        if removed:
+            await ws.send(json.dumps({"assets_ids": list(removed), "operation": "unsubscribe"}))
+        self._subscribed = wanted
+
+    async def load_snapshot(self, token_id):
+        url = f"{Config.POLYMARKET_CLOB_API_URL}/book"
+        try:
+            async with HttpClient.session(Config.POLYMARKET_CLOB_API_URL).get(url, params={"token_id": token_id}) as response:
+                if response.status != 200:
+                    return
+                data = await response.json()
+            book = self.books.get(token_id)
+            if book is not None and not book.loaded:
+                book.load_snapshot(data.get("bids"), data.get("asks"))
+                self.snapshots += 1
+        except Exception as e:
+            console.print(f"[dim]Order book snapshot failed for {str(token_id)[:10]}...: {e}[/dim]")
+
+    def apply_message(self, msg):
+        """Applies one decoded websocket message (dict or list of dicts)."""
+        if isinstance(msg, list):
+            for item in msg:
+                self.apply_message(item)
+            return
+        if not isinstance(msg, dict):
+            return
+        self.messages += 1
+        event = msg.get("event_type")
+
+        if event == "book":
+            book = self.books.get(msg.get("asset_id"))
+            if book is not None:
+                # Older payloads call the sides buys/sells
+                book.load_snapshot(msg.get("bids", msg.get("buys")), msg.get("asks", msg.get("sells")))
+                self.snapshots += 1
+
+        elif event == "price_change":
+            # Newer payloads: price_changes=[{asset_id, price, size, side}], older: asset_id + changes=[...]
+            changes = msg.get("price_changes")
+            if changes is None:
+                changes = [dict(c, asset_id=msg.get("asset_id")) for c in msg.get("changes", [])]
+            for change in changes:
+                book = self.books.get(change.get("asset_id"))
+                if book is None or not book.loaded:
+                    continue
+                book.set_level(change["side"].upper(), change["price"], change["size"])
+                self.deltas += 1
+
+    async def _run(self):
+        import websockets
+
+        delay = 1.0
+        while True:
+            if not self.books:
+                await self._changed.wait()
+            self._changed.clear()
+            try:
+                async with websockets.connect(self.ws_url, ping_interval=10) as ws:
+                    self._subscribed = set(self.books)
+                    await ws.send(json.dumps({"assets_ids": list(self._subscribed), "type": "market"}))
+                    self.connected = True
+                    delay = 1.0
+                    recv = None
+                    try:
+                        while True:
+                            if recv is None:
+                                recv = asyncio.create_task(ws.recv())
+                            changed = asyncio.create_task(self._changed.wait())
+                            done, _ = await asyncio.wait({recv, changed}, timeout=ORDERBOOK_EVICT_INTERVAL,
+                                                         return_when=asyncio.FIRST_COMPLETED)
+                            changed.cancel()
+                            if recv in done:
+                                raw, recv = recv.result(), None
+                                if raw != "PONG":
+                                    self.apply_message(json.loads(raw))
+                            if time.monotonic() - self._last_evict >= ORDERBOOK_EVICT_INTERVAL:
+                                self.evict_idle()
+                            if self._changed.is_set():
+                                self._changed.clear()
+                                await self._sync_subscriptions(ws)
+                    finally:
+                        if recv is not None:
+                            recv.cancel()
+                        self.connected = False
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.connected = False
+                self.reconnects += 1
+                console.print(f"[yellow]⚠ Order book websocket dropped ({e}). Reconnecting in {delay:.0f}s...[/yellow]")
+                for book in self.books.values():
+                    book.loaded = False
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+                # Cover the gap with REST snapshots until the socket's own arrive
+                for token_id in list(self.books):
+                    self._load_in_background(token_id)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    def stats(self):
+        return {
+            "books": len(self.books),
+            "fresh": sum(1 for b in self.books.values() if self.is_fresh(b)),
+            "messages": self.messages,
+            "deltas": self.deltas,
+            "snapshots": self.snapshots,
+            "reconnects": self.reconnects,
+            "evicted": self.evicted,
+        }
+
+
+def slippage_limit(best_price, side, tolerance, tick):
+    """Worst acceptable price `tolerance` away from the touch, snapped inside the tolerance to the tick grid."""
+    if side == "BUY":
+        limit = math.floor(best_price * (1 + tolerance) / tick + 1e-9) * tick
+        limit = max(limit, best_price)
+    else:
+        limit = math.ceil(best_price * (1 - tolerance) / tick - 1e-9) * tick
+        limit = min(limit, best_price)
+    return round(min(1 - tick, max(tick, limit)), 6)
@@ -0,0 +1,187 @@
+import asyncio
+import time
+from src.config import Config, console
+from src.database import Database
+
+# Below this many shares a position is treated as closed (dust)
+DUST_SHARES = 0.0001
+
+
+class Position:
+    __slots__ = ("token_id", "shares", "cost_usd", "condition_id", "outcome", "updated_at")
+
+    def __init__(self, token_id, shares=0.0, cost_usd=0.0, condition_id=None, outcome=None):
+        self.token_id = token_id
+        self.shares = shares
+        self.cost_usd = cost_usd
+        self.condition_id = condition_id
+        self.outcome = outcome
+        self.updated_at = time.time()
+
+    @property
+    def avg_price(self):
+        return self.cost_usd / self.shares if self.shares > DUST_SHARES else 0.0
+
+
+class PositionLedger:
+    """
+    Local token_id -> Position ledger for the bot's own holdings.
+
+    Updated from our own fills (so a SELL reads the share count in O(1) with no
+    network call), persisted to bot_trades so it survives restarts, and
+    reconciled against the Data API /positions in the background to correct
+    drift (fills we couldn't see, redemptions, manual trades).
+    """
+
+    def __init__(self, trader):
+        self.trader = trader
+        self.positions = {}
+        self.reconciled = False
+        self._reconcile_now = asyncio.Event()
+        self._task = None
+
+        self.fills = 0
+        self.reconciles = 0
+        self.last_drift = 0.0
+
+    def get(self, token_id):
+        return self.positions.get(token_id)
+
+    def shares(self, token_id):
+        position = self.positions.get(token_id)
+        return position.shares if position else 0.0
+
+    def condition_ids(self):
+        return {p.condition_id for p in self.positions.values() if p.condition_id}
+
+    async def apply_fill(self, token_id, side, shares, usdc, condition_id=None, outcome=None):
+        """Books one of our own fills and persists it to bot_trades."""
+        position = self.positions.get(token_id)
+        if position is None:
+            position = self.positions[token_id] = Position(token_id, condition_id=condition_id, outcome=outcome)
+        position.condition_id = position.condition_id or condition_id
+        position.outcome = position.outcome or outcome
+
+        realized_pnl = 0.0
+        if side == "BUY":
+            position.shares += shares
+            position.cost_usd += usdc
+        else:
+            sold = min(shares, position.shares)
+            cost_out = position.avg_price * sold
+            realized_pnl = usdc - cost_out
+            position.shares -= sold
+            position.cost_usd -= cost_out
+        position.updated_at = time.time()
+        self.fills += 1
+
+        closed = position.shares <= DUST_SHARES
+        if closed:
+            del self.positions[token_id]
+
+        price = usdc / shares if shares else 0.0
+        await Database.log_bot_trade(
+            token_id=token_id, condition_id=position.condition_id, outcome=position.outcome,
+            side=side, shares=shares, price=price, size_usd=usdc,
+            realized_pnl=realized_pnl, close_position=closed,
+        )
+
+    def request_reconcile(self):
+        """Ask the background task to reconcile as soon as possible (e.g. unknown fill size)."""
+        self._reconcile_now.set()
+
+    async def reconcile(self):
+        """
+        Replaces local share counts with the Data API's, persisting any drift.
+        Tokens we filled after the request started are left alone: the
+        snapshot may not include those fills yet.
+        """
+        started = time.time()
+        api_positions = await self.trader.get_bot_positions()
+        if api_positions is None:
+            return False
+
+        seen = set()
+        drift = 0.0
+        adjustments = []
+        for p in api_positions:
+            token_id = p.get('asset')
+            if not token_id:
+                continue
+            seen.add(token_id)
+            size = float(p.get('size', 0))
+            position = self.positions.get(token_id)
+            if position is not None and position.updated_at >= started:
+                continue
+            if position is None:
+                old_cost = 0.0
+                position = self.positions[token_id] = Position(
+                    token_id, cost_usd=size * float(p.get('avgPrice') or 0),
+                    condition_id=p.get('conditionId'), outcome=p.get('outcome'),
+                )
+            else:
+                old_cost = position.cost_usd
+            delta = size - position.shares
+            if abs(delta) > DUST_SHARES:
+                drift += abs(delta)
+                # Keep the cost basis in step with the corrected size: the API's average
+                # entry when it has one, else our own average price
+                api_avg = float(p.get('avgPrice') or 0)
+                if api_avg > 0:
+                    position.cost_usd = size * api_avg
+                elif position.shares > DUST_SHARES:
+                    position.cost_usd *= size / position.shares
+                position.shares = size
+                adjustments.append((token_id, position.condition_id or p.get('conditionId'), position.outcome or p.get('outcome'),
+                                    delta, position.cost_usd - old_cost))
+            position.condition_id = position.condition_id or p.get('conditionId')
+            position.outcome = position.outcome or p.get('outcome')
+
+        for token_id in [t for t, p in self.positions.items() if t not in seen and p.updated_at < started]:
+            position = self.positions.pop(token_id)
+            drift += position.shares
+            adjustments.append((token_id, position.condition_id, position.outcome, -position.shares, -position.cost_usd))
+
+        if adjustments:
+            await Database.log_position_adjustments(adjustments)
+            console.print(f"[dim]Ledger reconciled: {len(adjustments)} adjustments ({drift:.2f} shares drift)[/dim]")
+
+        self.reconciles += 1
+        self.last_drift = drift
+        self.reconciled = True
+        return True
+
+    async def load(self):
+        """Rebuilds open positions from bot_trades."""
+        for token_id, condition_id, outcome, shares, cost_usd in await Database.load_open_positions():
+            if shares and shares > DUST_SHARES:
+                self.positions[token_id] = Position(token_id, shares, cost_usd or 0.0, condition_id, outcome)
+        if self.positions:
+            console.print(f"[dim]Ledger: restored {len(self.positions)} open positions.[/dim]")
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._reconcile_now.wait(), timeout=Config.POSITION_RECONCILE_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._reconcile_now.clear()
+            try:
+                await self.reconcile()
+            except Exception as e:
+                console.print(f"[red]Ledger reconcile failed: {e}[/red]")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            # First reconcile right away
+            self._reconcile_now.set()
+        return self._task
+
+    def stats(self):
+        return {
+            "positions": len(self.positions),
+            "fills": self.fills,
+            "reconciles": self.reconciles,
+            "last_drift": self.last_drift,
+        }
@@ -0,0 +1,112 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Shared async token bucket that learns the upstream limit.
+
+    Starts at `rate` requests/second. A 429 halves the rate (never below
+    `min_rate`), remembers it as the learned ceiling and pauses every caller
+    for Retry-After. 429s arriving while that pause is still in effect (the
+    rest of a concurrent burst) count as the same event. Successful requests
+    creep the rate back up, additively, to just under the learned ceiling (or
+    `max_rate` if none was observed); after `probe_after` successes in a row
+    at the ceiling, the ceiling itself is raised by 10% so a transient limit
+    doesn't pin the rate for the rest of the process.
+    """
+
+    def __init__(self, rate: float, burst: float = None, min_rate: float = 0.5, max_rate: float = None, increase: float = 0.05,
+                 probe_after: int = 100):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate if max_rate is not None else rate * 4
+        self.increase = increase
+        self.learned_limit = None
+        self.probe_after = probe_after
+        self._streak = 0
+
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+        self.acquired = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """Waits for a token (and for any Retry-After pause) before a request."""
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    break
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+        self.acquired += 1
+        self.total_wait += time.monotonic() - started
+
+    def _ceiling(self):
+        if self.learned_limit is None:
+            return self.max_rate
+        return max(self.min_rate, min(self.max_rate, self.learned_limit * 0.9))
+
+    def on_success(self):
+        ceiling = self._ceiling()
+        if self.rate < ceiling:
+            self.rate = min(ceiling, self.rate + self.increase)
+            return
+        if self.learned_limit is None:
+            return
+        self._streak += 1
+        if self._streak >= self.probe_after:
+            # Sustained success at the ceiling: probe above it
+            self._streak = 0
+            self.learned_limit *= 1.1
+            if self.learned_limit * 0.9 >= self.max_rate:
+                self.learned_limit = None
+
+    def on_throttle(self, retry_after: float = None):
+        """Records a 429: back off multiplicatively and honour Retry-After."""
+        self.throttled += 1
+        self._streak = 0
+        now = time.monotonic()
+        pause = retry_after if retry_after and retry_after > 0 else None
+        if now < self.paused_until:
+            # Another response from the burst that caused the current pause
+            if pause:
+                self.paused_until = max(self.paused_until, now + pause)
+            return
+        self.learned_limit = self.rate
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0
+        # Without Retry-After, pause at least 1s so the in-flight burst lands inside it
+        self.paused_until = now + (pause or max(1.0, 1.0 / self.rate))
+
+    @staticmethod
+    def parse_retry_after(value):
+        """Retry-After in seconds (HTTP-date form is ignored)."""
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+    def stats(self):
+        return {
+            "rate": self.rate,
+            "learned_limit": self.learned_limit,
+            "acquired": self.acquired,
+            "throttled": self.throttled,
+            "avg_wait": (self.total_wait / self.acquired) if self.acquired else 0.0,
+        }
@@ -1,70 +1,92 @@
 import asyncio
-from web3 import Web3
+import time
+from eth_abi import decode
 from src.config import Config, console
+from src.database import Database
+from src.multicall import Multicall, encode_call
+from src.nonce_manager import TxPipeline
+from src.rpc import JsonRpc
 from src.trader import Trader
 
-# ABI for Gnosis Conditional Tokens Framework (CTF)
-CTF_ABI = [
-    {
-        "constant": True,
-        "inputs": [
-            {"name": "conditionId", "type": "bytes32"},
-            {"name": "index", "type": "uint256"}
-        ],
-        "name": "payoutNumerators",
-        "outputs": [{"name": "", "type": "uint256"}],
-        "payable": False,
-        "stateMutability": "view",
-        "type": "function"
-    },
-    {
-        "constant": False,
-        "inputs": [
-            {"name": "collateralToken", "type": "address"},
-            {"name": "parentCollectionId", "type": "bytes32"},
-            {"name": "conditionId", "type": "bytes32"},
-            {"name": "indexSets", "type": "uint256[]"}
-        ],
-        "name": "redeemPositions",
-        "outputs": [],
-        "payable": False,
-        "stateMutability": "nonpayable",
-        "type": "function"
-    }
-]
-
 USDC_ADDRESS = "0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174" # Polygon USDC (Bridged)
 
+# CTF views used for the batched resolution checks
+PAYOUT_DENOMINATOR = "payoutDenominator(bytes32)"
+OUTCOME_SLOT_COUNT = "getOutcomeSlotCount(bytes32)"
+PAYOUT_NUMERATORS = "payoutNumerators(bytes32,uint256)"
+REDEEM_POSITIONS = "redeemPositions(address,bytes32,bytes32,uint256[])"
+
+
+def _uint(ret):
+    return decode(["uint256"], ret)[0] if ret else 0
+
+
 class Redeemer:
+    """
+    Redeems winnings of resolved markets on a timer.
+
+    Resolution state is memoized in memory and in markets.is_resolved /
+    markets.redeemed_at, so a condition that is resolved and redeemed is never
+    queried again. Each sweep only checks conditions whose positions changed
+    since the previous sweep (the Data API flags positions `redeemable` once
+    their market resolves), plus a full re-check every REDEEM_FULL_CHECK_INTERVAL.
+
+    With a ResolutionWatcher attached (`event_driven`), resolutions arrive as
+    ConditionResolution events instead, and sweeps only check conditions they
+    have never seen (which may have resolved before the watcher's scan window).
+    """
+
     def __init__(self, trader: Trader):
         self.trader = trader
-        self.w3 = None
-        
+        self.rpc = None
+        self.multicall = None
+        self.pipeline = None
+
         if Config.POLYGON_RPC_URL:
-            try:
-                self.w3 = Web3(Web3.HTTPProvider(Config.POLYGON_RPC_URL))
-                if self.w3.is_connected():
-                    console.print("[green]✔ Connected to Polygon RPC for redemption.[/green]")
-                else:
-                    console.print("[red]✘ Failed to connect to Polygon RPC.[/red]")
-            except Exception as e:
-                console.print(f"[red]Error initializing Web3: {e}[/red]")
+            self.rpc = JsonRpc()
+            self.multicall = Multicall(self.rpc)
+            if Config.PRIVATE_KEY:
+                try:
+                    self.pipeline = TxPipeline(self.rpc, Config.PRIVATE_KEY)
+                except Exception as e:
+                    console.print(f"[red]Error loading redemption key: {e}[/red]")
         else:
             console.print("[yellow]⚠ POLYGON_RPC_URL not set. Redemption disabled.[/yellow]")
 
-    
+        self.resolved = {}      # condition_id -> payouts (None when restored from the DB)
+        self.redeemed = set()
+        self._snapshots = {}    # condition_id -> positions signature at the last sweep
+        self._last_full_check = 0.0
+        self._sweep_now = asyncio.Event()
+        self._task = None
+        self.event_driven = False
+
+        self.sweeps = 0
+        self.checked = 0
+        self.redemptions = 0
+
+    async def load(self):
+        """Restores resolved / redeemed markets from the DB."""
+        for condition_id, redeemed_at in (await Database.load_resolution_state()).items():
+            self.resolved.setdefault(condition_id, None)
+            if redeemed_at:
+                self.redeemed.add(condition_id)
+
+    @staticmethod
+    def _signature(pos_list):
+        return tuple(sorted((p.get('asset'), round(float(p.get('size', 0)), 6), bool(p.get('redeemable'))) for p in pos_list))
+
     async def check_and_redeem(self):
         """
-        Checks all held positions. If a market is resolved, redeems the winnings.
+        One redemption sweep over held positions: checks the conditions that
+        need it and redeems the resolved ones.
         """
-        if not self.w3:
-            console.print("[yellow]Redemption skipped: No Web3[/yellow]")
+        if not self.rpc:
+            console.print("[yellow]Redemption skipped: No RPC[/yellow]")
             return
 
-        # Fetch positions (synchronous in trader, wrap in future/executor if needed, but requests is ok for now if fast)
-        # Actually Trader.get_bot_positions should be async ideally but it is sync requests.
-        # Let's wrap it in thread if blocking, but for startup it's fine.
-        positions = self.trader.get_bot_positions()
+        # Fetch positions (async, over the shared data-api session)
+        positions = await self.trader.get_bot_positions(verbose=True)
         
         if not positions:
             console.print("[dim]No positions to check for redemption.[/dim]")
@@ -73,113 +95,234 @@ class Redeemer:
         # Group by Condition ID to avoid duplicate checks
         conditions_map = {}
         for p in positions:
-            cid = p.get('conditionId')
+            cid = (p.get('conditionId') or '').lower()
             if cid:
                 if cid not in conditions_map:
                     conditions_map[cid] = []
                 conditions_map[cid].append(p)
 
-        console.print(f"[cyan]Checking {len(conditions_map)} unique markets for resolution...[/cyan]")
-        
-        ctf = self.w3.eth.contract(address=Config.POLYMARKET_CTF_CONTRACT, abi=CTF_ABI)
-        
-        for condition_id, pos_list in conditions_map.items():
+        self.sweeps += 1
+        full_check = time.monotonic() - self._last_full_check >= Config.REDEEM_FULL_CHECK_INTERVAL
+        if full_check:
+            self._last_full_check = time.monotonic()
+
+        to_check = []
+        to_redeem = []
+        snapshots = {}
+        for cid, pos_list in conditions_map.items():
+            signature = self._signature(pos_list)
+            snapshots[cid] = signature
+            if cid in self.redeemed:
+                continue
+            if cid in self.resolved:
+                # Known resolved, not redeemed yet: no need to ask the chain again
+                to_redeem.append(cid)
+            elif self.event_driven:
+                if cid not in self._snapshots:
+                    to_check.append(cid)
+            elif full_check or self._snapshots.get(cid) != signature:
+                to_check.append(cid)
+        self._snapshots = snapshots
+
+        if to_check:
+            console.print(f"[cyan]Checking {len(to_check)}/{len(conditions_map)} markets for resolution...[/cyan]")
+            try:
+                resolutions = await self.check_resolutions(to_check)
+            except Exception as e:
+                console.print(f"[red]Error checking resolutions: {e}[/red]")
+                resolutions = {}
+                # Retry these on the next sweep
+                for cid in to_check:
+                    self._snapshots.pop(cid, None)
+            self.checked += len(resolutions)
+
+            for condition_id, payouts in resolutions.items():
+                if payouts is None:
+                    continue
+                console.print(f"[green]✔ Market Resolved! Condition: {condition_id[:10]}... Payouts: {payouts}[/green]")
+                self.resolved[condition_id] = payouts
+                await Database.mark_resolved(condition_id, payouts=payouts)
+                if Database.scorer is not None:
+                    Database.scorer.on_resolution(condition_id, payouts)
+                to_redeem.append(condition_id)
+
+        if not to_redeem:
+            return
+
+        results = await self.redeem_many({cid: conditions_map[cid] for cid in to_redeem})
+        for condition_id, ok in results.items():
+            if ok:
+                self.redeemed.add(condition_id)
+                self.redemptions += 1
+                await Database.mark_resolved(condition_id, redeemed=True)
+
+        # Redeemed USDC is available for new copy trades: refresh balance and ledger
+        self.trader.balance.request_resync()
+        self.trader.positions.request_reconcile()
+
+    def held_conditions(self):
+        """Condition IDs (lower-case) we hold and haven't redeemed: ledger plus the last sweep."""
+        held = {cid.lower() for cid in self.trader.positions.condition_ids()}
+        held.update(self._snapshots)
+        return held - self.redeemed
+
+    async def on_resolution(self, condition_id, payouts):
+        """Called by the ResolutionWatcher for a held market: record it and sweep now."""
+        if condition_id in self.redeemed:
+            return
+        self.resolved[condition_id] = payouts
+        await Database.mark_resolved(condition_id, payouts=payouts)
+        self.request_sweep()
+
+    def request_sweep(self):
+        """Ask the scheduler to run a sweep as soon as possible."""
+        self._sweep_now.set()
+
+    async def _run(self):
+        await self.load()
+        while True:
+            self._sweep_now.clear()
             try:
-                # Check if resolved (payoutNumerators > 0 for any index)
-                # Binary market usually has 2 slots. Check index 0.
-                is_resolved = False
-                payouts = []
-                
-                # We check index 0 and 1 (assuming binary for now, likely safe for Polymarket)
-                p0 = ctf.functions.payoutNumerators(condition_id, 0).call()
-                p1 = ctf.functions.payoutNumerators(condition_id, 1).call()
-                
-                if p0 > 0 or p1 > 0:
-                    is_resolved = True
-                    payouts = [p0, p1]
-                    console.print(f"[green]✔ Market Resolved! Condition: {condition_id[:10]}... Payouts: {payouts}[/green]")
-                
-                if is_resolved:
-                    # Proceed to redeem
-                    await self.redeem_positions(ctf, condition_id, pos_list)
-                else:
-                    # console.print(f"[dim]Market not resolved: {condition_id[:10]}...[/dim]")
-                    pass
-                    
+                await self.check_and_redeem()
             except Exception as e:
-                console.print(f"[red]Error checking condition {condition_id}: {e}[/red]")
+                console.print(f"[red]Redemption sweep failed: {e}[/red]")
+            try:
+                await asyncio.wait_for(self._sweep_now.wait(), timeout=Config.REDEEM_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
 
-    async def redeem_positions(self, ctf, condition_id, pos_list):
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    def stats(self):
+        return {
+            "sweeps": self.sweeps,
+            "checked": self.checked,
+            "resolved": len(self.resolved),
+            "redeemed": len(self.redeemed),
+            "redemptions": self.redemptions,
+            "multicall": self.multicall.stats() if self.multicall else {},
+            "transactions": self.pipeline.stats() if self.pipeline else {},
+        }
+
+    async def check_resolutions(self, condition_ids):
         """
-        Executes the redeemPositions transaction on CTF.
+        Resolution state for many conditions in a few Multicall3 round-trips.
+        Returns {condition_id: [payout numerators] or None if unresolved}.
+
+        Pass 1 reads payoutDenominator (non-zero once reported) and the outcome
+        slot count for every condition; pass 2 reads payoutNumerators for each
+        slot of the resolved ones only.
         """
-        if not Config.MY_WALLET_ADDRESS or not Config.PRIVATE_KEY:
-            console.print("[red]Cannot redeem: Missing wallet/key.[/red]")
-            return
+        ctf = Config.POLYMARKET_CTF_CONTRACT
+        keys = [bytes.fromhex(cid[2:] if cid.startswith("0x") else cid) for cid in condition_ids]
 
-        wallet_address = Config.MY_WALLET_ADDRESS # Assuming EOA directly for signing
-        # If using Proxy/Magic, we need executeCall on Gnosis Safe/Proxy?
-        # Assuming simple EOA for now as per trader config directly using key.
-        
-        # Determine unique index sets to redeem
+        calls = []
+        for key in keys:
+            calls.append((ctf, encode_call(PAYOUT_DENOMINATOR, ["bytes32"], [key])))
+            calls.append((ctf, encode_call(OUTCOME_SLOT_COUNT, ["bytes32"], [key])))
+        results = await self.multicall.aggregate(calls)
+
+        resolutions = {cid: None for cid in condition_ids}
+        resolved = []
+        for i, (cid, key) in enumerate(zip(condition_ids, keys)):
+            denominator = _uint(results[2 * i])
+            slots = _uint(results[2 * i + 1])
+            if denominator > 0 and slots > 0:
+                resolved.append((cid, key, slots))
+
+        calls = [
+            (ctf, encode_call(PAYOUT_NUMERATORS, ["bytes32", "uint256"], [key, index]))
+            for _, key, slots in resolved for index in range(slots)
+        ]
+        results = iter(await self.multicall.aggregate(calls))
+        for cid, _, slots in resolved:
+            resolutions[cid] = [_uint(next(results)) for _ in range(slots)]
+        return resolutions
+
+    @staticmethod
+    def _index_sets(pos_list):
+        """Index sets (1 << outcomeIndex) of the outcomes we hold."""
         index_sets = []
         for p in pos_list:
             outcome_idx_str = p.get('outcomeIndex')
             if outcome_idx_str is not None:
-                idx_val = int(outcome_idx_str)
-                # Index Set is a bitmask: 1 << index
-                idx_set = 1 << idx_val
+                idx_set = 1 << int(outcome_idx_str)
                 if idx_set not in index_sets:
                     index_sets.append(idx_set)
-        
+        return index_sets
+
+    async def send_redemption(self, condition_id, pos_list, gas_price):
+        """
+        Estimates and broadcasts redeemPositions for one condition without
+        waiting for it to be mined. Returns a PendingTx, True if there is
+        nothing to redeem, or None on failure.
+        """
+        index_sets = self._index_sets(pos_list)
         if not index_sets:
-            return
+            return True
 
         console.print(f"[bold yellow]🔄 Redeeming for condition {condition_id[:10]}... (IndexSets: {index_sets})[/bold yellow]")
-        
         try:
-            parent_collection_id = b'\x00' * 32
-            
-            # Web3.py sometimes needs bytes/hex formatting carefully
-            # condition_id is likely hex string "0x..." 
-            
-            # Build TX
-            tx_func = ctf.functions.redeemPositions(
-                USDC_ADDRESS,
-                parent_collection_id,
-                condition_id,
-                index_sets
+            key = bytes.fromhex(condition_id[2:] if condition_id.startswith("0x") else condition_id)
+            data = "0x" + encode_call(REDEEM_POSITIONS, ["address", "bytes32", "bytes32", "uint256[]"],
+                                      [USDC_ADDRESS, b'\x00' * 32, key, index_sets]).hex()
+            estimated_gas = int(await self.rpc.call("eth_estimateGas", [{
+                "from": self.pipeline.address, "to": Config.POLYMARKET_CTF_CONTRACT, "data": data,
+            }]), 16)
+            pending = await self.pipeline.send(
+                Config.POLYMARKET_CTF_CONTRACT, data,
+                gas=int(estimated_gas * 1.2), # Buffer
+                gas_price=gas_price, label=condition_id[:10],
             )
-            
-            estimated_gas = tx_func.estimate_gas({'from': wallet_address})
-            
-            tx = tx_func.build_transaction({
-                'from': wallet_address,
-                'nonce': self.w3.eth.get_transaction_count(wallet_address),
-                'gas': int(estimated_gas * 1.2), # Buffer
-                'gasPrice': self.w3.eth.gas_price,
-                'chainId': 137
-            })
-            
-            signed_tx = self.w3.eth.account.sign_transaction(tx, private_key=Config.PRIVATE_KEY)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-            
-            console.print(f"[green]✔ Redemption TX sent: {self.w3.to_hex(tx_hash)}[/green]")
-            
-            # Simple wait (blocking async loop? Use executor if heavy wait)
-            # Actually wait_for_transaction_receipt is blocking. 
-            # We should probably return and let user check explorer, or await in thread.
-            # But for simplicity, we await here.
-            # Convert to awaitable if using async web3, but we are using sync web3 here.
-            # To avoid blocking loop:
-            
-            loop = asyncio.get_running_loop()
-            receipt = await loop.run_in_executor(None, self.w3.eth.wait_for_transaction_receipt, tx_hash)
-            
-            if receipt.status == 1:
-                console.print(f"[bold green]✔ Redemption Confirmed for {condition_id[:10]}![/bold green]")
-            else:
-                 console.print(f"[bold red]✘ Redemption Failed for {condition_id[:10]}[/bold red]")
-
+            console.print(f"[green]✔ Redemption TX sent: {pending.hashes[0]} (nonce {pending.tx['nonce']})[/green]")
+            return pending
         except Exception as e:
             console.print(f"[red]Redemption Error: {e}[/red]")
+            return None
+
+    async def redeem_many(self, conditions):
+        """
+        Redeems {condition_id: positions} in one pipeline: all transactions are
+        sent back-to-back with locally allocated nonces, then their receipts are
+        awaited concurrently. Returns {condition_id: confirmed}.
+        """
+        if not self.pipeline:
+            console.print("[red]Cannot redeem: Missing wallet/key.[/red]")
+            return {cid: False for cid in conditions}
+
+        gas_price = int(await self.rpc.call("eth_gasPrice"), 16)
+        # Sequential sends keep nonces gap-free if one is rejected; each is a single RPC call
+        sent = {}
+        for condition_id, pos_list in conditions.items():
+            sent[condition_id] = await self.send_redemption(condition_id, pos_list, gas_price)
+
+        async def confirm(condition_id, pending):
+            if pending is None or pending is True:
+                return pending is True
+            try:
+                receipt = await self.pipeline.wait(pending)
+            except Exception as e:
+                # Leave it unconfirmed for the next sweep without losing the other results
+                console.print(f"[red]Error waiting for redemption of {condition_id[:10]}: {e}[/red]")
+                return False
+            if receipt is None:
+                console.print(f"[bold red]✘ Redemption not mined in time for {condition_id[:10]}[/bold red]")
+                return False
+            if int(receipt.get("status", "0x0"), 16) == 1:
+                console.print(f"[bold green]✔ Redemption Confirmed for {condition_id[:10]}![/bold green]")
+                return True
+            console.print(f"[bold red]✘ Redemption Failed for {condition_id[:10]}[/bold red]")
+            return False
+
+        results = await asyncio.gather(*(confirm(cid, pending) for cid, pending in sent.items()))
+        return dict(zip(sent, results))
+
+    async def redeem_positions(self, condition_id, pos_list):
+        """
+        Executes the redeemPositions transaction on CTF.
+        Returns True once the redemption is confirmed (or there is nothing to redeem).
+        """
+        return (await self.redeem_many({condition_id: pos_list}))[condition_id]
@@ -0,0 +1,136 @@
+import asyncio
+import json
+from eth_abi import decode
+from eth_utils import keccak
+from src.config import Config, console
+from src.database import Database
+from src.rpc import JsonRpc
+
+# CTF: ConditionResolution(bytes32 indexed conditionId, address indexed oracle, bytes32 indexed questionId,
+#                          uint256 outcomeSlotCount, uint256[] payoutNumerators)
+CONDITION_RESOLUTION_TOPIC = "0x" + keccak(
+    text="ConditionResolution(bytes32,address,bytes32,uint256,uint256[])"
+).hex()
+
+CHECKPOINT_NAME = "condition_resolution"
+
+
+def decode_condition_resolution(log):
+    """Returns (condition_id, payout numerators) for a raw ConditionResolution log."""
+    condition_id = log["topics"][1].lower()
+    _, payouts = decode(["uint256", "uint256[]"], bytes.fromhex(log["data"][2:]))
+    return condition_id, list(payouts)
+
+
+class ResolutionWatcher:
+    """
+    Triggers redemption as soon as a market we hold resolves.
+
+    Scans (or subscribes to) the CTF contract's ConditionResolution logs and
+    matches each one against the condition IDs we hold, so the cost is per
+    resolution event rather than per position. Markets where tracked whales
+    hold open positions are passed to the wallet scorer as well. The last scanned block is
+    checkpointed in chain_checkpoints, so a restart resumes where it stopped.
+    """
+
+    def __init__(self, redeemer, rpc: JsonRpc = None):
+        self.redeemer = redeemer
+        self.rpc = rpc or redeemer.rpc or JsonRpc()
+        self.ctf = Config.POLYMARKET_CTF_CONTRACT
+        self.last_block = None
+
+        self.logs_scanned = 0
+        self.matched = 0
+
+    async def replay_logs(self, logs):
+        held = self.redeemer.held_conditions()
+        scorer = Database.scorer
+        matched = 0
+        for log in logs:
+            self.logs_scanned += 1
+            if log.get("removed") or len(log.get("topics", [])) < 2:
+                continue
+            # Cheap set lookups on the indexed topic before decoding anything
+            topic = log["topics"][1].lower()
+            ours = topic in held
+            if not ours and (scorer is None or topic not in scorer.open_conditions()):
+                continue
+            condition_id, payouts = decode_condition_resolution(log)
+            if scorer is not None:
+                scorer.on_resolution(condition_id, payouts)
+            if not ours:
+                await Database.mark_resolved(condition_id, payouts=payouts)
+                continue
+            console.print(f"[green]✔ Market Resolved (event)! Condition: {condition_id[:10]}... Payouts: {payouts}[/green]")
+            await self.redeemer.on_resolution(condition_id, payouts)
+            matched += 1
+        self.matched += matched
+        return matched
+
+    async def backfill(self, to_block=None):
+        """Scans [last_block + 1, to_block] in chunks, checkpointing after each one."""
+        head = to_block if to_block is not None else await self.rpc.block_number()
+        if self.last_block is None:
+            self.last_block = head - Config.CHAIN_START_LOOKBACK
+        if head <= self.last_block:
+            return
+
+        async for end, logs in self.rpc.get_logs_chunked(self.ctf, [CONDITION_RESOLUTION_TOPIC], self.last_block + 1, head):
+            await self.replay_logs(logs)
+            self.last_block = end
+            await Database.save_checkpoint(CHECKPOINT_NAME, end)
+
+    async def _poll_loop(self):
+        while True:
+            try:
+                await self.backfill()
+            except Exception as e:
+                console.print(f"[red]Error scanning resolution logs: {e}[/red]")
+            await asyncio.sleep(Config.RESOLUTION_POLL_INTERVAL)
+
+    async def _subscribe_loop(self):
+        import websockets
+
+        delay = 1.0
+        while True:
+            try:
+                async with websockets.connect(Config.POLYGON_WS_URL) as ws:
+                    await ws.send(json.dumps({
+                        "jsonrpc": "2.0", "id": 1, "method": "eth_subscribe",
+                        "params": ["logs", {"address": self.ctf, "topics": [CONDITION_RESOLUTION_TOPIC]}]
+                    }))
+                    await ws.recv()  # subscription id
+                    # Subscribed first, then backfill the gap (a repeated resolution is a no-op)
+                    await self.backfill()
+                    delay = 1.0
+
+                    async for raw in ws:
+                        log = (json.loads(raw).get("params") or {}).get("result")
+                        if not log:
+                            continue
+                        await self.replay_logs([log])
+                        block = int(log["blockNumber"], 16)
+                        if block - 1 > self.last_block:
+                            self.last_block = block - 1
+                            await Database.save_checkpoint(CHECKPOINT_NAME, self.last_block)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                console.print(f"[yellow]⚠ Resolution websocket dropped ({e}). Reconnecting in {delay:.0f}s...[/yellow]")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+    async def run(self):
+        self.last_block = await Database.get_checkpoint(CHECKPOINT_NAME)
+        if self.last_block is not None:
+            console.print(f"[dim]Resolution watcher resuming from block {self.last_block}[/dim]")
+        if Config.POLYGON_WS_URL:
+            await self._subscribe_loop()
+        else:
+            await self._poll_loop()
+
+    def start(self):
+        return asyncio.create_task(self.run())
+
+    def stats(self):
+        return {"last_block": self.last_block, "logs_scanned": self.logs_scanned, "matched": self.matched}
@@ -0,0 +1,85 @@
+import itertools
+from collections import OrderedDict
+from src.config import Config
+from src.http_client import HttpClient
+
+
+class RpcError(Exception):
+    pass
+
+
+class JsonRpc:
+    """
+    Minimal async Ethereum JSON-RPC client on top of the pooled HttpClient.
+    Works against any node (Polygon RPC, a local anvil/hardhat node...).
+    """
+
+    def __init__(self, url: str = None):
+        self.url = url or Config.POLYGON_RPC_URL
+        self._ids = itertools.count(1)
+        self._block_ts = OrderedDict()  # block number -> timestamp (small LRU)
+        self.calls = 0
+
+    async def call(self, method, params=None):
+        payload = {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params or []}
+        self.calls += 1
+        async with HttpClient.session(self.url).post(self.url, json=payload) as response:
+            data = await response.json(content_type=None)
+        if data.get("error"):
+            raise RpcError(f"{method}: {data['error']}")
+        return data.get("result")
+
+    async def batch(self, requests):
+        """
+        Sends [(method, params), ...] as one JSON-RPC batch.
+        Returns results in request order; raises on the first error.
+        """
+        if not requests:
+            return []
+        payload = [
+            {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+            for i, (method, params) in enumerate(requests)
+        ]
+        self.calls += 1
+        async with HttpClient.session(self.url).post(self.url, json=payload) as response:
+            data = await response.json(content_type=None)
+        by_id = {item.get("id"): item for item in data}
+        results = []
+        for i, (method, _) in enumerate(requests):
+            item = by_id.get(i, {})
+            if item.get("error"):
+                raise RpcError(f"{method}: {item['error']}")
+            results.append(item.get("result"))
+        return results
+
+    async def block_number(self):
+        return int(await self.call("eth_blockNumber"), 16)
+
+    async def get_logs(self, address, topics, from_block, to_block):
+        return await self.call("eth_getLogs", [{
+            "address": address,
+            "topics": topics,
+            "fromBlock": hex(from_block),
+            "toBlock": hex(to_block),
+        }])
+
+    async def get_logs_chunked(self, address, topics, from_block, to_block, chunk: int = None):
+        """eth_getLogs over [from_block, to_block] split into node-friendly ranges."""
+        chunk = chunk or Config.CHAIN_LOG_CHUNK
+        start = from_block
+        while start <= to_block:
+            end = min(to_block, start + chunk - 1)
+            yield end, await self.get_logs(address, topics, start, end)
+            start = end + 1
+
+    async def block_timestamps(self, block_numbers):
+        """Timestamps for a set of blocks, batched, with a small cache."""
+        missing = [b for b in set(block_numbers) if b not in self._block_ts]
+        if missing:
+            blocks = await self.batch([("eth_getBlockByNumber", [hex(b), False]) for b in missing])
+            for number, block in zip(missing, blocks):
+                if block:
+                    self._block_ts[number] = int(block["timestamp"], 16)
+            while len(self._block_ts) > 1024:
+                self._block_ts.popitem(last=False)
+        return {b: self._block_ts.get(b) for b in block_numbers}
@@ -0,0 +1,84 @@
+import asyncio
+import heapq
+import random
+import time
+from src.config import Config, console
+
+
+class PollScheduler:
+    """
+    Per-wallet adaptive polling.
+
+    Each wallet has its own interval: a poll that finds new activity drops it
+    to POLL_MIN_INTERVAL (hot wallet), every quiet poll multiplies it by
+    POLL_BACKOFF up to POLL_MAX_INTERVAL (dormant wallet). Due times are
+    jittered so polls spread out instead of firing together, and at most
+    POLL_CONCURRENCY polls run at once. Request pacing itself is left to the
+    shared TokenBucket used by `poll_fn`.
+    """
+
+    def __init__(self, wallets, poll_fn, initial_interval: float = None):
+        self.poll_fn = poll_fn
+        self.min_interval = Config.POLL_MIN_INTERVAL
+        self.max_interval = Config.POLL_MAX_INTERVAL
+        self.backoff = Config.POLL_BACKOFF
+        self.jitter = Config.POLL_JITTER
+        initial = initial_interval if initial_interval is not None else Config.POLL_INTERVAL
+
+        self.intervals = {w: initial for w in wallets}
+        self.last_activity = {}
+        now = time.monotonic()
+        # Spread the first round over one interval to avoid a thundering herd
+        self._heap = [(now + random.uniform(0, initial), w) for w in wallets]
+        heapq.heapify(self._heap)
+        self._semaphore = asyncio.Semaphore(Config.POLL_CONCURRENCY)
+        self._inflight = set()
+
+        self.polls = 0
+        self.late_total = 0.0
+
+    def _next_interval(self, wallet, found):
+        if found:
+            interval = self.min_interval
+            self.last_activity[wallet] = time.time()
+        else:
+            interval = min(self.max_interval, self.intervals[wallet] * self.backoff)
+        self.intervals[wallet] = interval
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def _poll(self, wallet, due):
+        async with self._semaphore:
+            self.late_total += max(0.0, time.monotonic() - due)
+            found = 0
+            try:
+                found = await self.poll_fn(wallet)
+            except Exception as e:
+                console.print(f"[red]Poll error for {wallet[:6]}: {e}[/red]")
+            self.polls += 1
+            heapq.heappush(self._heap, (time.monotonic() + self._next_interval(wallet, found), wallet))
+
+    async def run(self):
+        while True:
+            if not self._heap:
+                await asyncio.sleep(self.min_interval)
+                continue
+            due, wallet = self._heap[0]
+            delay = due - time.monotonic()
+            if delay > 0:
+                # Re-check after a short sleep: a finishing poll may push an earlier due time
+                await asyncio.sleep(min(delay, self.min_interval))
+                continue
+            heapq.heappop(self._heap)
+            task = asyncio.create_task(self._poll(wallet, due))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    def stats(self):
+        intervals = sorted(self.intervals.values())
+        return {
+            "wallets": len(intervals),
+            "polls": self.polls,
+            "hot_wallets": sum(1 for i in intervals if i <= self.min_interval),
+            "median_interval": intervals[len(intervals) // 2] if intervals else 0.0,
+            "avg_lateness": (self.late_total / self.polls) if self.polls else 0.0,
+        }
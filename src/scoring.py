@@ -0,0 +1,253 @@
+import asyncio
+import math
+import time
+from src.config import Config, console
+from src.database import Database
+
+# Below this many shares a whale position is treated as closed (dust)
+DUST_SHARES = 0.0001
+# Trade-size histogram: upper bounds of each bucket in USD notional (last bucket = above)
+SIZE_BUCKETS = (10, 100, 1_000, 10_000, 100_000)
+# Outcome slot when a fill doesn't carry outcomeIndex (binary markets)
+DEFAULT_OUTCOME_INDEX = {"yes": 0, "no": 1}
+
+
+class Lot:
+    __slots__ = ("shares", "cost", "share_seconds", "outcome_index")
+
+    def __init__(self, outcome_index=None):
+        self.shares = 0.0
+        self.cost = 0.0
+        self.share_seconds = 0.0  # sum(shares * entry timestamp): share-weighted entry time
+        self.outcome_index = outcome_index
+
+
+class WalletStats:
+    __slots__ = ("fills", "volume", "size_mean", "size_m2", "size_hist", "closed", "wins",
+                 "realized_pnl", "closed_cost", "hold_seconds", "lots", "score")
+
+    def __init__(self):
+        self.fills = 0
+        self.volume = 0.0
+        self.size_mean = 0.0
+        self.size_m2 = 0.0  # Welford running sum of squared deviations
+        self.size_hist = [0] * (len(SIZE_BUCKETS) + 1)
+        self.closed = 0
+        self.wins = 0
+        self.realized_pnl = 0.0
+        self.closed_cost = 0.0
+        self.hold_seconds = 0.0
+        self.lots = {}  # (condition_id, outcome) -> Lot
+        self.score = 0.5
+
+    def observe_size(self, notional):
+        self.fills += 1
+        self.volume += notional
+        delta = notional - self.size_mean
+        self.size_mean += delta / self.fills
+        self.size_m2 += delta * (notional - self.size_mean)
+        for i, bound in enumerate(SIZE_BUCKETS):
+            if notional < bound:
+                self.size_hist[i] += 1
+                break
+        else:
+            self.size_hist[-1] += 1
+
+    def close(self, lot, shares, proceeds, timestamp):
+        """Realizes `shares` of a lot at `proceeds` USD (whale SELL or resolution payout)."""
+        fraction = shares / lot.shares
+        cost = lot.cost * fraction
+        entry_seconds = lot.share_seconds * fraction
+        pnl = proceeds - cost
+
+        self.closed += 1
+        self.wins += pnl > 0
+        self.realized_pnl += pnl
+        self.closed_cost += cost
+        self.hold_seconds += max(0.0, timestamp - entry_seconds / shares)
+
+        lot.shares -= shares
+        lot.cost -= cost
+        lot.share_seconds -= entry_seconds
+
+    def rescore(self):
+        """
+        Quality in [0, 1]: Laplace-smoothed win rate blended with realized ROI,
+        shrunk towards 0.5 until the wallet has ~SCORE_PRIOR_TRADES closed trades.
+        """
+        win_rate = (self.wins + 1) / (self.closed + 2)
+        roi = self.realized_pnl / self.closed_cost if self.closed_cost > 0 else 0.0
+        raw = (win_rate + 0.5 + 0.5 * math.tanh(2 * roi)) / 2
+        confidence = self.closed / (self.closed + Config.SCORE_PRIOR_TRADES)
+        self.score = 0.5 + (raw - 0.5) * confidence
+
+
+class WalletScorer:
+    """
+    Rolling per-wallet quality from the whale fills we log.
+
+    Every fill updates its wallet in O(1): trade-size distribution (Welford
+    mean/variance plus a log-scale histogram) and average-cost lots per
+    (market, outcome). A whale SELL or the market's resolution realizes PnL,
+    which feeds the win rate, average holding time and the cached score the
+    copy-trade path reads without touching the DB. Changed wallets are written
+    to wallets.risk_score (1 - score) and wallets.total_profit every
+    SCORE_FLUSH_INTERVAL.
+    """
+
+    def __init__(self):
+        self.wallets = {}   # address -> WalletStats
+        self.holders = {}   # condition_id -> {(address, outcome)} with an open lot
+        self.resolved = {}  # condition_id -> payouts
+        self.dirty = set()
+        self._task = None
+
+        self.resolutions = 0
+        self.flushes = 0
+
+    def score(self, wallet):
+        stats = self.wallets.get(wallet)
+        return stats.score if stats else 0.5
+
+    def bet_multiplier(self, wallet):
+        """Scales a copy around 1.0: a 0.5 (unknown) wallet keeps the configured size, 1.0 doubles it."""
+        return 2 * self.score(wallet)
+
+    def allows(self, wallet):
+        return self.score(wallet) >= Config.MIN_WALLET_SCORE
+
+    def on_trade(self, wallet, condition_id, outcome, side, shares, price, timestamp, outcome_index=None):
+        if shares <= 0 or price <= 0:
+            return
+        condition_id = (condition_id or "").lower()
+        stats = self.wallets.get(wallet)
+        if stats is None:
+            stats = self.wallets[wallet] = WalletStats()
+        stats.observe_size(shares * price)
+
+        key = (condition_id, outcome)
+        lot = stats.lots.get(key)
+        if side == "BUY":
+            if lot is None:
+                if outcome_index is None:
+                    outcome_index = DEFAULT_OUTCOME_INDEX.get(str(outcome).lower())
+                lot = stats.lots[key] = Lot(outcome_index)
+                self.holders.setdefault(condition_id, set()).add((wallet, outcome))
+            lot.shares += shares
+            lot.cost += shares * price
+            lot.share_seconds += shares * timestamp
+            # Bought after the market resolved (e.g. replayed history): realize right away
+            if condition_id in self.resolved:
+                self._settle(stats, wallet, condition_id, outcome, lot, self.resolved[condition_id], timestamp)
+        elif side == "SELL" and lot is not None:
+            stats.close(lot, min(shares, lot.shares), min(shares, lot.shares) * price, timestamp)
+            self._drop_if_closed(stats, wallet, condition_id, outcome, lot)
+            stats.rescore()
+        self.dirty.add(wallet)
+
+    def on_resolution(self, condition_id, payouts, timestamp=None):
+        """Realizes every open whale lot in a resolved market at its payout (per event, not per trade)."""
+        condition_id = condition_id.lower()
+        self.resolved[condition_id] = payouts
+        timestamp = timestamp or time.time()
+        for wallet, outcome in list(self.holders.get(condition_id, ())):
+            stats = self.wallets[wallet]
+            self._settle(stats, wallet, condition_id, outcome, stats.lots[(condition_id, outcome)], payouts, timestamp)
+            self.dirty.add(wallet)
+        self.resolutions += 1
+
+    def _settle(self, stats, wallet, condition_id, outcome, lot, payouts, timestamp):
+        total = sum(payouts)
+        if lot.outcome_index is None or lot.outcome_index >= len(payouts) or not total:
+            return  # Can't value this outcome
+        payout = payouts[lot.outcome_index] / total
+        stats.close(lot, lot.shares, lot.shares * payout, timestamp)
+        self._drop_if_closed(stats, wallet, condition_id, outcome, lot)
+        stats.rescore()
+
+    def _drop_if_closed(self, stats, wallet, condition_id, outcome, lot):
+        if lot.shares > DUST_SHARES:
+            return
+        del stats.lots[(condition_id, outcome)]
+        holders = self.holders.get(condition_id)
+        if holders is not None:
+            holders.discard((wallet, outcome))
+            if not holders:
+                del self.holders[condition_id]
+
+    def open_conditions(self):
+        return self.holders.keys()
+
+    async def load(self):
+        """Rebuilds the rolling stats from wallet_trades and the stored resolutions (once, at startup)."""
+        try:
+            payouts = await Database.load_payouts()
+            rows = await Database.fetchall("""
+                SELECT wallet_address, condition_id, outcome, side, size_usd, entry_price, timestamp
+                FROM wallet_trades ORDER BY timestamp, id
+            """)
+        except Exception as e:
+            console.print(f"[red]Failed to load wallet scores: {e}[/red]")
+            return
+
+        self.resolved.update(payouts)
+        for wallet, condition_id, outcome, side, shares, price, timestamp in rows:
+            self.on_trade(wallet, condition_id, outcome, side, shares or 0, price or 0, timestamp or 0)
+        console.print(f"[dim]Wallet scores rebuilt from {len(rows)} trades ({len(self.wallets)} wallets)[/dim]")
+
+    async def flush(self):
+        """Writes the scores of wallets that changed since the last flush."""
+        if not self.dirty:
+            return
+        now = int(time.time())
+        rows = [(1 - self.wallets[w].score, self.wallets[w].realized_pnl, now, w) for w in self.dirty]
+        self.dirty = set()
+        await Database.write(lambda db: db.executemany(
+            "UPDATE wallets SET risk_score = ?, total_profit = ?, last_updated = ? WHERE address = ?", rows
+        ))
+        self.flushes += 1
+
+    async def _run(self):
+        try:
+            while True:
+                await asyncio.sleep(Config.SCORE_FLUSH_INTERVAL)
+                try:
+                    await self.flush()
+                except Exception as e:
+                    console.print(f"[red]Error flushing wallet scores: {e}[/red]")
+        finally:
+            if self.dirty:
+                await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    def snapshot(self, wallet):
+        """Current rolling stats for one wallet (for inspection)."""
+        stats = self.wallets.get(wallet)
+        if stats is None:
+            return None
+        return {
+            "score": stats.score,
+            "fills": stats.fills,
+            "volume_usd": stats.volume,
+            "size_mean": stats.size_mean,
+            "size_std": math.sqrt(stats.size_m2 / (stats.fills - 1)) if stats.fills > 1 else 0.0,
+            "size_histogram": dict(zip([f"<{b}" for b in SIZE_BUCKETS] + [f">={SIZE_BUCKETS[-1]}"], stats.size_hist)),
+            "closed_trades": stats.closed,
+            "win_rate": stats.wins / stats.closed if stats.closed else None,
+            "realized_pnl": stats.realized_pnl,
+            "avg_hold_hours": stats.hold_seconds / stats.closed / 3600 if stats.closed else None,
+            "open_positions": len(stats.lots),
+        }
+
+    def stats(self):
+        return {
+            "wallets": len(self.wallets),
+            "open_markets": len(self.holders),
+            "resolutions": self.resolutions,
+            "dirty": len(self.dirty),
+            "flushes": self.flushes,
+        }
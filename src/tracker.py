@@ -1,65 +1,143 @@
 import asyncio
-import aiohttp
 import time
 from datetime import datetime
 from src.config import Config, console
+from src.http_client import HttpClient
+from src.dedup import DedupStore
+from src.rate_limiter import TokenBucket
+from src.scheduler import PollScheduler
+from src.metrics import Metrics
 from rich.panel import Panel
 
 class Tracker:
     def __init__(self, process_transaction_callback):
         self.targets = [t.lower() for t in Config.TARGET_WALLETS]
-        self.base_url = "https://data-api.polymarket.com/activity"
+        self.base_url = f"{Config.POLYMARKET_DATA_API_URL}/activity"
         self.callback = process_transaction_callback
-        self.seen_activity_ids = set()
+        # Bounded, persisted dedup state (per-wallet watermark + recent ids)
+        self.dedup = DedupStore()
         self.first_run = True
-        self.poll_interval = 3.0
+        self.poll_interval = Config.POLL_INTERVAL
+        # One request budget shared by every wallet poll (learns the data-api limit from 429s)
+        self.rate_limiter = TokenBucket(rate=Config.DATA_API_RATE_LIMIT, burst=Config.DATA_API_BURST)
+        self.scheduler = None
+        self.session = None
 
     async def fetch_activity(self, session, wallet):
-        """Consulta la API de Polymarket para una wallet específica."""
+        """
+        Consulta la API de Polymarket para una wallet específica, de forma incremental.
+        
+        - Wallet nueva: trae las últimas ACTIVITY_BASELINE_LIMIT actividades (historial base).
+        - Wallet tranquila: una sola petición con limit=1; si lo más nuevo ya está visto, listo.
+        - Wallet activa: pagina desde el cursor (timestamp del watermark) hasta alcanzarlo,
+          con un tope de páginas y páginas pedidas en paralelo.
+        Devuelve (wallet, actividades DESC) o (wallet, None) si la consulta falló.
+        """
+        cursor_ts = self.dedup.cursor(wallet)
+        if cursor_ts is None:
+            data = await self._get_page(session, wallet, limit=Config.ACTIVITY_BASELINE_LIMIT)
+            return wallet, data
+
+        # 1. Sonda barata: solo el item más reciente
+        probe = await self._get_page(session, wallet, limit=1)
+        if probe is None:
+            return wallet, None
+        if not probe or not self.dedup.is_new(wallet, self.activity_id(probe[0]), int(probe[0].get('timestamp') or 0)):
+            return wallet, []
+
+        # 2. Hay actividad nueva: paginamos desde el cursor
+        page_size = Config.ACTIVITY_PAGE_SIZE
+        activities = []
+        page = 0
+        while page < Config.ACTIVITY_MAX_PAGES:
+            batch = range(page, min(page + Config.ACTIVITY_PAGE_CONCURRENCY, Config.ACTIVITY_MAX_PAGES))
+            pages = await asyncio.gather(*[
+                self._get_page(session, wallet, limit=page_size, offset=p * page_size, start=cursor_ts)
+                for p in batch
+            ])
+            
+            done = False
+            for data in pages:
+                if data is None:
+                    # Página fallida: devolvemos lo que tenemos, el resto llega en la próxima vuelta
+                    return wallet, activities or None
+                activities.extend(data)
+                # Página corta o ya cruzamos el cursor: no hay más que pedir
+                if len(data) < page_size or (data and int(data[-1].get('timestamp') or 0) < cursor_ts):
+                    done = True
+                    break
+            if done:
+                break
+            page += len(batch)
+        else:
+            console.print(f"[yellow]⚠️ {wallet[:6]}: tope de {Config.ACTIVITY_MAX_PAGES} páginas alcanzado[/yellow]")
+        
+        return wallet, activities
+
+    async def _get_page(self, session, wallet, limit, offset=0, start=None):
+        """Una página de /activity (orden DESC). None si hubo error."""
         params = {
             "user": wallet,
-            "limit": "10",
+            "limit": str(limit),
+            "offset": str(offset),
             "sortBy": "TIMESTAMP",
             "sortDirection": "DESC"
         }
+        if start is not None:
+            params["start"] = str(start)
+        await self.rate_limiter.acquire()
+        Metrics.inc("data_api_requests_total")
         try:
             async with session.get(self.base_url, params=params) as response:
                 if response.status == 200:
-                    data = await response.json()
-                    return wallet, data
+                    self.rate_limiter.on_success()
+                    return await response.json()
                 elif response.status == 429:
-                    console.print("[yellow]⚠️ Rate Limit (429). Pausando...[/yellow]")
-                    await asyncio.sleep(2)
-                    return wallet, []
+                    retry_after = TokenBucket.parse_retry_after(response.headers.get('Retry-After'))
+                    self.rate_limiter.on_throttle(retry_after)
+                    Metrics.inc("rate_limited_total", api="data")
+                    console.print(f"[yellow]⚠️ Rate Limit (429). Bajando a {self.rate_limiter.rate:.1f} req/s...[/yellow]")
+                    return None
                 else:
                     console.print(f"[red]Error {response.status} checking {wallet[:6]}...[/red]")
-                    return wallet, []
+                    return None
         except Exception as e:
             console.print(f"[red]Error de conexión: {str(e)}[/red]")
-            return wallet, []
+            return None
+
+    @staticmethod
+    def activity_id(act):
+        """ID único de la actividad (o uno construido si la API no lo trae)."""
+        act_id = act.get('id')
+        
+        # Si no hay ID, intentamos construir uno único (timestamp + type + conditionId)
+        if not act_id:
+            condition_id = act.get('conditionId')
+            side = act.get('side')
+            timestamp = act.get('timestamp')
+            act_id = f"{condition_id}_{side}_{timestamp}"
+        return act_id
 
     def process_activity(self, wallet, activities):
         """Filtra y procesa las actividades nuevas."""
+        # Primera vez que vemos la wallet (sin watermark persistido): solo cargamos historial
+        if not self.dedup.has_watermark(wallet):
+            self.dedup.set_baseline(wallet, [
+                (self.activity_id(act), int(act.get('timestamp') or 0)) for act in activities
+            ])
+            return []
+
         # Procesamos desde el más antiguo al más nuevo
         new_activities = []
         for act in reversed(activities):
             # Usamos el ID único de la actividad para evitar duplicados exactos
-            act_id = act.get('id')
+            act_id = self.activity_id(act)
+            timestamp = int(act.get('timestamp') or 0)
             
-            # Si no hay ID, intentamos construir uno único (timestamp + type + conditionId)
-            if not act_id:
-                condition_id = act.get('conditionId')
-                side = act.get('side')
-                timestamp = act.get('timestamp')
-                act_id = f"{condition_id}_{side}_{timestamp}"
-            
-            if act_id in self.seen_activity_ids:
+            if not self.dedup.is_new(wallet, act_id, timestamp):
                 continue
             
-            self.seen_activity_ids.add(act_id)
-            
-            if self.first_run:
-                continue
+            self.dedup.mark(wallet, act_id, timestamp)
 
             # FILTRO: Solo nos interesan Trades
             if act.get('type') == "TRADE":
@@ -69,28 +147,51 @@ class Tracker:
 
         return new_activities
 
+    async def poll_wallet(self, wallet):
+        """Una consulta de una wallet. Devuelve cuántas actividades nuevas se despacharon."""
+        Metrics.inc("polls_total")
+        _, activities = await self.fetch_activity(self.session, wallet)
+        
+        # None = la consulta falló; no tocamos el estado de esa wallet
+        if activities is None:
+            return 0
+        
+        new_acts = self.process_activity(wallet, activities)
+        for act in new_acts:
+             # Hand the activity to the callback (normally Dispatcher.submit,
+             # which only blocks when the queue is full)
+             console.print(f"[blue]🔔 Nueva actividad detectada para {wallet[:6]}...[/blue]")
+             await self.callback(act)
+        return len(new_acts)
+
+    async def _persist_loop(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.dedup.persist()
+            except Exception as e:
+                console.print(f"[red]Error guardando estado del tracker: {e}[/red]")
+
     async def start_monitoring(self):
         console.print("[bold green]🚀 Iniciando Polymarket Tracker (API Mode)[/bold green]")
         console.print(f"[cyan]📡 Monitoreando {len(self.targets)} wallets...[/cyan]")
         
-        async with aiohttp.ClientSession() as session:
-            while True:
-                tasks = [self.fetch_activity(session, w) for w in self.targets]
-                
-                results = await asyncio.gather(*tasks)
-                
-                for wallet, activities in results:
-                    #print(f"[blue]🔍 Revisando actividad para {wallet[:6]}...[/blue]")
-                   
-                    if activities:
-                        new_acts = self.process_activity(wallet, activities)
-                        for act in new_acts:
-                             # Call the callback with the activity object
-                             print(f"[blue]🔔 Nueva actividad detectada para {wallet[:6]}...[/blue]")
-                             await self.callback(act)
-                
-                if self.first_run:
-                    console.print("[blue]ℹ️  Historial inicial cargado. Esperando nuevos movimientos...[/blue]")
-                    self.first_run = False
-                
-                await asyncio.sleep(self.poll_interval)
+        # Reanudamos desde los watermarks de la ejecución anterior (si existen)
+        await self.dedup.load()
+        
+        self.session = HttpClient.session(Config.POLYMARKET_DATA_API_URL)
+        
+        # Primera pasada: historial base / reanudación para todas las wallets
+        await asyncio.gather(*[self.poll_wallet(w) for w in self.targets])
+        await self.dedup.persist()
+        console.print("[blue]ℹ️  Historial inicial cargado. Esperando nuevos movimientos...[/blue]")
+        self.first_run = False
+        
+        # Luego cada wallet a su ritmo: las activas rápido, las dormidas cada vez más lento
+        self.scheduler = PollScheduler(self.targets, self.poll_wallet, initial_interval=self.poll_interval)
+        persist_task = asyncio.create_task(self._persist_loop())
+        try:
+            await self.scheduler.run()
+        finally:
+            persist_task.cancel()
+            await self.dedup.persist()
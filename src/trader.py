@@ -1,10 +1,21 @@
 import asyncio
-import requests
+import time
 from src.config import Config, console
+from src.http_client import HttpClient
+from src.order_executor import OrderExecutor
+from src.market_params import MarketParamsCache
+from src.positions import PositionLedger
+from src.balance import BalanceManager
+from src.orderbook import OrderBookMirror, slippage_limit
+from src.metrics import Metrics
 from py_clob_client.client import ClobClient
-from py_clob_client.clob_types import MarketOrderArgs, OrderType, BalanceAllowanceParams, AssetType
+from py_clob_client.clob_types import MarketOrderArgs, OrderArgs, OrderType, BalanceAllowanceParams, AssetType
 from py_clob_client.order_builder.constants import BUY, SELL
 
+# Data API /positions paging (500 is the endpoint's maximum page size)
+POSITIONS_PAGE_SIZE = 500
+POSITIONS_MAX_PAGES = 20
+
 class Trader:
     def __init__(self):
         self.wallet_address = Config.MY_WALLET_ADDRESS
@@ -17,6 +28,25 @@ class Trader:
         self.signature_type = Config.SIGNATURE_TYPE
         self.funder_address = Config.FUNDER_ADDRESS
 
+        # Blocking ClobClient calls run here, never on the event loop
+        self.executor = OrderExecutor()
+
+        # Tick size / neg-risk / fee rate / price per token, so orders are built locally
+        self.market_params = MarketParamsCache(self)
+
+        # Our own holdings, updated from our fills and reconciled with the Data API
+        self.positions = PositionLedger(self)
+
+        # Local books for traded tokens (slippage-aware sizing without a book fetch)
+        self.orderbooks = OrderBookMirror()
+
+        # Cached USDC balance with reservations for in-flight orders
+        self.balance = BalanceManager(self)
+
+        # L2 credentials bookkeeping (see keep_credentials_fresh)
+        self.creds_derived_at = 0.0
+        self.creds_expired = asyncio.Event()
+
         # Initialize Polymarket CLOB Client
         self.client = None
         if self.private_key:
@@ -30,16 +60,107 @@ class Trader:
                 )
                 
                 # Derive L2 API Key if needed
-                try:
-                    creds = self.client.derive_api_key()
-                    self.client.set_api_creds(creds)
+                if self.refresh_api_creds():
                     console.print(f"[green]✔ Authenticated with Polymarket CLOB[/green]")
-                except Exception as e:
-                    console.print(f"[yellow]⚠ API Key Derivation skipped/failed: {e}[/yellow]")
             
             except Exception as e:
                 console.print(f"[bold red]✘ Failed to initialize ClobClient:[/bold red] {e}")
 
+    def refresh_api_creds(self):
+        """
+        (Re)derives the L2 API credentials and installs them on the client.
+        Blocking network call: run it in an executor when called from the event loop
+        (it runs off-loop, so it must not touch asyncio primitives).
+        """
+        if not self.client:
+            return False
+
+        try:
+            creds = self.client.derive_api_key()
+            self.client.set_api_creds(creds)
+            self.creds_derived_at = time.time()
+            return True
+        except Exception as e:
+            console.print(f"[yellow]⚠ API Key Derivation skipped/failed: {e}[/yellow]")
+            return False
+
+    async def keep_credentials_fresh(self):
+        """
+        Background task: re-derives L2 credentials every CLOB_CREDS_REFRESH_SECONDS,
+        or immediately when an order comes back with an auth error.
+        """
+        while True:
+            try:
+                await asyncio.wait_for(self.creds_expired.wait(), timeout=Config.CLOB_CREDS_REFRESH_SECONDS)
+                console.print("[yellow]⚠ CLOB credentials rejected. Re-deriving...[/yellow]")
+            except asyncio.TimeoutError:
+                pass
+
+            try:
+                refreshed = await self.executor.run(self.refresh_api_creds, label="derive_api_key")
+            except Exception:
+                refreshed = False
+            if refreshed:
+                # Back on the event loop: safe to reset the asyncio.Event here
+                self.creds_expired.clear()
+                console.print("[dim]CLOB credentials refreshed.[/dim]")
+            else:
+                # Don't spin on a failing derive call
+                await asyncio.sleep(30)
+
+    def prewarm_market(self, token_ids, trade_token_id=None):
+        """Called as soon as a market's token IDs are known: order params, plus the book of the token we'll trade."""
+        self.market_params.prewarm(token_ids)
+        if trade_token_id:
+            self.orderbooks.track([trade_token_id])
+
+    @staticmethod
+    def _plan_against_book(book, side, amount, tick):
+        """
+        Walks the local book for an order of `amount` (USDC for BUY, shares for SELL).
+        Returns None if that side of the book is empty, else a dict with the
+        slippage limit price, how much fills within it, and the expected VWAP.
+        """
+        best = book.best_ask() if side == "BUY" else book.best_bid()
+        if best is None:
+            return None
+        limit = slippage_limit(best, side, Config.SLIPPAGE_TOLERANCE, tick)
+        vwap, fillable, _, _ = book.walk(side, amount, limit_price=limit)
+        return {"best": best, "limit": limit, "fillable": fillable, "vwap": vwap}
+
+    async def _book_fill(self, resp, token_id, side, amount, condition_id, outcome, assume_filled=True):
+        """
+        Updates the position ledger from the order response and returns the USDC
+        that changed hands (None if the response didn't say).
+        BUY: making = USDC spent, taking = shares received. SELL: the reverse.
+        """
+        try:
+            making = float(resp.get('makingAmount') or 0)
+            taking = float(resp.get('takingAmount') or 0)
+        except (TypeError, ValueError):
+            making = taking = 0.0
+
+        if side == "BUY":
+            usdc, shares = making, taking
+        else:
+            shares, usdc = making, taking
+
+        if shares <= 0:
+            # Fill size unknown: let the background reconcile pick it up
+            if side == "SELL" and assume_filled:
+                shares = amount
+            else:
+                self.positions.request_reconcile()
+                return None
+
+        await self.positions.apply_fill(token_id, side, shares, usdc, condition_id=condition_id, outcome=outcome)
+        return usdc or None
+
+    @staticmethod
+    def _is_auth_error(exc):
+        status = getattr(exc, 'status_code', None)
+        return status in (401, 403) or 'Unauthorized' in str(exc)
+
     async def get_wallet_balance(self):
         """
         Fetches the current USDC balance/allowance on the Exchange.
@@ -50,8 +171,10 @@ class Trader:
 
         try:
             # Fetch collateral balance (USDC)
-            balance_info = self.client.get_balance_allowance(
-                BalanceAllowanceParams(asset_type=AssetType.COLLATERAL)
+            balance_info = await self.executor.run(
+                self.client.get_balance_allowance,
+                BalanceAllowanceParams(asset_type=AssetType.COLLATERAL),
+                label="get_balance_allowance",
             )
             # Balance is in atomic units (6 decimals for USDC)
             raw_balance = float(balance_info['balance'])
@@ -59,19 +182,32 @@ class Trader:
             return usdc_balance
         except Exception as e:
             console.print(f"[red]Error fetching balance: {e}[/red]")
-            return 0.0
+            return None
 
     async def calculate_bet_size(self):
-        """Calculates the bet size based on configuration."""
+        """
+        Calculates the bet size based on configuration.
+        PERCENTAGE mode sizes against the cached balance minus in-flight reservations
+        (local computation; only the very first call has to sync from the exchange).
+        """
         if self.mode == "PERCENTAGE":
-            balance = await self.get_wallet_balance()
-            bet_size = balance * self.bet_percentage
+            if not self.balance.synced:
+                await self.balance.resync()
+            balance = self.balance.available()
+            bet_size = self.bet_size(self.mode, balance, self.bet_percentage, self.default_bet_size)
             console.print(f"[cyan]Calculating Bet: {self.bet_percentage*100:.1f}% of {balance:.2f} USDC = {bet_size:.2f} USDC[/cyan]")
             return bet_size
         else:
-            return self.default_bet_size
+            return self.bet_size(self.mode, None, self.bet_percentage, self.default_bet_size)
+
+    @staticmethod
+    def bet_size(mode, balance, bet_percentage, fixed_amount):
+        """Pure sizing rule shared with the backtester (`balance` may be a NumPy array)."""
+        if mode == "PERCENTAGE":
+            return balance * bet_percentage
+        return fixed_amount
 
-    async def execute_copy_trade(self, token_id, target_name, original_amount: float, side: str):
+    async def execute_copy_trade(self, token_id, target_name, original_amount: float, side: str, condition_id=None, outcome=None, whale_timestamp=None, size_multiplier=1.0):
         """
         Executes a trade on Polymarket matching the whale's activity.
         
@@ -79,6 +215,9 @@ class Trader:
             token_id: The ID or Name of the outcome token (CLOB Token ID).
             original_amount: The amount the whale bet.
             side: 'BUY' or 'SELL'.
+            condition_id / outcome: Market context recorded in the position ledger.
+            whale_timestamp: Unix time of the whale's fill, for end-to-end copy lag.
+            size_multiplier: Scales the configured BUY size (e.g. by the whale's score).
         """
         console.print(f"[bold yellow]Executing COPY TRADE ({side})...[/bold yellow]")
         console.print(f"Target Market/Token: {target_name}")
@@ -87,6 +226,8 @@ class Trader:
             console.print("[bold red]✘ Client not initialized. Cannot trade.[/bold red]")
             return False
 
+        started = time.monotonic()
+        reservation = None
         try:
             order_side = BUY if side.upper() == 'BUY' else SELL
             
@@ -98,24 +239,28 @@ class Trader:
             
             if order_side == BUY:
                 # Calculate Bet Size in USDC
-                amount = await self.calculate_bet_size()
+                amount = await self.calculate_bet_size() * size_multiplier
+                if self.balance.synced:
+                    # Earmark the funds so concurrent BUYs can't spend the same USDC.
+                    # This caps every mode (FIXED included) at the available balance.
+                    requested = amount
+                    reservation, amount = self.balance.reserve(amount)
+                    if amount <= 0:
+                        console.print("[yellow]⚠ No available balance (all reserved by in-flight orders). Skipping BUY.[/yellow]")
+                        return False
+                    if amount < requested - 0.005:
+                        console.print(f"[yellow]⚠ Bet trimmed from {requested:.2f} to {amount:.2f} USDC (available balance).[/yellow]")
                 console.print(f"My Bet Size: {amount:.2f} USDC (Whale size: {original_amount})")
                 
             else: # SELL
-                # We need to find how many shares we own of 'token_id'
-                # Polymarket API /positions endpoint or CLOB balance check
-                # For simplicity/speed, we use the CLOB client to get balance of this specific asset?
-                # The 'get_balance_allowance' is for Collateral (USDC). 
-                # To get token balance, we might need a different call or rely on keeping track.
-                # Let's try to fetch simple position info.
-                
-                # Fetch all positions to find this token
-                positions = self.get_bot_positions()
-                my_shares = 0.0
-                for p in positions:
-                    if p.get('asset') == token_id:
-                        my_shares = float(p.get('size', 0))
-                        break
+                # Share count comes from the local ledger (O(1), no network call).
+                # Until the first reconcile has run, fall back to the Data API.
+                my_shares = self.positions.shares(token_id)
+                if my_shares <= 0 and not self.positions.reconciled:
+                    for p in await self.get_bot_positions() or []:
+                        if p.get('asset') == token_id:
+                            my_shares = float(p.get('size', 0))
+                            break
                 
                 if my_shares <= 0:
                     console.print(f"[yellow]⚠ No shares found for {token_id}. Skipping SELL.[/yellow]")
@@ -130,6 +275,8 @@ class Trader:
                      
                 console.print(f"Selling Shares: {amount:.2f} (Whale size: {original_amount})")
 
+            Metrics.observe("stage_seconds", time.monotonic() - started, stage="sizing")
+
             # Note: py-clob-client create_market_order uses 'amount'.
             # BUY: amount is in USDC (Collateral)
             # SELL: amount is in Token Units (Shares)
@@ -141,37 +288,132 @@ class Trader:
                 order_type=OrderType.FOK 
             )
 
-            # create_market_order returns a SignedOrder
-            signed_order = self.client.create_market_order(market_order)
+            # With cached market params the client needs no lookups: pass tick size / neg-risk
+            # and a price limit so create_market_order is pure local signing.
+            options = None
+            params = self.market_params.get(token_id)
+            if params is None:
+                params = await self.market_params.load(token_id)
+            if params is not None:
+                options = self.market_params.order_options(params)
+                worst_price = self.market_params.worst_price(params, side.upper(), Config.SLIPPAGE_TOLERANCE)
+                if worst_price:
+                    market_order.price = worst_price
+                if params.fee_rate_bps is not None:
+                    market_order.fee_rate_bps = params.fee_rate_bps
+
+            # Slippage control from the local order book mirror: walk depth to the
+            # tolerance price, then cap the size or fall back to a resting limit order.
+            order_type = OrderType.FOK
+            limit_order = None
+            book = self.orderbooks.get(token_id)
+            if book is not None:
+                tick = float(params.tick_size) if params is not None else 0.01
+                plan = self._plan_against_book(book, side.upper(), amount, tick)
+                if plan is None:
+                    console.print(f"[yellow]⚠ Empty book on the {side} side for {target_name}. Skipping.[/yellow]")
+                    if reservation is not None:
+                        self.balance.release(reservation)
+                    return False
+
+                market_order.price = plan["limit"]
+                if plan["fillable"] + 1e-9 >= amount:
+                    console.print(f"[dim]Book: expected VWAP {plan['vwap']:.4f} (best {plan['best']:.3f}, limit {plan['limit']:.3f})[/dim]")
+                elif Config.SLIPPAGE_ACTION == "LIMIT":
+                    shares = amount / plan["limit"] if order_side == BUY else amount
+                    limit_order = OrderArgs(token_id=token_id, price=plan["limit"], size=float(f"{shares:.2f}"), side=order_side)
+                    order_type = OrderType.GTC
+                    console.print(f"[yellow]Book too thin within {Config.SLIPPAGE_TOLERANCE:.1%}: placing limit order @ {plan['limit']:.3f}[/yellow]")
+                else:
+                    capped = float(int(plan["fillable"] * 100) / 100)
+                    if capped < Config.MIN_ORDER_SIZE:
+                        console.print(f"[yellow]⚠ Only {plan['fillable']:.2f} fillable within {Config.SLIPPAGE_TOLERANCE:.1%} slippage. Skipping.[/yellow]")
+                        if reservation is not None:
+                            self.balance.release(reservation)
+                        return False
+                    console.print(f"[yellow]Capping order {amount:.2f} -> {capped:.2f} (VWAP {plan['vwap']:.4f} within tolerance)[/yellow]")
+                    amount = capped
+                    market_order.amount = amount
+
+            # Signing runs on the order thread pool and returns a SignedOrder
+            with Metrics.stage("sign"):
+                if limit_order is not None:
+                    signed_order = await self.executor.run(
+                        self.client.create_order, limit_order, options,
+                        timeout=Config.ORDER_SIGN_TIMEOUT, label="create_order",
+                    )
+                else:
+                    signed_order = await self.executor.run(
+                        self.client.create_market_order, market_order, options,
+                        timeout=Config.ORDER_SIGN_TIMEOUT, label="create_market_order",
+                    )
             
             # Execute the order
-            resp = self.client.post_order(signed_order, OrderType.FOK)
+            with Metrics.stage("post"):
+                resp = await self.executor.run(
+                    self.client.post_order, signed_order, order_type,
+                    timeout=Config.ORDER_TIMEOUT, label="post_order",
+                )
             
+            Metrics.inc("orders_total", side=side.upper(), status="ok")
             console.print(f"[bold green]✔ Trade Executed Successfully![/bold green]")
             console.print(f"Order ID: {resp.get('orderID', 'Unknown')}")
+            if whale_timestamp:
+                # Whale's fill (chain/API time) -> our order ack: true end-to-end copy lag
+                copy_lag = time.time() - whale_timestamp
+                Metrics.observe("copy_lag_seconds", copy_lag)
+                console.print(f"[dim]Copy lag: {copy_lag:.2f}s (order path {time.monotonic() - started:.3f}s)[/dim]")
+            # A resting limit order may not have filled yet
+            assume_filled = order_type == OrderType.FOK or resp.get('status') == 'matched'
+            usdc = await self._book_fill(resp, token_id, side.upper(), amount, condition_id, outcome, assume_filled=assume_filled)
+            if order_side == BUY:
+                if reservation is not None:
+                    self.balance.settle(reservation, usdc if usdc is not None else amount)
+            elif usdc is not None:
+                self.balance.credit(usdc)
+            else:
+                self.balance.request_resync()
             return True
 
         except Exception as e:
+            if reservation is not None:
+                self.balance.release(reservation)
+            Metrics.inc("orders_total", side=side.upper(), status="failed")
             console.print(f"[bold red]✘ Trade Failed:[/bold red] {e}")
+            # Stale tick size / price is a common cause of rejects: refetch next time
+            self.market_params.invalidate(token_id)
+            if self._is_auth_error(e):
+                self.creds_expired.set()
             return False
 
-    def get_bot_positions(self):
+    async def get_bot_positions(self, verbose: bool = False):
         """
         Retrieves the bot's current positions using the Polymarket Data API.
+        Returns None if the request failed (so callers can tell it from "no positions").
         """
         if not self.wallet_address:
             console.print("[red]Wallet address not configured.[/red]")
-            return []
+            return None
 
         try:
             url = f"{Config.POLYMARKET_DATA_API_URL}/positions"
-            params = {"user": self.wallet_address}
-            
-            console.print(f"[cyan]Fetching positions for {self.wallet_address}...[/cyan]")
-            response = requests.get(url, params=params)
-            response.raise_for_status()
             
-            positions = response.json()
+            if verbose:
+                console.print(f"[cyan]Fetching positions for {self.wallet_address}...[/cyan]")
+            session = HttpClient.session(Config.POLYMARKET_DATA_API_URL)
+            # Page through everything: a truncated list would read as closed positions
+            positions = []
+            for page in range(POSITIONS_MAX_PAGES):
+                params = {"user": self.wallet_address, "limit": str(POSITIONS_PAGE_SIZE), "offset": str(page * POSITIONS_PAGE_SIZE)}
+                async with session.get(url, params=params) as response:
+                    response.raise_for_status()
+                    batch = await response.json()
+                positions.extend(batch)
+                if len(batch) < POSITIONS_PAGE_SIZE:
+                    break
+            else:
+                console.print(f"[yellow]⚠ More than {POSITIONS_MAX_PAGES * POSITIONS_PAGE_SIZE} positions; list truncated.[/yellow]")
+                return None
             
             # Filter for active positions (size > 0)
             # The API returns positions with 'size' as string usually
@@ -182,16 +424,17 @@ class Trader:
                     p['float_size'] = size
                     active_positions.append(p)
             
-            console.print(f"[green]Found {len(active_positions)} active positions.[/green]")
-            for p in active_positions:
-                title = p.get('title', 'Unknown Market')
-                outcome = p.get('outcome', '?')
-                size = p.get('float_size')
-                value = p.get('currentValue', 0)
-                console.print(f"  • {title} [{outcome}] | Size: {size:.2f} | Value: ${value}")
+            if verbose:
+                console.print(f"[green]Found {len(active_positions)} active positions.[/green]")
+                for p in active_positions:
+                    title = p.get('title', 'Unknown Market')
+                    outcome = p.get('outcome', '?')
+                    size = p.get('float_size')
+                    value = p.get('currentValue', 0)
+                    console.print(f"  • {title} [{outcome}] | Size: {size:.2f} | Value: ${value}")
                 
             return active_positions
 
         except Exception as e:
             console.print(f"[bold red]✘ Failed to fetch positions:[/bold red] {e}")
-            return []
+            return None
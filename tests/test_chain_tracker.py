@@ -0,0 +1,89 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+
+from src.chain_tracker import ChainTracker, decode_order_filled
+from src.config import Config
+from src.market_api import MarketAPI
+
+# Recorded-style eth_getLogs results: a maker BUY and a maker SELL by the
+# tracked wallet, a fill where it is only the taker, an untracked wallet, an
+# overlapping duplicate, a reorged-out log and a log with a foreign topic.
+LOGS = json.loads((Path(__file__).parent / "fixtures" / "order_filled_logs.json").read_text())
+WALLET = "0x" + "a1" * 20
+
+
+class RecordedRpc:
+    """Serves block timestamps from the recording instead of a node."""
+
+    def __init__(self, logs):
+        self.timestamps = {int(log["blockNumber"], 16): int(log["blockTimestamp"], 16) for log in logs}
+
+    async def block_timestamps(self, blocks):
+        return {b: self.timestamps.get(b) for b in blocks}
+
+
+def test_maker_buy_decodes_shares_usdc_and_price():
+    (act,) = decode_order_filled(LOGS[0], {WALLET})
+    assert act["wallet_address"] == WALLET
+    assert act["side"] == "BUY"
+    assert act["asset"] == "111"
+    assert act["size"] == pytest.approx(100)
+    assert act["usdcSize"] == pytest.approx(50)
+    assert act["price"] == pytest.approx(0.5)
+    assert act["blockNumber"] == 0x100
+    assert act["id"] == f"{LOGS[0]['transactionHash']}:0:{WALLET}"
+
+
+def test_maker_sell_decodes_token_from_maker_asset():
+    (act,) = decode_order_filled(LOGS[1], {WALLET})
+    assert act["side"] == "SELL"
+    assert act["asset"] == "222"
+    assert act["size"] == pytest.approx(40)
+    assert act["price"] == pytest.approx(0.6)
+
+
+def test_taker_side_only_matched_when_enabled():
+    assert decode_order_filled(LOGS[2], {WALLET}) == []
+    (act,) = decode_order_filled(LOGS[2], {WALLET}, include_taker=True)
+    # The maker sold T1, so the tracked taker bought it
+    assert act["side"] == "BUY"
+    assert act["asset"] == "111"
+    assert act["price"] == pytest.approx(0.7)
+
+
+def test_untracked_and_foreign_logs_are_ignored():
+    assert decode_order_filled(LOGS[3], {WALLET}) == []
+    assert decode_order_filled(LOGS[6], {WALLET}) == []
+
+
+def test_replay_dedups_overlap_and_skips_removed(monkeypatch):
+    monkeypatch.setattr(Config, "TARGET_WALLETS", [WALLET.upper()])
+    monkeypatch.setattr(Config, "CHAIN_INCLUDE_TAKER_SIDE", False)
+
+    async def token_info(token_id):
+        return {"conditionId": f"cond-{token_id}", "title": "Market", "outcome": "Yes", "outcomeIndex": 0}
+    monkeypatch.setattr(MarketAPI, "get_token_info", staticmethod(token_info))
+
+    received = []
+
+    async def callback(act):
+        received.append(act)
+
+    async def replay():
+        tracker = ChainTracker(callback, rpc=RecordedRpc(LOGS))
+        first = await tracker.replay_logs(LOGS)
+        # A backfill range that overlaps what was already dispatched
+        second = await tracker.replay_logs(LOGS[:2])
+        return tracker, first, second
+
+    tracker, first, second = asyncio.run(replay())
+    assert (first, second) == (2, 0)
+    assert [(a["side"], a["asset"]) for a in received] == [("BUY", "111"), ("SELL", "222")]
+    assert received[0]["timestamp"] == 0x65000000
+    assert received[1]["timestamp"] == 0x6500000C
+    assert received[0]["conditionId"] == "cond-111"
+    assert received[0]["outcomeIndex"] == 0
+    assert tracker.logs_scanned == len(LOGS) + 2
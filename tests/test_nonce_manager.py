@@ -0,0 +1,161 @@
+import asyncio
+
+import pytest
+import rlp
+from eth_utils import keccak
+
+from src.config import Config
+from src.nonce_manager import TxPipeline
+from src.rpc import RpcError
+
+# anvil's first pre-funded dev account
+KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+GAS_PRICE = 30_000_000_000
+
+
+class DevChain:
+    """
+    Local stand-in for a node's mempool: tracks the account nonce, enforces
+    replacement pricing (+10%) and "nonce too low", and mines the best-priced
+    version of every pending nonce once `mine_after` receipt polls have run.
+    """
+
+    def __init__(self, mine_after=None):
+        self.mined_nonce = 0
+        self.pool = {}          # nonce -> (gas_price, tx_hash)
+        self.receipts = {}
+        self.mine_after = mine_after
+        self.polls = 0
+        self.reject_next = False
+        self.accept_then_fail = False
+        self.count_reads = 0
+
+    def pending_nonce(self):
+        return max([self.mined_nonce - 1, *self.pool]) + 1
+
+    def mine(self):
+        for nonce in sorted(self.pool):
+            _, tx_hash = self.pool.pop(nonce)
+            self.receipts[tx_hash] = {"transactionHash": tx_hash, "status": "0x1", "blockNumber": "0x1"}
+            self.mined_nonce = nonce + 1
+
+    def send_raw(self, raw):
+        fields = rlp.decode(bytes.fromhex(raw[2:]))
+        nonce, gas_price = int.from_bytes(fields[0], "big"), int.from_bytes(fields[1], "big")
+        tx_hash = "0x" + keccak(hexstr=raw).hex()
+        if self.reject_next:
+            self.reject_next = False
+            raise RpcError("eth_sendRawTransaction: {'message': 'insufficient funds'}")
+        if nonce < self.mined_nonce:
+            raise RpcError("eth_sendRawTransaction: {'message': 'nonce too low'}")
+        if nonce in self.pool and gas_price < self.pool[nonce][0] * 1.1:
+            raise RpcError("eth_sendRawTransaction: {'message': 'replacement transaction underpriced'}")
+        self.pool[nonce] = (gas_price, tx_hash)
+        if self.accept_then_fail:
+            # Broadcast reached the node but the response was lost
+            self.accept_then_fail = False
+            raise RpcError("eth_sendRawTransaction: timeout")
+        return tx_hash
+
+    async def call(self, method, params=None):
+        if method == "eth_getTransactionCount":
+            self.count_reads += 1
+            return hex(self.pending_nonce())
+        if method == "eth_sendRawTransaction":
+            return self.send_raw(params[0])
+        raise AssertionError(method)
+
+    async def batch(self, requests):
+        self.polls += 1
+        if self.mine_after is not None and self.polls >= self.mine_after:
+            self.mine()
+        return [self.receipts.get(params[0]) for method, params in requests]
+
+
+@pytest.fixture(autouse=True)
+def fast_pipeline(monkeypatch):
+    monkeypatch.setattr(Config, "TX_POLL_INTERVAL", 0)
+    monkeypatch.setattr(Config, "TX_BUMP_AFTER", 0)
+    monkeypatch.setattr(Config, "TX_MAX_BUMPS", 2)
+
+
+def nonce_of(pending):
+    return pending.tx["nonce"]
+
+
+def test_nonces_are_allocated_locally_after_first_read():
+    chain = DevChain()
+    pipeline = TxPipeline(chain, KEY, chain_id=31337)
+
+    async def send_three():
+        return [await pipeline.send(pipeline.address, "0x", 21000, GAS_PRICE) for _ in range(3)]
+
+    sent = asyncio.run(send_three())
+    assert [nonce_of(p) for p in sent] == [0, 1, 2]
+    assert chain.count_reads == 1
+
+
+def test_rejected_send_leaves_no_nonce_gap():
+    chain = DevChain()
+    pipeline = TxPipeline(chain, KEY, chain_id=31337)
+
+    async def run():
+        first = await pipeline.send(pipeline.address, "0x", 21000, GAS_PRICE)
+        chain.reject_next = True
+        with pytest.raises(RpcError):
+            await pipeline.send(pipeline.address, "0x", 21000, GAS_PRICE)
+        return first, await pipeline.send(pipeline.address, "0x", 21000, GAS_PRICE)
+
+    first, after = asyncio.run(run())
+    # Nonce 1 was never consumed, so the re-read hands it out again
+    assert (nonce_of(first), nonce_of(after)) == (0, 1)
+    assert pipeline.stats()["nonce_resyncs"] == 2
+
+
+def test_send_that_reached_the_node_is_not_reused():
+    chain = DevChain()
+    pipeline = TxPipeline(chain, KEY, chain_id=31337)
+
+    async def run():
+        chain.accept_then_fail = True
+        with pytest.raises(RpcError):
+            await pipeline.send(pipeline.address, "0x", 21000, GAS_PRICE)
+        return await pipeline.send(pipeline.address, "0x", 21000, GAS_PRICE)
+
+    # Nonce 0 sits in the pool, so the next allocation skips it instead of replacing it
+    assert nonce_of(asyncio.run(run())) == 1
+
+
+def test_stuck_transaction_is_bumped_with_same_nonce():
+    chain = DevChain(mine_after=3)
+    pipeline = TxPipeline(chain, KEY, chain_id=31337)
+
+    async def run():
+        pending = await pipeline.send(pipeline.address, "0x", 21000, GAS_PRICE, label="redeem")
+        return pending, await pipeline.wait(pending, timeout=5)
+
+    pending, receipt = asyncio.run(run())
+    assert pending.bumps == 2
+    assert len(pending.hashes) == 3
+    assert nonce_of(pending) == 0
+    assert pending.tx["gasPrice"] > GAS_PRICE * Config.TX_BUMP_FACTOR ** 2
+    # The mined version is the last replacement
+    assert receipt["transactionHash"] == pending.hashes[-1]
+    assert pipeline.stats()["replacements"] == 2
+    assert pipeline.stats()["confirmed"] == 1
+
+
+def test_bump_after_original_was_mined_is_dropped():
+    chain = DevChain()
+    pipeline = TxPipeline(chain, KEY, chain_id=31337)
+
+    async def run():
+        pending = await pipeline.send(pipeline.address, "0x", 21000, GAS_PRICE)
+        chain.mine()
+        await pipeline._bump(pending)  # "nonce too low": already included
+        return pending, await pipeline.wait(pending, timeout=5)
+
+    pending, receipt = asyncio.run(run())
+    assert pending.bumps == 0
+    assert receipt["transactionHash"] == pending.hashes[0]
+    assert pipeline.stats()["replacements"] == 0
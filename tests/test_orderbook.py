@@ -0,0 +1,79 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from src.config import Config
+from src.orderbook import OrderBook, OrderBookMirror, slippage_limit
+
+# Market-channel messages as captured from the CLOB websocket: a `book`
+# snapshot, a snapshot for an untracked token, a new-style `price_changes`
+# delta and an old-style batched `changes` delta.
+MESSAGES = json.loads((Path(__file__).parent / "fixtures" / "book_messages.json").read_text())
+
+
+def replayed_mirror():
+    mirror = OrderBookMirror(ws_url="ws://unused")
+    mirror.books["111"] = OrderBook("111")
+    for msg in MESSAGES:
+        mirror.apply_message(msg)
+    return mirror
+
+
+def test_snapshot_and_deltas_apply_in_order():
+    mirror = replayed_mirror()
+    book = mirror.books["111"]
+    # Zero-size snapshot levels are dropped, deltas add/remove levels
+    assert book.prices["BUY"] == [0.48, 0.49]
+    assert book.prices["SELL"] == [0.53, 0.54, 0.55]
+    assert book.levels["BUY"] == {0.48: 100.0, 0.49: 60.0}
+    assert (book.best_bid(), book.best_ask()) == (0.49, 0.53)
+    assert "999" not in mirror.books
+    assert mirror.snapshots == 1
+    assert mirror.deltas == 4
+
+
+def test_deltas_before_snapshot_are_ignored():
+    mirror = OrderBookMirror(ws_url="ws://unused")
+    mirror.books["111"] = OrderBook("111")
+    mirror.apply_message(MESSAGES[2])
+    assert not mirror.books["111"].loaded
+    assert mirror.books["111"].prices["BUY"] == []
+
+
+def test_walk_consumes_best_levels_first():
+    book = replayed_mirror().books["111"]
+    # 0.53 x 120 = 63.6 USDC, then 6.4 USDC at 0.54
+    vwap, filled, shares, worst = book.walk("BUY", 70)
+    assert filled == pytest.approx(70)
+    assert shares == pytest.approx(120 + 6.4 / 0.54)
+    assert worst == 0.54
+    assert vwap == pytest.approx(70 / shares)
+    # A limit stops the walk at the touch
+    assert book.walk("SELL", 200, limit_price=0.49)[1:] == (60.0, 60.0, 0.49)
+
+
+def test_evict_idle_drops_unused_books(monkeypatch):
+    monkeypatch.setattr(Config, "ORDERBOOK_IDLE_TTL", 60)
+    mirror = replayed_mirror()
+    mirror.books["222"] = OrderBook("222")
+    mirror.books["111"].last_used = 1000.0
+    mirror.books["222"].last_used = 1050.0
+    mirror._changed.clear()
+
+    mirror.evict_idle(now=1100.0)
+    assert list(mirror.books) == ["222"]
+    assert mirror.evicted == 1
+    # The socket loop resubscribes on the next wakeup
+    assert mirror._changed.is_set()
+
+
+@pytest.mark.parametrize("best, side, tolerance, tick, expected", [
+    (0.50, "BUY", 0.01, 0.01, 0.50),    # 0.505 snaps down inside the tolerance
+    (0.50, "BUY", 0.05, 0.01, 0.52),
+    (0.50, "SELL", 0.05, 0.01, 0.48),
+    (0.985, "BUY", 0.05, 0.001, 0.999),  # clamped below 1
+    (0.02, "SELL", 0.5, 0.01, 0.01),     # clamped above 0
+])
+def test_slippage_limit(best, side, tolerance, tick, expected):
+    assert slippage_limit(best, side, tolerance, tick) == pytest.approx(expected)